@@ -0,0 +1,81 @@
+"""cascade deletes and purge jobs
+
+Revision ID: 1da3892eb2c0
+Revises: a8a1c251a34e
+Create Date: 2026-10-18 16:42:09.530614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import (
+    create_index_concurrently,
+    drop_index_concurrently,
+    replace_foreign_key,
+    set_lock_timeout,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1da3892eb2c0'
+down_revision: Union[str, None] = 'a8a1c251a34e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table)
+CASCADING = [
+    ('responses', 'user_id', 'users'),
+    ('responses', 'prompt_id', 'prompts'),
+    ('comments', 'user_id', 'users'),
+    ('comments', 'response_id', 'responses'),
+    ('notifications', 'user_id', 'users'),
+    ('notifications', 'prompt_id', 'prompts'),
+    ('notifications', 'response_id', 'responses'),
+    ('notifications', 'comment_id', 'comments'),
+]
+
+# Referencing columns that had no index; cascades would scan the table per deleted parent
+INDEXES = [
+    ('ix_comments_user_id', 'comments', ['user_id']),
+    ('ix_notifications_user_id', 'notifications', ['user_id']),
+    ('ix_notifications_prompt_id', 'notifications', ['prompt_id']),
+    ('ix_notifications_response_id', 'notifications', ['response_id']),
+    ('ix_notifications_comment_id', 'notifications', ['comment_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    set_lock_timeout()
+    op.create_table(
+        'purge_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_purge_jobs_id'), 'purge_jobs', ['id'], unique=False)
+    op.create_index('uq_purge_jobs_entity_entity_id', 'purge_jobs', ['entity', 'entity_id'], unique=True)
+
+    # Indexes first so the new cascades never run without them
+    for name, table, columns in INDEXES:
+        create_index_concurrently(name, table, columns)
+    for table, column, referent in CASCADING:
+        replace_foreign_key(table, column, referent, ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    set_lock_timeout()
+    for table, column, referent in CASCADING:
+        replace_foreign_key(table, column, referent)
+    for name, table, _ in INDEXES:
+        drop_index_concurrently(name, table)
+
+    op.drop_index('uq_purge_jobs_entity_entity_id', table_name='purge_jobs')
+    op.drop_index(op.f('ix_purge_jobs_id'), table_name='purge_jobs')
+    op.drop_table('purge_jobs')
@@ -0,0 +1,64 @@
+"""add change tracking for sync
+
+Revision ID: 3805be3eb520
+Revises: 99731db1dd31
+Create Date: 2026-10-18 18:03:37.662915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import create_index_concurrently, drop_index_concurrently, set_lock_timeout
+from app.utils.sync import POSTGRES_DDL, POSTGRES_DROP_DDL, TRACKED_TABLES
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3805be3eb520'
+down_revision: Union[str, None] = '99731db1dd31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    set_lock_timeout()
+    # Nullable with no default, so no table rewrite. Existing rows are never
+    # "changed"; clients get them from their initial full load
+    for table in TRACKED_TABLES:
+        op.add_column(table, sa.Column('change_seq', sa.BigInteger(), nullable=True))
+
+    op.create_table(
+        'tombstones',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('prompt_id', sa.Integer(), nullable=True),
+        sa.Column('change_seq', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_tombstones_change_seq', 'tombstones', ['change_seq'], unique=False)
+    op.create_index('ix_tombstones_deleted_at', 'tombstones', ['deleted_at'], unique=False)
+
+    for statement in POSTGRES_DDL:
+        op.execute(statement)
+
+    for table in TRACKED_TABLES:
+        create_index_concurrently(f'ix_{table}_change_seq', table, ['change_seq'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    set_lock_timeout()
+    for table in TRACKED_TABLES:
+        drop_index_concurrently(f'ix_{table}_change_seq', table)
+    for statement in POSTGRES_DROP_DDL:
+        op.execute(statement)
+
+    op.drop_index('ix_tombstones_deleted_at', table_name='tombstones')
+    op.drop_index('ix_tombstones_change_seq', table_name='tombstones')
+    op.drop_table('tombstones')
+    for table in TRACKED_TABLES:
+        op.drop_column(table, 'change_seq')
@@ -0,0 +1,33 @@
+"""add refresh_tokens rotated_at
+
+Revision ID: 45667f23de4a
+Revises: 636d124505e2
+Create Date: 2026-10-18 19:52:08.714530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import set_lock_timeout
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45667f23de4a'
+down_revision: Union[str, None] = '636d124505e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    set_lock_timeout()
+    # Tokens revoked before this can't be told apart and are treated as logged out
+    op.add_column('refresh_tokens', sa.Column('rotated_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    set_lock_timeout()
+    op.drop_column('refresh_tokens', 'rotated_at')
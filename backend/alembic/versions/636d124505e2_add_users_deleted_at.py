@@ -0,0 +1,33 @@
+"""add users deleted_at
+
+Revision ID: 636d124505e2
+Revises: 3805be3eb520
+Create Date: 2026-10-18 19:24:51.306127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import set_lock_timeout
+
+
+# revision identifiers, used by Alembic.
+revision: str = '636d124505e2'
+down_revision: Union[str, None] = '3805be3eb520'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    set_lock_timeout()
+    # Nullable with no default, so no table rewrite
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    set_lock_timeout()
+    op.drop_column('users', 'deleted_at')
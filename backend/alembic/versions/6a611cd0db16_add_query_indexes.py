@@ -0,0 +1,77 @@
+"""add indexes for hot query paths
+
+Revision ID: 6a611cd0db16
+Revises: d9f85f684cb9
+Create Date: 2026-10-18 11:26:05.918342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import create_index_concurrently, drop_index_concurrently, set_lock_timeout
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a611cd0db16'
+down_revision: Union[str, None] = 'd9f85f684cb9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Each response with the newest response by the same user to the same prompt
+RESPONSE_KEEPERS = (
+    "SELECT id, first_value(id) OVER ("
+    "PARTITION BY user_id, prompt_id ORDER BY date DESC NULLS LAST, id DESC"
+    ") AS keep FROM responses"
+)
+
+
+def remove_duplicates() -> None:
+    """Clear out what the old check-then-write paths let through.
+
+    A duplicate would make the unique builds below fail halfway. Comments and
+    notifications on a dropped response move to the one that is kept.
+    """
+    for table in ('comments', 'notifications'):
+        op.execute(
+            f"UPDATE {table} SET response_id = "
+            f"(SELECT keep FROM ({RESPONSE_KEEPERS}) k WHERE k.id = {table}.response_id) "
+            f"WHERE response_id IN (SELECT id FROM ({RESPONSE_KEEPERS}) k WHERE k.id <> k.keep)"
+        )
+    op.execute(f"DELETE FROM responses WHERE id IN (SELECT id FROM ({RESPONSE_KEEPERS}) k WHERE k.id <> k.keep)")
+    # Only the newest active prompt stays active
+    op.execute(
+        "UPDATE prompts SET is_active = false WHERE is_active = true AND id <> "
+        "(SELECT id FROM prompts WHERE is_active = true ORDER BY created_at DESC NULLS LAST, id DESC LIMIT 1)"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so live traffic keeps writing while indexes build
+    set_lock_timeout()
+    # Committed by the first index build's autocommit block
+    remove_duplicates()
+
+    # At most one active prompt; also serves the /prompt/current lookup
+    create_index_concurrently('uq_prompts_single_active', 'prompts', ['is_active'], unique=True,
+                              where='is_active = true')
+    create_index_concurrently('ix_prompts_created_at_id', 'prompts', ['created_at', 'id'])
+
+    # One response per user per prompt; serves create/update lookups
+    create_index_concurrently('uq_responses_user_id_prompt_id', 'responses', ['user_id', 'prompt_id'], unique=True)
+    create_index_concurrently('ix_responses_prompt_id_date_id', 'responses', ['prompt_id', 'date', 'id'])
+    create_index_concurrently('ix_responses_user_id_date_id', 'responses', ['user_id', 'date', 'id'])
+
+    create_index_concurrently('ix_comments_response_id_created_at_id', 'comments', ['response_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_comments_response_id_created_at_id', 'comments')
+    drop_index_concurrently('ix_responses_user_id_date_id', 'responses')
+    drop_index_concurrently('ix_responses_prompt_id_date_id', 'responses')
+    drop_index_concurrently('uq_responses_user_id_prompt_id', 'responses')
+    drop_index_concurrently('ix_prompts_created_at_id', 'prompts')
+    drop_index_concurrently('uq_prompts_single_active', 'prompts')
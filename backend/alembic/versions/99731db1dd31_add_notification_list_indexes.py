@@ -0,0 +1,37 @@
+"""add notification list indexes
+
+Revision ID: 99731db1dd31
+Revises: 1da3892eb2c0
+Create Date: 2026-10-18 17:25:51.204377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import create_index_concurrently, drop_index_concurrently, set_lock_timeout
+
+
+# revision identifiers, used by Alembic.
+revision: str = '99731db1dd31'
+down_revision: Union[str, None] = '1da3892eb2c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    set_lock_timeout()
+    create_index_concurrently('ix_notifications_user_id_created_at_id', 'notifications', ['user_id', 'created_at', 'id'])
+    create_index_concurrently('ix_notifications_user_id_unread', 'notifications', ['user_id'], where='is_read = false')
+    # Covered by the leading column of the list index
+    drop_index_concurrently('ix_notifications_user_id', 'notifications')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    set_lock_timeout()
+    create_index_concurrently('ix_notifications_user_id', 'notifications', ['user_id'])
+    drop_index_concurrently('ix_notifications_user_id_unread', 'notifications')
+    drop_index_concurrently('ix_notifications_user_id_created_at_id', 'notifications')
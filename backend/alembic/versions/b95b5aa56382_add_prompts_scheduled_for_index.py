@@ -0,0 +1,32 @@
+"""add prompts scheduled_for index
+
+Revision ID: b95b5aa56382
+Revises: ea02bbb0f515
+Create Date: 2026-10-18 14:41:12.503318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.online_migrations import create_index_concurrently, drop_index_concurrently, set_lock_timeout
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b95b5aa56382'
+down_revision: Union[str, None] = 'ea02bbb0f515'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    set_lock_timeout()
+    # Upcoming prompts for the activation scheduler
+    create_index_concurrently('ix_prompts_scheduled_for', 'prompts', ['scheduled_for'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_prompts_scheduled_for', 'prompts')
@@ -0,0 +1,37 @@
+"""add response_likes ledger
+
+Revision ID: cd67aad9a1ac
+Revises: 6a611cd0db16
+Create Date: 2026-10-18 12:40:52.117604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd67aad9a1ac'
+down_revision: Union[str, None] = '6a611cd0db16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('response_likes',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('response_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['response_id'], ['responses.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'response_id')
+    )
+    op.create_index(op.f('ix_response_likes_response_id'), 'response_likes', ['response_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_response_likes_response_id'), table_name='response_likes')
+    op.drop_table('response_likes')
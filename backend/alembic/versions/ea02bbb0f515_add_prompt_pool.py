@@ -0,0 +1,36 @@
+"""add prompt_pool
+
+Revision ID: ea02bbb0f515
+Revises: cd67aad9a1ac
+Create Date: 2026-10-18 13:58:30.674112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ea02bbb0f515'
+down_revision: Union[str, None] = 'cd67aad9a1ac'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('prompt_pool',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('source', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_prompt_pool_id'), 'prompt_pool', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_prompt_pool_id'), table_name='prompt_pool')
+    op.drop_table('prompt_pool')
@@ -1,4 +1,8 @@
+from contextvars import ContextVar
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -12,10 +16,16 @@ DB_HOST = os.environ["DB_HOST"]
 DB_NAME = os.environ["DB_NAME"]
 
 SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
+# Sync engine, still used by alembic and one-off scripts
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API routes so queries don't block the event loop
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -23,4 +33,22 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Set by POST /batch so every sub-request it runs uses the batch's session
+shared_session: ContextVar[Optional[AsyncSession]] = ContextVar("shared_session", default=None)
+
+async def get_async_db():
+    shared = shared_session.get()
+    if shared is not None:
+        # The batch owns it and closes it when every sub-request is done
+        yield shared
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def dialect_insert(db, model):
+    """INSERT construct for the session's dialect, so ON CONFLICT is available."""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
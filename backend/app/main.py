@@ -1,11 +1,42 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 # Import your routers here
-from .routes import user, prompt, auth, response, comment, password  # Add other routes as you implement them
+from .routes import user, prompt, auth, response, comment, password, feed, notification, sync, batch  # Add other routes as you implement them
+from .utils.broadcaster import broadcaster
+from .utils.hash_pool import hash_pool
+from .utils.like_counter import like_counter
+from .utils.notifications import notification_queue
+from .utils.prompt_index import prompt_index
+from .utils.prompt_pool import prompt_pool
+from .utils.prompt_scheduler import prompt_scheduler
+from .utils.purge import purge_worker
+from .utils.prompt_generator import gemini_client
 
 
-app = FastAPI(title="Sonder API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await broadcaster.start()
+    like_counter.start()
+    notification_queue.start()
+    prompt_index.start()
+    prompt_pool.start()
+    prompt_scheduler.start()
+    purge_worker.start()
+    yield
+    await purge_worker.stop()
+    await prompt_scheduler.stop()
+    await prompt_pool.stop()
+    await prompt_index.stop()
+    await notification_queue.stop()
+    await like_counter.stop()
+    await broadcaster.stop()
+    await gemini_client.aclose()
+    hash_pool.shutdown()
+
+
+app = FastAPI(title="Sonder API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -22,7 +53,10 @@ app.include_router(user.router)
 app.include_router(prompt.router)
 app.include_router(response.router)
 app.include_router(comment.router)
-# app.include_router(notifications.router)
+app.include_router(feed.router)
+app.include_router(sync.router)
+app.include_router(notification.router)
+app.include_router(batch.router)
 app.include_router(auth.router)
 app.include_router(password.router)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import BigInteger, Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Index, JSON, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -11,10 +11,15 @@ class User(Base):
     username = Column(String(50), unique=True, index=True)
     email = Column(String(100), unique=True, index=True)
     password = Column(String(256))
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Set when the account is queued for a background purge; lookups skip such users
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
     
-    responses = relationship("Response", back_populates="user")
-    comments = relationship("Comment", back_populates="user")
-    notifications = relationship("Notification", back_populates="user")
+    # Children go with ON DELETE CASCADE; passive_deletes keeps the ORM from loading them first.
+    # No relationship is ever lazy loaded: query the rows, or look them up through utils/loaders.py
+    responses = relationship("Response", back_populates="user", cascade="all, delete", passive_deletes=True, lazy="raise")
+    comments = relationship("Comment", back_populates="user", cascade="all, delete", passive_deletes=True, lazy="raise")
+    notifications = relationship("Notification", back_populates="user", cascade="all, delete", passive_deletes=True, lazy="raise")
 
 class Prompt(Base):
     __tablename__ = "prompts"
@@ -24,24 +29,52 @@ class Prompt(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     scheduled_for = Column(DateTime(timezone=True))
     is_active = Column(Boolean, default=False)
+    # Stamped by a trigger on every write; see utils/sync.py
+    change_seq = Column(BigInteger, nullable=True)
     
-    responses = relationship("Response", back_populates="prompt")
+    responses = relationship("Response", back_populates="prompt", cascade="all, delete", passive_deletes=True, lazy="raise")
+
+    __table_args__ = (
+        # At most one active prompt; also serves the /prompt/current lookup
+        Index(
+            "uq_prompts_single_active", "is_active", unique=True,
+            postgresql_where=text("is_active = true"), sqlite_where=text("is_active = 1"),
+        ),
+        Index("ix_prompts_created_at_id", "created_at", "id"),
+        # Upcoming prompts for the activation scheduler
+        Index("ix_prompts_scheduled_for", "scheduled_for"),
+        Index("ix_prompts_change_seq", "change_seq"),
+    )
 
 class Response(Base):
     __tablename__ = "responses"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False) 
     image = Column(String, nullable=True)
     anonymous = Column(Boolean, default=False)
     date =  Column(DateTime(timezone=True), server_default=func.now())
     likes = Column(Integer, default=0)
-    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False)
+    prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=False)
+    # Maintained alongside comment writes; see utils/comment_stats.py
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_preview = Column(JSON, nullable=False, default=list, server_default="[]")
+    change_seq = Column(BigInteger, nullable=True)
     
-    user = relationship("User", back_populates="responses")
-    prompt = relationship("Prompt", back_populates="responses")
-    comments = relationship("Comment", back_populates="response")
+    user = relationship("User", back_populates="responses", lazy="raise")
+    prompt = relationship("Prompt", back_populates="responses", lazy="raise")
+    comments = relationship("Comment", back_populates="response", cascade="all, delete", passive_deletes=True, lazy="raise")
+
+    __table_args__ = (
+        # One response per user per prompt; serves create/update lookups
+        Index("uq_responses_user_id_prompt_id", "user_id", "prompt_id", unique=True),
+        # Keyset pages of a prompt's or a user's responses
+        Index("ix_responses_prompt_id_date_id", "prompt_id", "date", "id"),
+        Index("ix_responses_user_id_date_id", "user_id", "date", "id"),
+        # Rows changed since a sync token
+        Index("ix_responses_change_seq", "change_seq"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -50,11 +83,19 @@ class Comment(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    response_id = Column(Integer, ForeignKey("responses.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    response_id = Column(Integer, ForeignKey("responses.id", ondelete="CASCADE"), nullable=False)
+    change_seq = Column(BigInteger, nullable=True)
     
-    user = relationship("User", back_populates="comments")
-    response = relationship("Response", back_populates="comments")
+    user = relationship("User", back_populates="comments", lazy="raise")
+    response = relationship("Response", back_populates="comments", lazy="raise")
+
+    __table_args__ = (
+        Index("ix_comments_response_id_created_at_id", "response_id", "created_at", "id"),
+        # Cascades and purges from users
+        Index("ix_comments_user_id", "user_id"),
+        Index("ix_comments_change_seq", "change_seq"),
+    )
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -65,9 +106,82 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=True)
-    response_id = Column(Integer, ForeignKey("responses.id"), nullable=True)
-    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    prompt_id = Column(Integer, ForeignKey("prompts.id", ondelete="CASCADE"), nullable=True)
+    response_id = Column(Integer, ForeignKey("responses.id", ondelete="CASCADE"), nullable=True)
+    comment_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)
     
-    user = relationship("User", back_populates="notifications")
\ No newline at end of file
+    user = relationship("User", back_populates="notifications", lazy="raise")
+
+    __table_args__ = (
+        # Every FK gets an index so cascading deletes don't scan the table
+        # A user's notifications newest first; also serves the users cascade
+        Index("ix_notifications_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Unread counts touch only unread rows
+        Index(
+            "ix_notifications_user_id_unread", "user_id",
+            postgresql_where=text("is_read = false"), sqlite_where=text("is_read = 0"),
+        ),
+        Index("ix_notifications_prompt_id", "prompt_id"),
+        Index("ix_notifications_response_id", "response_id"),
+        Index("ix_notifications_comment_id", "comment_id"),
+    )
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked = Column(Boolean, nullable=False, default=False)
+    # Set when the token was swapped for a new one, as opposed to revoked by logout
+    rotated_at = Column(DateTime(timezone=True), nullable=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+class ResponseLike(Base):
+    __tablename__ = "response_likes"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    response_id = Column(Integer, ForeignKey("responses.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PromptPoolEntry(Base):
+    __tablename__ = "prompt_pool"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content = Column(Text, nullable=False)
+    source = Column(String(20), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PurgeJob(Base):
+    __tablename__ = "purge_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Lease held by the worker purging it; see utils/purge.py
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("uq_purge_jobs_entity_entity_id", "entity", "entity_id", unique=True),
+    )
+
+class Tombstone(Base):
+    """A deleted prompt, response or comment, written by a trigger; see utils/sync.py."""
+    __tablename__ = "tombstones"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # Prompt the deleted row belonged to, for prompt-scoped syncs
+    prompt_id = Column(Integer, nullable=True)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_tombstones_change_seq", "change_seq"),
+        Index("ix_tombstones_deleted_at", "deleted_at"),
+    )
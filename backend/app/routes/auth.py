@@ -1,17 +1,20 @@
 # routes/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 import os
-import hashlib
 from dotenv import load_dotenv
 
 from .. import models
 from .. import schema as schemas
-from ..database import get_db
+from ..database import get_async_db
+from ..utils import hasher, refresh_tokens, token_versions
+from ..utils.hash_pool import hash_pool
+from ..utils.user_cache import CachedUser, get_user_by_email, get_user_by_id, get_user_by_username, user_cache
 
 load_dotenv()
 
@@ -29,31 +32,23 @@ router = APIRouter(
     tags=["authentication"]
 )
 
-def verify_password(plain_password: str, stored_password: str) -> bool:
-    """Verify password against stored hash."""
-    salt_hex, hash_hex = stored_password.split(':')
-    salt = bytes.fromhex(salt_hex)
-    stored_hash = bytes.fromhex(hash_hex)
-
-    hashed_password = hashlib.pbkdf2_hmac(
-        'sha256',
-        plain_password.encode(),
-        salt,
-        100
-    )
-
-    return hashed_password == stored_hash
-
-def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[CachedUser]:
     """Authenticate a user by username and password."""
 
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await get_user_by_username(db, username)
 
     if not user:
-        user = db.query(models.User).filter(models.User.email == username).first()
+        user = await get_user_by_email(db, username)
 
-    if not user or not verify_password(password, user.password):
+    if not user or not await hash_pool.run(hasher.verify_password, password, user.password):
         return None
+
+    # Upgrade hashes stored with an old format or cost while we have the plain password
+    if hasher.needs_rehash(user.password):
+        new_password = await hash_pool.run(hasher.hash_password, password)
+        await db.execute(update(models.User).where(models.User.id == user.id).values(password=new_password))
+        await db.commit()
+        user_cache.invalidate(user.id)
     
     return user
 
@@ -71,7 +66,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+def token_claims(user: CachedUser) -> dict:
+    """Claims that let protected routes identify the user without loading the row."""
+    return {"sub": user.username, "uid": user.id, "email": user.email, "ver": user.token_version}
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> schemas.TokenData:
     """Get the current authenticated user from the token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -81,25 +80,31 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
+        current_user = schemas.TokenData(
+            username=payload.get("sub"),
+            id=payload.get("uid"),
+            email=payload.get("email"),
+            token_version=payload.get("ver"),
+        )
         
-        if username is None:
+        if current_user.username is None or current_user.id is None or current_user.token_version is None:
             raise credentials_exception
         
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.username == username).first()
+    # Only the version is checked against the server, so revoked tokens stop working
+    version = await token_versions.get_version(db, current_user.id)
     
-    if user is None:
+    if version is None or version != current_user.token_version:
         raise credentials_exception
     
-    return user
+    return current_user
 
 @router.post("/login", response_model=schemas.Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Authenticate and login a user."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -110,16 +115,18 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data=token_claims(user),
         expires_delta=access_token_expires,
     )
+    refresh_token = await refresh_tokens.issue(db, user.id)
+    await db.commit()
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.post("/mobile-login", response_model=schemas.TokenWithUser)
-async def mobile_login(login_data: schemas.UserLogin, db: Session = Depends(get_db)):
+async def mobile_login(login_data: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Endpoint optimized for mobile clients that returns user data with the token."""
-    user = authenticate_user(db, login_data.username, login_data.password)
+    user = await authenticate_user(db, login_data.username, login_data.password)
     
     if not user:
         raise HTTPException(
@@ -129,12 +136,16 @@ async def mobile_login(login_data: schemas.UserLogin, db: Session = Depends(get_
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data=token_claims(user),
         expires_delta=access_token_expires,
     )
     
+    refresh_token = await refresh_tokens.issue(db, user.id)
+    await db.commit()
+    
     return {
         "access_token": access_token, 
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": {
             "id": user.id,
@@ -144,17 +155,56 @@ async def mobile_login(login_data: schemas.UserLogin, db: Session = Depends(get_
     }
 
 @router.post("/refresh", response_model=schemas.Token)
-async def refresh_token(current_user: models.User = Depends(get_current_user)):
+async def refresh_token(current_user: schemas.TokenData = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Refresh the access token."""
+    # Re-read the user so renamed accounts get fresh claims
+    user = await get_user_by_id(db, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": current_user.username},
+        data=token_claims(user),
         expires_delta=access_token_expires,
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
-@router.get("/me", response_model=schemas.UserResponse)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
+@router.post("/refresh-token", response_model=schemas.Token)
+async def rotate_refresh_token(request: schemas.RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Exchange a refresh token for a new access/refresh pair without a password."""
+    rotated = await refresh_tokens.rotate(db, request.refresh_token)
+    user = await get_user_by_id(db, rotated[0]) if rotated else None
+
+    if user is None:
+        # Commit so reuse detection's revocations stick
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+        )
+    await db.commit()
+
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data=token_claims(user),
+        expires_delta=access_token_expires,
+    )
+
+    return {"access_token": access_token, "refresh_token": rotated[1], "token_type": "bearer"}
+
+@router.post("/logout", status_code=status.HTTP_200_OK)
+async def logout(request: schemas.RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Revoke a refresh token."""
+    await refresh_tokens.revoke(db, request.refresh_token)
+    await db.commit()
+    return {"message": "Logged out"}
+
+@router.get("/me", response_model=schemas.UserSummary)
+async def read_users_me(current_user: schemas.TokenData = Depends(get_current_user)):
     """Get the current authenticated user."""
     return current_user
\ No newline at end of file
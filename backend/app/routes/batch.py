@@ -0,0 +1,182 @@
+"""``POST /batch``: several API calls in one round trip.
+
+The app loads a screen with a chain of calls (post a response, fetch the
+author, fetch the comments). A batch runs them in order, in-process, through
+the normal routes, so validation, auth and status codes are unchanged. All
+sub-requests share one database session, and ``transaction: true`` makes the
+batch all-or-nothing: the commits the routes make only flush, and the batch
+commits once at the end, or rolls everything back at the first failure.
+
+A later sub-request can use an earlier result: ``{0.id}`` in a path, or a body
+value that is exactly ``"{0.id}"``, becomes field ``id`` of result 0. Paths are
+checked again once resolved, so a placeholder can't reach a route that cannot
+be batched or smuggle in ``..`` segments.
+
+Only database writes are rolled back. Caches the routes invalidated, queued
+notifications, like-count deltas and live-feed pushes stay as they were.
+"""
+import os
+import posixpath
+import re
+from typing import Any, List
+from urllib.parse import unquote
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database
+from .. import schema as schemas
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+MAX_BATCH_REQUESTS = int(os.getenv("MAX_BATCH_REQUESTS", 20))
+# Streams never finish, and a batch inside a batch would share its session
+UNBATCHABLE_PREFIXES = ("/batch", "/feed/live")
+FORWARDED_HEADERS = ("authorization",)
+
+REFERENCE = re.compile(r"\{(\d+)\.([\w.]+)\}")
+
+
+class BatchSession(AsyncSession):
+    """Session for a transactional batch: route commits flush, and a rollback fails the batch."""
+
+    aborted = False
+
+    async def commit(self):
+        await self.flush()
+
+    async def rollback(self):
+        # The route gave up on its work; what earlier sub-requests did is gone too
+        self.aborted = True
+        await super().rollback()
+
+
+class Unresolved(Exception):
+    def __init__(self, index: int):
+        self.index = index
+
+
+def _batchable(path: str) -> bool:
+    route = path.split("?", 1)[0]
+    # The app routes on the decoded path, so that is what has to be clean
+    decoded = unquote(route)
+    if not decoded.startswith("/") or decoded.startswith("//"):
+        return False
+    normalized = posixpath.normpath(decoded) + ("/" if decoded.endswith("/") and decoded != "/" else "")
+    return normalized == decoded and not decoded.startswith(UNBATCHABLE_PREFIXES)
+
+
+def _lookup(results: List[dict], index: int, field: str):
+    if index >= len(results) or results[index]["status"] >= 400:
+        raise Unresolved(index)
+    value = results[index]["body"]
+    for key in field.split("."):
+        if not isinstance(value, dict) or key not in value:
+            raise Unresolved(index)
+        value = value[key]
+    return value
+
+
+def _resolve(value: Any, results: List[dict]) -> Any:
+    if isinstance(value, str):
+        whole = REFERENCE.fullmatch(value)
+        if whole:
+            # Keep the referenced value's type, so ids stay ints
+            return _lookup(results, int(whole.group(1)), whole.group(2))
+        return value
+    if isinstance(value, dict):
+        return {key: _resolve(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve(item, results) for item in value]
+    return value
+
+
+def _resolve_path(path: str, results: List[dict]) -> str:
+    return REFERENCE.sub(lambda match: str(_lookup(results, int(match.group(1)), match.group(2))), path)
+
+
+async def _dispatch(client: httpx.AsyncClient, operation: schemas.BatchOperation, results: List[dict], headers: dict) -> dict:
+    try:
+        path = _resolve_path(operation.path, results)
+        body = _resolve(operation.body, results)
+    except Unresolved as unresolved:
+        return {
+            "status": status.HTTP_424_FAILED_DEPENDENCY,
+            "body": {"detail": f"Depends on request {unresolved.index}, which failed or has no such field"},
+        }
+    if not _batchable(path):
+        return {"status": status.HTTP_400_BAD_REQUEST, "body": {"detail": f"{path} cannot be batched"}}
+    response = await client.request(
+        operation.method,
+        path,
+        json=body,
+        headers={**headers, **(operation.headers or {})},
+    )
+    try:
+        content = response.json()
+    except ValueError:
+        content = response.text or None
+    return {"status": response.status_code, "body": content}
+
+
+def _skipped(count: int) -> List[dict]:
+    return [
+        {"status": status.HTTP_424_FAILED_DEPENDENCY, "body": {"detail": "Not run; an earlier request in the transaction failed"}}
+    ] * count
+
+
+@router.post("/", response_model=schemas.BatchResponse)
+async def run_batch(batch: schemas.BatchRequest, request: Request):
+    if not batch.requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A batch needs at least one request"
+        )
+    if len(batch.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can hold at most {MAX_BATCH_REQUESTS} requests"
+        )
+    for operation in batch.requests:
+        # Placeholders are only known later; _dispatch checks the resolved path too
+        if not _batchable(REFERENCE.sub("0", operation.path)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{operation.path} cannot be batched"
+            )
+
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    factory = database.AsyncSessionLocal
+    if batch.transaction:
+        db = BatchSession(**factory.kw)
+    else:
+        db = factory()
+
+    results: List[dict] = []
+    committed = True
+    token = database.shared_session.set(db)
+    try:
+        # Calls the app directly in this task, so the sub-requests see shared_session.
+        # A route that crashes comes back as its 500 instead of ending the batch.
+        transport = httpx.ASGITransport(app=request.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+            for index, operation in enumerate(batch.requests):
+                result = await _dispatch(client, operation, results, headers)
+                results.append(result)
+                failed = result["status"] >= 400
+                if batch.transaction and (failed or db.aborted):
+                    await AsyncSession.rollback(db)
+                    committed = False
+                    results.extend(_skipped(len(batch.requests) - index - 1))
+                    break
+                if failed:
+                    # Leave nothing half-done in the session for the next request
+                    await db.rollback()
+            else:
+                if batch.transaction:
+                    await AsyncSession.commit(db)
+    finally:
+        database.shared_session.reset(token)
+        await db.close()
+    return {"results": results, "committed": committed}
@@ -1,54 +1,113 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from typing import List, Optional
 from .. import models
 from .. import schema as schemas 
-from app.database import get_db
+from app.database import get_async_db
+from app.utils import live_feed, notifications
+from app.utils.comment_stats import add_comment, lock_response, preview_entry, record_comment_removed
+from app.utils.notifications import notification_queue
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, page_from_rows, paginate
 
 router = APIRouter(prefix="/comment", tags=["comment"])
 
+MAX_BATCH_RESPONSES = 100
+NOTIFICATION_SNIPPET_LENGTH = 200
+
 # Endpoint to create a new comment
 @router.post("/{response_id}", response_model=schemas.CommentResponse, status_code=status.HTTP_201_CREATED)
-async def create_comment(response_id: int, comment: schemas.CommentCreate, db: Session = Depends(get_db)):
-    # Check if the response exists
-    response = db.query(models.Response).filter(models.Response.id == response_id).first()
-    if not response:
-        raise HTTPException(status_code=404, detail="Response not found") 
+async def create_comment(response_id: int, comment: schemas.CommentCreate, db: AsyncSession = Depends(get_async_db)):
+    # One statement on Postgres: the insert and the response's comment stats
+    try:
+        added = await add_comment(db, response_id, comment.user_id, comment.content)
+    except LookupError as missing:
+        detail = "Response not found" if missing.args[0] == "response" else "User not found"
+        raise HTTPException(status_code=404, detail=detail)
+    await db.commit()
 
-    # Check if the user exists
-    user = db.query(models.User).filter(models.User.id == comment.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    db_comment = added.comment
+    if added.owner_id != db_comment.user_id:
+        # Written in bulk by the notification queue, off the request path
+        notification_queue.enqueue(
+            added.owner_id,
+            notifications.COMMENT,
+            content=db_comment.content[:NOTIFICATION_SNIPPET_LENGTH],
+            prompt_id=added.prompt_id,
+            response_id=response_id,
+            comment_id=db_comment.id,
+        )
+    await live_feed.publish_for_prompt(added.prompt_id, live_feed.COMMENT, {
+        "response_id": response_id,
+        "comment_count": added.comment_count,
+        "comment": preview_entry(db_comment),
+    })
+    return db_comment
+
+# Endpoint to get the first comments of several responses at once
+@router.get("/batch", response_model=List[schemas.CommentGroup])
+async def get_comments_batch(response_ids: str = Query(..., description="Comma-separated response ids"), limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    try:
+        ids = list(dict.fromkeys(int(value) for value in response_ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="response_ids must be comma-separated integers")
+    if not ids or len(ids) > MAX_BATCH_RESPONSES:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_BATCH_RESPONSES} response ids")
 
-    # Create a new Comment object
-    db_comment = models.Comment(
-        content=comment.content,
-        user_id=comment.user_id,
-        response_id=response_id
+    # One query: number each response's comments oldest first and keep limit + 1 of them
+    rank = func.row_number().over(
+        partition_by=models.Comment.response_id,
+        order_by=(models.Comment.created_at, models.Comment.id),
+    ).label("rank")
+    ranked = select(models.Comment, rank).where(models.Comment.response_id.in_(ids)).subquery()
+    comment = aliased(models.Comment, ranked)
+    result = await db.execute(
+        select(comment)
+        .where(ranked.c.rank <= limit + 1)
+        .order_by(ranked.c.response_id, ranked.c.rank)
     )
+    rows = {response_id: [] for response_id in ids}
+    for db_comment in result.scalars():
+        rows[db_comment.response_id].append(db_comment)
 
-    # Ensure the session is valid before operations
-    try:
-        db.add(db_comment)
-        db.commit()
-        db.refresh(db_comment)
-        return db_comment
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    # Each group's next_cursor continues in GET /comment/response/{response_id}
+    columns = [models.Comment.created_at, models.Comment.id]
+    return [
+        {"response_id": response_id, **page_from_rows(group, columns, limit)}
+        for response_id, group in rows.items()
+    ]
+
+# Endpoint to delete a comment
+@router.delete("/{comment_id}", status_code=status.HTTP_200_OK)
+async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_comment = await db.get(models.Comment, comment_id)
+    if not db_comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    response = await lock_response(db, db_comment.response_id)
+    await db.delete(db_comment)
+    await db.flush()
+    if response:
+        await record_comment_removed(db, response, db_comment)
+    await db.commit()
+    return {"message": "Deleted Comment"}
 
 # Endpoint to get comments for a specific response
-@router.get("/response/{response_id}", response_model=List[schemas.CommentResponse])
-async def get_comments_by_response(response_id: int, db: Session = Depends(get_db)):
+@router.get("/response/{response_id}", response_model=schemas.Page[schemas.CommentResponse])
+async def get_comments_by_response(response_id: int, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
     # Check if response exists first
-    response = db.query(models.Response).filter(models.Response.id == response_id).first()
+    response = await db.get(models.Response, response_id)
     if not response:
         raise HTTPException(status_code=404, detail="No comments found for this response")
     
-    # Return comments (empty list if none found)
+    # Return comments oldest first (empty page if none found)
     try:
-        comments = db.query(models.Comment).filter(models.Comment.response_id == response_id).all()
-        return comments  # This will be an empty list if no comments
+        stmt = select(models.Comment).filter(models.Comment.response_id == response_id)
+        columns = [models.Comment.created_at, models.Comment.id]
+        return await paginate(db, stmt, columns, cursor, limit, descending=False)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
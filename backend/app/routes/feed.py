@@ -0,0 +1,90 @@
+import json
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from .. import models
+from .. import schema as schemas
+from ..database import get_async_db
+from ..utils import live_feed
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, page_from_rows
+from ..utils.user_cache import get_user_by_id
+
+router = APIRouter(prefix="/feed", tags=["feed"])
+
+FEED_KEY = [models.Response.date, models.Response.id]
+
+
+def feed_item(response: models.Response, username: str) -> dict:
+    return {
+        "id": response.id,
+        "content": response.content,
+        "image": response.image,
+        "prompt_id": response.prompt_id,
+        "anonymous": bool(response.anonymous),
+        "date": response.date,
+        "likes": response.likes or 0,
+        "comment_count": response.comment_count,
+        "comment_preview": response.comment_preview,
+        "author": None if response.anonymous else {"id": response.user_id, "username": username},
+    }
+
+
+async def publish_response(db: AsyncSession, response: models.Response):
+    """Push a new response to live clients if it belongs to the current prompt."""
+    if not live_feed.has_audience():
+        return
+    author = None if response.anonymous else await get_user_by_id(db, response.user_id)
+    await live_feed.publish_for_prompt(response.prompt_id, live_feed.RESPONSE, feed_item(response, author.username if author else None))
+
+
+def sse_event(message: dict) -> str:
+    return f"event: {message['type']}\ndata: {json.dumps(message.get('data'), separators=(',', ':'))}\n\n"
+
+
+def current_feed_query():
+    """Responses to the active prompt with the author's name."""
+    active_prompt = select(models.Prompt.id).where(models.Prompt.is_active == True).scalar_subquery()
+    return (
+        select(models.Response, models.User.username)
+        .join(models.User, models.User.id == models.Response.user_id)
+        .where(models.Response.prompt_id == active_prompt)
+    )
+
+
+# One query per page instead of a user and a comment request per post
+@router.get("/current", response_model=schemas.Page[schemas.FeedItem])
+async def read_current_feed(cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(apply_keyset(current_feed_query(), FEED_KEY, cursor, limit))
+    page = page_from_rows(result.all(), FEED_KEY, limit, key=lambda row: [row.Response.date, row.Response.id])
+    page["items"] = [feed_item(*row) for row in page["items"]]
+    return page
+
+# Pushes new responses, comments and like deltas for the current prompt;
+# replaces polling the list endpoints
+@router.get("/live")
+async def stream_live_feed():
+    async def events():
+        # Clients reconnect on their own after a drop; refetch /feed/current on "overflow"
+        yield "retry: 5000\n\n"
+        async for message in live_feed.follow():
+            yield ": ping\n\n" if message is None else sse_event(message)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Same stream for clients without EventSource (React Native)
+@router.websocket("/live/ws")
+async def live_feed_socket(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        async for message in live_feed.follow():
+            await websocket.send_json(message or {"type": "ping"})
+    except WebSocketDisconnect:
+        return
+    # Fell behind; the client should refetch and reconnect
+    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
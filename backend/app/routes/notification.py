@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from .. import models
+from .. import schema as schemas
+from ..database import get_async_db
+from ..utils.notifications import unread_counts
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from .auth import get_current_user
+
+router = APIRouter(
+    prefix="/notification",
+    tags=["notification"]
+)
+
+MAX_MARK_READ_IDS = 500
+
+# The caller's notifications, newest first
+@router.get("/", response_model=schemas.Page[schemas.NotificationResponse])
+async def read_notifications(cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), unread_only: bool = False, current_user: schemas.TokenData = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    stmt = select(models.Notification).where(models.Notification.user_id == current_user.id)
+    if unread_only:
+        stmt = stmt.where(models.Notification.is_read == False)
+    columns = [models.Notification.created_at, models.Notification.id]
+    return await paginate(db, stmt, columns, cursor, limit)
+
+@router.get("/unread-count", response_model=schemas.UnreadCount)
+async def read_unread_count(current_user: schemas.TokenData = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    return {"unread": await unread_counts.get(db, current_user.id)}
+
+# Mark several (or all) notifications read in one statement
+@router.post("/read", response_model=schemas.MarkReadResult)
+async def mark_notifications_read(body: schemas.NotificationMarkRead, current_user: schemas.TokenData = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    if not body.all and not body.ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass notification ids or all=true"
+        )
+    if len(body.ids) > MAX_MARK_READ_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_MARK_READ_IDS} ids per request"
+        )
+
+    stmt = (
+        update(models.Notification)
+        .where(models.Notification.user_id == current_user.id, models.Notification.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    )
+    if not body.all:
+        stmt = stmt.where(models.Notification.id.in_(body.ids))
+    result = await db.execute(stmt)
+    await db.commit()
+
+    updated = max(result.rowcount, 0)
+    unread_counts.add(current_user.id, -updated)
+    return {"updated": updated, "unread": await unread_counts.get(db, current_user.id)}
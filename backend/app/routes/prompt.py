@@ -1,85 +1,125 @@
 # routes/users.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .. import models
 from .. import schema as schemas 
-from ..database import get_db
-from ..utils.prompt_generator import generate_prompt
+from ..database import get_async_db
+from ..utils import live_feed, purge
+from ..utils.current_prompt import CachedPrompt, current_prompt, current_prompt_max_age
+from ..utils.notifications import fan_out_prompt, unread_counts
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from ..utils.prompt_generator import generate_stub_prompt
+from ..utils.prompt_index import prompt_index
+from ..utils.prompt_pool import prompt_pool
+from ..utils.prompt_scheduler import lock_rollover, prompt_scheduler
 
 router = APIRouter(
     prefix="/prompt",
     tags=["prompt"]
 )
 
+async def announce_activation(db_prompt: models.Prompt):
+    """After committing a manual activation: what the scheduler's rollover does for its own."""
+    current_prompt.invalidate()
+    unread_counts.clear()
+    await live_feed.publish(live_feed.PROMPT, CachedPrompt(db_prompt).item)
+
 # Create prompt
 @router.post("/", response_model=schemas.PromptResponse, status_code=status.HTTP_201_CREATED)
-def create_prompt(prompt: schemas.PromptCreate, db: Session = Depends(get_db)):
+async def create_prompt(prompt: schemas.PromptCreate, db: AsyncSession = Depends(get_async_db)):
+
+    # Pre-generated by the pool refiller; the stub covers an empty pool
+    content = await prompt_pool.pop(db) or prompt_index.pick(generate_stub_prompt)
 
     db_prompt = models.Prompt(
-        content=generate_prompt(),
+        content=content,
         scheduled_for=prompt.scheduled_for,
         is_active=prompt.is_active
 
     )
     
+    if db_prompt.is_active:
+        # Waits out a scheduler rollover instead of racing it into the unique index
+        await lock_rollover(db)
     db.add(db_prompt)
-    db.commit()
-    db.refresh(db_prompt)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # uq_prompts_single_active, as in update_prompt_on
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Another prompt is already active"
+        )
+    if db_prompt.is_active:
+        await fan_out_prompt(db, db_prompt)
+    await db.commit()
+    await db.refresh(db_prompt)
+    prompt_index.add(content)
+    if db_prompt.is_active:
+        await announce_activation(db_prompt)
+    elif db_prompt.scheduled_for is not None:
+        prompt_scheduler.schedule(db_prompt.id, db_prompt.scheduled_for)
 
     return db_prompt
 
 # Read all prompts
-@router.get("/", response_model=List[schemas.PromptResponse])
-def read_prompts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    prompts = db.query(models.Prompt).offset(skip).limit(limit).all()
-    return prompts
+@router.get("/", response_model=schemas.Page[schemas.PromptResponse])
+async def read_prompts(cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    return await paginate(db, select(models.Prompt), [models.Prompt.created_at, models.Prompt.id], cursor, limit)
 
 #gets the current prompt
 @router.get("/current", response_model=List[schemas.PromptResponse])
-def read_current_prompts(skip: int = 0, limit: int = 1, db: Session = Depends(get_db)):
-    prompts = (
-    db.query(models.Prompt)
-    .filter(models.Prompt.is_active == True)
-    .order_by(models.Prompt.id.desc())
-    .offset(skip)
-    .limit(limit)
-    .all()
-)
-
-    return prompts
+async def read_current_prompts(request: Request, skip: int = 0, limit: int = 1):
+    # Served from memory; at most one prompt is active so skip/limit just slice it
+    cached = await current_prompt.get()
+    headers = {"ETag": cached.etag, "Cache-Control": f"public, max-age={current_prompt_max_age()}"}
+    if skip == 0 and limit >= 1:
+        if cached.etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+    return []
 
 # Turn prompt activity on
 @router.put("/on/{prompt_id}", response_model=schemas.PromptResponse)
-def update_prompt_on(prompt_id: int, db: Session = Depends(get_db)):
-    db_prompt = db.query(models.Prompt).filter(models.Prompt.id == prompt_id).first()
+async def update_prompt_on(prompt_id: int, db: AsyncSession = Depends(get_async_db)):
+    # uq_prompts_single_active rejects a second active prompt, so there is no
+    # window between checking for one and activating this one. The rollover
+    # lock queues this behind a scheduler flip already in progress.
+    await lock_rollover(db)
+    stmt = (
+        update(models.Prompt)
+        .where(models.Prompt.id == prompt_id)
+        .values(is_active=True)
+        .returning(models.Prompt)
+    )
+    try:
+        db_prompt = (await db.scalars(stmt)).one_or_none()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Another prompt is already active"
+        )
     if db_prompt is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
 
-    # Ensure no active prompt exists before making this one active
-    existing_prompt = db.query(models.Prompt).filter(
-        models.Prompt.is_active == True
-    ).first()
-
-    if existing_prompt:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Another prompt is already active"
-        )
-
-    # Activate the prompt
-    db_prompt.is_active = True
-    db.commit()
-    db.refresh(db_prompt)
+    await fan_out_prompt(db, db_prompt)
+    await db.commit()
+    await announce_activation(db_prompt)
     return db_prompt
 
 
 @router.put("/off/{prompt_id}", response_model=schemas.PromptResponse)
-def update_prompt_off(prompt_id: int, db: Session = Depends(get_db)):
-    db_prompt = db.query(models.Prompt).filter(models.Prompt.id == prompt_id).first()
+async def update_prompt_off(prompt_id: int, db: AsyncSession = Depends(get_async_db)):
+    await lock_rollover(db)
+    db_prompt = await db.get(models.Prompt, prompt_id)
     if db_prompt is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -88,20 +128,23 @@ def update_prompt_off(prompt_id: int, db: Session = Depends(get_db)):
 
     # Deactivate the prompt
     db_prompt.is_active = False
-    db.commit()
-    db.refresh(db_prompt)
+    await db.commit()
+    await db.refresh(db_prompt)
+    current_prompt.invalidate()
     return db_prompt
 
 # Delete user
 @router.delete("/{prompt_id}", status_code=status.HTTP_200_OK)
-def delete_prompt(prompt_id: int, db: Session = Depends(get_db)):
-    db_prompt = db.query(models.Prompt).filter(models.Prompt.id == prompt_id).first()
-    if db_prompt is None:
+async def delete_prompt(prompt_id: int, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # Responses cascade in the database; popular prompts are purged in the background
+    outcome = await purge.delete_or_schedule(db, purge.PROMPT, prompt_id)
+    if outcome is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prompt not found"
         )
-    
-    db.delete(db_prompt)
-    db.commit()
+    current_prompt.invalidate()
+    if outcome == purge.SCHEDULED:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message":"Prompt deletion scheduled"}
     return {"message":"Deleted Prompt"}
\ No newline at end of file
@@ -1,11 +1,16 @@
 # routes/users.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .. import models
 from .. import schema as schemas 
-from ..database import get_db
-import hashlib, os
+from ..database import dialect_insert, get_async_db
+from ..utils.like_counter import like_counter
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from .auth import get_current_user
+from .feed import publish_response
 
 router = APIRouter(
     prefix="/response",
@@ -14,96 +19,143 @@ router = APIRouter(
 
 # Create response
 @router.post("/{user_id}", response_model=schemas.ResponseResponse, status_code=status.HTTP_201_CREATED)
-def create_response(response: schemas.ResponseCreate, user_id: int, db: Session = Depends(get_db)):
+async def create_response(response: schemas.ResponseCreate, user_id: int, db: AsyncSession = Depends(get_async_db)):
     """Create a new response for a prompt by the user."""
     
-    # Check if the user has already responded to this prompt
-    existing_response = db.query(models.Response).filter(
-        (models.Response.prompt_id == response.prompt_id) & 
-        (models.Response.user_id == user_id)
-    ).first()
+    # uq_responses_user_id_prompt_id rejects a second response to the same prompt
+    stmt = (
+        dialect_insert(db, models.Response)
+        .values(
+            prompt_id=response.prompt_id,
+            user_id=user_id,
+            content=response.content,
+            anonymous=response.anonymous,
+            image=response.image if response.image else None
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "prompt_id"])
+        .returning(models.Response)
+    )
+    try:
+        new_response = (await db.scalars(stmt)).one_or_none()
+    except IntegrityError:
+        # Foreign key or NOT NULL violation
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User or prompt not found."
+        )
     
-    if existing_response:
+    if new_response is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User has already responded to this prompt."
         )
-    
-    # Create the new response
-    new_response = models.Response(
-        prompt_id=response.prompt_id,
-        user_id=user_id,
-        content=response.content,
-        anonymous=response.anonymous,
-        image=response.image if response.image else None
-    )
-
-    db.add(new_response)
-    db.commit()
-    db.refresh(new_response)
+    await db.commit()
+    await publish_response(db, new_response)
 
     return new_response
 
 
 # Read all responses from a user
-@router.get("/{user_id}", response_model=List[schemas.ResponseResponse])
-def read_responses(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    responses = db.query(models.Response).filter(models.Response.user_id == user_id).offset(skip).limit(limit).all()
-    return responses
+@router.get("/{user_id}", response_model=schemas.Page[schemas.ResponseResponse])
+async def read_responses(user_id: int, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    stmt = select(models.Response).filter(models.Response.user_id == user_id)
+    return await paginate(db, stmt, [models.Response.date, models.Response.id], cursor, limit)
 
 # Read all responses by prompt
-@router.get("/prompt/{prompt_id}", response_model=List[schemas.ResponseResponse])
-def read_responses(prompt_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    responses = db.query(models.Response).filter(models.Response.prompt_id == prompt_id).offset(skip).limit(limit).all()
-    return responses
+@router.get("/prompt/{prompt_id}", response_model=schemas.Page[schemas.ResponseResponse])
+async def read_responses(prompt_id: int, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    stmt = select(models.Response).filter(models.Response.prompt_id == prompt_id)
+    return await paginate(db, stmt, [models.Response.date, models.Response.id], cursor, limit)
 
 # Update user's response
 @router.put("/{user_id}/{prompt_id}", response_model=List[schemas.ResponseResponse])
-def update_response(user_id: int, prompt_id: int, response: schemas.ResponseCreate, db: Session = Depends(get_db)):
-    # Check if the user has already responded to this prompt
-    existing_response = db.query(models.Response).filter(
-        (models.Response.prompt_id == prompt_id) & 
-        (models.Response.user_id == user_id) 
-    ).first()
-    
-    if not existing_response:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Response not found."
-        )
-    
-    if not any([response.content, response.anonymous is not None, response.likes is not None, response.image is not None]):
+async def update_response(user_id: int, prompt_id: int, response: schemas.ResponseCreate, db: AsyncSession = Depends(get_async_db)):
+    if not any([response.content, response.anonymous is not None, response.image is not None]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="At least one field (content, anonymous, likes, image) must be provided."
+            detail="At least one field (content, anonymous, image) must be provided."
         )
     
     # Update fields only if provided in the request
+    changes = {}
     if response.content:
-        existing_response.content = response.content
+        changes["content"] = response.content
     if response.anonymous is not None: 
-        existing_response.anonymous = response.anonymous
+        changes["anonymous"] = response.anonymous
     if response.image is not None: 
-        existing_response.image = response.image
-    if response.likes is not None: 
-        existing_response.likes = response.likes
+        changes["image"] = response.image
 
-    db.commit()
-    db.refresh(existing_response)
+    stmt = (
+        update(models.Response)
+        .where((models.Response.prompt_id == prompt_id) & (models.Response.user_id == user_id))
+        .values(**changes)
+        .returning(models.Response)
+    )
+    existing_response = (await db.scalars(stmt)).one_or_none()
+    if existing_response is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Response not found."
+        )
+    await db.commit()
 
     return [existing_response]
 
 
+# Like a response; liking twice is a no-op
+@router.post("/{response_id}/like", status_code=status.HTTP_200_OK)
+async def like_response(response_id: int, current_user: schemas.TokenData = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    stmt = (
+        dialect_insert(db, models.ResponseLike)
+        .values(user_id=current_user.id, response_id=response_id)
+        .on_conflict_do_nothing()
+        .returning(models.ResponseLike.response_id)
+    )
+    try:
+        inserted = (await db.execute(stmt)).scalar_one_or_none()
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Response not found"
+        )
+
+    # The ledger row is committed; the counter catches up on the next flush
+    if inserted is not None:
+        like_counter.add(response_id, 1)
+    return {"response_id": response_id, "liked": True}
+
+# Remove a like
+@router.delete("/{response_id}/like", status_code=status.HTTP_200_OK)
+async def unlike_response(response_id: int, current_user: schemas.TokenData = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    stmt = (
+        delete(models.ResponseLike)
+        .where(
+            (models.ResponseLike.user_id == current_user.id)
+            & (models.ResponseLike.response_id == response_id)
+        )
+        .returning(models.ResponseLike.response_id)
+    )
+    deleted = (await db.execute(stmt)).scalar_one_or_none()
+    await db.commit()
+
+    if deleted is not None:
+        like_counter.add(response_id, -1)
+    return {"response_id": response_id, "liked": False}
+
+
 # Delete user
 @router.delete("/{response_id}", status_code=status.HTTP_200_OK)
-def delete_user(response_id: int, db: Session = Depends(get_db)):
-    db_response = db.query(models.Response).filter(models.Response.id == response_id).first()
-    if db_response is None:
+async def delete_user(response_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Comments, likes and notifications go with it via ON DELETE CASCADE
+    stmt = delete(models.Response).where(models.Response.id == response_id).returning(models.Response.id)
+    if (await db.execute(stmt)).scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Response not found"
         )
-    
-    db.delete(db_response)
-    db.commit()
+    await db.commit()
     return {"message":"Deleted Response"}
\ No newline at end of file
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from .. import schema as schemas
+from ..database import get_async_db
+from ..utils import sync
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+RESYNC = "Reload everything, then sync again without a token"
+
+# Everything that changed since the client's last sync. Without a token this
+# only issues one: fetch it before the initial full load so nothing slips between.
+@router.get("/", response_model=schemas.SyncResponse)
+async def read_changes(since: Optional[str] = None, prompt_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db)):
+    if since is None:
+        return {"token": sync.encode_token(await sync.watermark(db))}
+    try:
+        after = sync.decode_token(since)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    except sync.ExpiredToken:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Sync token expired. {RESYNC}"
+        )
+
+    # Read before the changes so anything committing meanwhile is picked up next time
+    token = sync.encode_token(await sync.watermark(db))
+    try:
+        changed, deleted = await sync.changes(db, after, prompt_id)
+    except OverflowError:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Too many changes to sync. {RESYNC}"
+        )
+    return {"token": token, **changed, "deleted": deleted}
@@ -1,64 +1,74 @@
 # routes/users.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .. import models
 from .. import schema as schemas 
-from ..database import get_db
-import hashlib, os
+from ..database import dialect_insert, get_async_db
+from ..utils import hasher, purge, refresh_tokens, token_versions
+from ..utils.hash_pool import hash_pool
+from ..utils.loaders import Loaders, get_loaders
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from ..utils.user_cache import get_user_by_id, get_user_by_username, user_cache
 
 router = APIRouter(
     prefix="/user",
     tags=["user"]
 )
 
+MAX_BATCH_USERS = 100
+
 # Create user
 @router.post("/", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    # Check if user with this username or email already exists
-    existing_user = db.query(models.User).filter(
-        (models.User.username == user.username) | (models.User.email == user.email)
-    ).first()
-    
-    if existing_user:
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    stored_password = await hash_pool.run(hasher.hash_password, user.password)
+
+    # The unique indexes on username and email do the duplicate check, so two
+    # concurrent signups for the same name can't both get through
+    stmt = (
+        dialect_insert(db, models.User)
+        .values(username=user.username, email=user.email, password=stored_password)
+        .on_conflict_do_nothing()
+        .returning(models.User)
+    )
+    db_user = (await db.scalars(stmt)).one_or_none()
+    if db_user is None:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered"
         )
-    salt = os.urandom(32) 
-    password_bytes = user.password.encode()
-    
-    hashed_password = hashlib.pbkdf2_hmac(
-        'sha256',
-        password_bytes,
-        salt,
-        100
-    )
-
-    stored_password = salt.hex() + ':' + hashed_password.hex()
-    
-    db_user = models.User(
-        username=user.username,
-        email=user.email,
-        password=stored_password
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
 
     return db_user
 
 # Read all users
-@router.get("/", response_model=List[schemas.UserResponse])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+@router.get("/", response_model=schemas.Page[schemas.UserResponse])
+async def read_users(cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    # Users have no creation timestamp, so the id alone orders them
+    return await paginate(db, select(models.User).where(models.User.deleted_at.is_(None)), [models.User.id], cursor, limit, descending=False)
+
+# Several users in one request, e.g. the authors on a screen of comments.
+# Declared before /{user_id} so "batch" is not taken for an id.
+@router.get("/batch", response_model=List[schemas.UserSummary])
+async def read_users_batch(ids: str = Query(..., description="Comma-separated user ids"), loaders: Loaders = Depends(get_loaders)):
+    try:
+        user_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not user_ids or len(user_ids) > MAX_BATCH_USERS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_BATCH_USERS} user ids")
+
+    # Requested order; ids with no user are left out
+    users = await loaders.users.load_many(user_ids)
+    return [user for user in users if user is not None]
 
 # Read user by ID
 @router.get("/{user_id}", response_model=schemas.UserResponse)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def read_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user_by_id(db, user_id)
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,80 +79,73 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
 
 # Update user
 @router.put("/{user_id}", response_model=schemas.UserResponse)
-def update_user(user_id: int, user: schemas.UserBase, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_user(user_id: int, user: schemas.UserBase, db: AsyncSession = Depends(get_async_db)):
+    stmt = (
+        update(models.User)
+        .where(models.User.id == user_id, models.User.deleted_at.is_(None))
+        .values(username=user.username, email=user.email)
+        .returning(models.User)
+    )
+    try:
+        db_user = (await db.scalars(stmt)).one_or_none()
+    except IntegrityError:
+        # Unique index on username or email
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already exists"
+        )
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    # Check if updating to an existing username or email
-    existing_user = db.query(models.User).filter(
-        ((models.User.username == user.username) | (models.User.email == user.email)) &
-        (models.User.id != user_id)
-    ).first()
-    
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username or email already exists"
-        )
-    
-    # Update user fields
-    db_user.username = user.username
-    db_user.email = user.email
-    
-    db.commit()
-    db.refresh(db_user)
+
+    await db.commit()
+    user_cache.invalidate(user_id)
     return db_user
 
 # Update user password
 @router.put("/forgot/{user_id}", response_model=schemas.UserResponse)
-def reset_password(user_id: int, password_data: schemas.PasswordReset, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if db_user is None:
+async def reset_password(user_id: int, password_data: schemas.PasswordReset, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.get(models.User, user_id)
+    if db_user is None or db_user.deleted_at is not None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    salt = os.urandom(32) 
-    password_bytes = password_data.new_password.encode()
-    
-    hashed_password = hashlib.pbkdf2_hmac(
-        'sha256',
-        password_bytes,
-        salt,
-        100
-    )
-
-    stored_password = salt.hex() + ':' + hashed_password.hex()
+    stored_password = await hash_pool.run(hasher.hash_password, password_data.new_password)
     
-    # Update password
+    # Update password and revoke tokens issued with the old one
     db_user.password = stored_password
+    await token_versions.bump_version(db, user_id)
+    await refresh_tokens.revoke_all(db, user_id)
     
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    user_cache.invalidate(user_id)
     return db_user
 
 # Delete user
 @router.delete("/{user_id}", status_code=status.HTTP_200_OK)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
-    if db_user is None:
+async def delete_user(user_id: int, response: Response, db: AsyncSession = Depends(get_async_db)):
+    # Children cascade in the database; prolific users are purged in the background
+    outcome = await purge.delete_or_schedule(db, purge.USER, user_id)
+    if outcome is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    
-    db.delete(db_user)
-    db.commit()
+    user_cache.invalidate(user_id)
+    if outcome == purge.SCHEDULED:
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message":"User deletion scheduled"}
     return {"message":"Deleted User"}
 
 @router.get("/username/{username}", response_model=schemas.UserResponse)
-def read_user_by_username(username: str, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.username == username).first()
+async def read_user_by_username(username: str, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user_by_username(db, username)
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,7 +1,14 @@
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict
+from typing import Any, Generic, List, Literal, Optional, Dict, TypeVar
 from datetime import datetime
 
+T = TypeVar("T")
+
+# Envelope for cursor-paginated list endpoints
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 # User schemas
 class UserBase(BaseModel):
     username: str
@@ -20,6 +27,12 @@ class UserResponse(UserBase):
     class Config:
         orm_mode = True
 
+class UserSummary(UserBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
 # Prompt schemas
 class PromptBase(BaseModel):
     content: Optional[str] = None
@@ -46,19 +59,43 @@ class ResponseCreate(ResponseBase):
     prompt_id: Optional[int] = None  
     anonymous: Optional[bool] = None  
     image: Optional[str] = None      
-    likes: Optional[int] = None     
 
 
+class CommentPreview(BaseModel):
+    id: int
+    user_id: int
+    content: str
+    created_at: Optional[datetime] = None
+
 class ResponseResponse(ResponseBase):
     id: int
     user_id: int
     prompt_id: int
     likes: int
+    comment_count: int = 0
+    comment_preview: List[CommentPreview] = []
     
     class Config:
         orm_mode = True
 
 
+# Feed schemas
+class FeedAuthor(BaseModel):
+    id: int
+    username: str
+
+class FeedItem(ResponseBase):
+    id: int
+    prompt_id: int
+    anonymous: bool = False
+    date: datetime
+    likes: int
+    comment_count: int
+    comment_preview: List[CommentPreview] = []
+    # None for anonymous responses
+    author: Optional[FeedAuthor] = None
+
+
 # Comment schemas
 class CommentBase(BaseModel):
     content: str
@@ -75,6 +112,10 @@ class CommentResponse(CommentBase):
     class Config:
         orm_mode = True
 
+# First page of one response's comments in a batch fetch
+class CommentGroup(Page[CommentResponse]):
+    response_id: int
+
 # Notification schemas
 class NotificationBase(BaseModel):
     type: str
@@ -95,6 +136,48 @@ class NotificationResponse(NotificationBase):
     class Config:
         orm_mode = True
 
+# Either specific notifications or all of the caller's unread ones
+class NotificationMarkRead(BaseModel):
+    ids: List[int] = []
+    all: bool = False
+
+class UnreadCount(BaseModel):
+    unread: int
+
+class MarkReadResult(UnreadCount):
+    updated: int
+
+# Delta sync
+class SyncDeleted(BaseModel):
+    prompts: List[int] = []
+    responses: List[int] = []
+    comments: List[int] = []
+
+class SyncResponse(BaseModel):
+    token: str
+    prompts: List[PromptResponse] = []
+    responses: List[ResponseResponse] = []
+    comments: List[CommentResponse] = []
+    deleted: SyncDeleted = SyncDeleted()
+
+class BatchOperation(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+    path: str
+    body: Optional[Any] = None
+    headers: Optional[Dict[str, str]] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchOperation]
+    transaction: bool = False
+
+class BatchResult(BaseModel):
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+    committed: bool
+
 class UserLogin(BaseModel):
     username: str  # This can be either username or email
     password: str
@@ -102,9 +185,16 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenWithUser(Token):
-    user: UserResponse
+    user: UserSummary
 
 class TokenData(BaseModel):
-    username: Optional[str] = None
\ No newline at end of file
+    username: Optional[str] = None
+    id: Optional[int] = None
+    email: Optional[str] = None
+    token_version: Optional[int] = None
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""In-process pub/sub for pushing live updates to connected clients.
+
+Each subscriber gets a bounded queue. Publishing never waits on a client: a
+subscriber whose queue is full has fallen behind, so it is dropped and gets
+an ``OVERFLOW`` marker. Its connection then tells the client to refetch and
+closes, instead of buffering without limit for a phone in a tunnel.
+
+Messages travel through a backend so every API worker sees every publish:
+
+* ``memory`` (default) delivers within this process only, which is all a
+  single worker needs;
+* ``postgres`` relays through ``LISTEN``/``NOTIFY`` on one dedicated
+  connection per worker, so no extra infrastructure is required.
+
+Pick one with ``BROADCAST_BACKEND``. A new backend needs ``connect``,
+``publish``, ``close`` and a ``shared`` flag saying whether other workers
+may have subscribers.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", 100))
+# NOTIFY payloads must stay under 8000 bytes
+PG_NOTIFY_CHANNEL = "sonder_broadcast"
+PG_NOTIFY_MAX_BYTES = 7_900
+
+OVERFLOW = {"type": "overflow"}
+
+Deliver = Callable[[str, dict], None]
+
+
+class Subscription:
+    def __init__(self, channel: str, size: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(size)
+        self.overflowed = False
+
+    def offer(self, message: dict) -> bool:
+        """Queue a message; returns False once this subscriber has been dropped for lagging."""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Nothing queued is worth sending once the client has to resync anyway
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+            return False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next message, or None if nothing arrived within ``timeout``."""
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class MemoryBackend:
+    # Subscribers are all in this process
+    shared = False
+
+    async def connect(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def publish(self, channel: str, message: dict):
+        self._deliver(channel, message)
+
+    async def close(self):
+        pass
+
+
+class PostgresBackend:
+    """Relays messages between workers with LISTEN/NOTIFY."""
+
+    shared = True
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._conn = None
+        # asyncpg runs one operation per connection at a time
+        self._lock = asyncio.Lock()
+
+    async def connect(self, deliver: Deliver):
+        import asyncpg
+
+        def on_notify(connection, pid, pg_channel, payload):
+            try:
+                envelope = json.loads(payload)
+                deliver(envelope["channel"], envelope["message"])
+            except Exception:
+                logger.exception("Dropping malformed broadcast payload")
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(PG_NOTIFY_CHANNEL, on_notify)
+
+    async def publish(self, channel: str, message: dict):
+        payload = json.dumps({"channel": channel, "message": message}, default=str, separators=(",", ":"))
+        if len(payload.encode()) > PG_NOTIFY_MAX_BYTES:
+            # Too big for NOTIFY; send the reference and let clients fetch the rest
+            data = message.get("data") or {}
+            slim = {**message, "data": {"id": data.get("id")}, "partial": True}
+            payload = json.dumps({"channel": channel, "message": slim}, default=str, separators=(",", ":"))
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", PG_NOTIFY_CHANNEL, payload)
+
+    async def close(self):
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+def make_backend(name: str):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "postgres":
+        from .. import database
+        return PostgresBackend(database.SQLALCHEMY_DATABASE_URL)
+    raise ValueError(f"Unknown BROADCAST_BACKEND {name!r}")
+
+
+class Broadcaster:
+    def __init__(self, backend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._connected = False
+
+    def subscribers(self, channel: str) -> int:
+        return len(self._subscribers.get(channel, ()))
+
+    def has_audience(self, channel: str) -> bool:
+        """Whether a publish could reach anyone; lets publishers skip building messages."""
+        return self.backend.shared or self.subscribers(channel) > 0
+
+    def deliver_local(self, channel: str, message: dict):
+        """Hand a message to this worker's subscribers only."""
+        for subscription in list(self._subscribers.get(channel, ())):
+            if not subscription.offer(message):
+                self._subscribers[channel].discard(subscription)
+                self.dropped += 1
+
+    async def publish(self, channel: str, message: dict):
+        """Send to every subscriber on every worker. Never raises; live updates are best effort."""
+        if not self._connected:
+            return
+        try:
+            await self.backend.publish(channel, message)
+        except Exception:
+            logger.exception("Failed to publish to %s", channel)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        subscription = Subscription(channel, self.queue_size)
+        self._subscribers[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    async def start(self):
+        if not self._connected:
+            await self.backend.connect(self.deliver_local)
+            self._connected = True
+
+    async def stop(self):
+        if self._connected:
+            await self.backend.close()
+            self._connected = False
+
+
+broadcaster = Broadcaster(make_backend(BROADCAST_BACKEND), BROADCAST_QUEUE_SIZE)
@@ -0,0 +1,206 @@
+"""Denormalised comment stats kept on each response.
+
+``responses.comment_count`` and ``responses.comment_preview`` (the latest
+``COMMENT_PREVIEW_SIZE`` comments, newest first) let list views show comment
+info without touching the comments table. ``add_comment`` writes a comment
+and its response's stats together: on Postgres in one statement (a
+data-modifying CTE whose ``UPDATE`` row lock serialises concurrent
+commenters), elsewhere by locking the response row first. Removing a comment
+locks the response row and updates both in the same transaction. ``repair`` recomputes them from ``comments`` in id-range
+batches for anything that drifted (bulk deletes, manual SQL)::
+
+    python -m app.utils.comment_stats repair --batch-size 500
+"""
+import argparse
+import asyncio
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database, models
+
+COMMENT_PREVIEW_SIZE = 3
+REPAIR_BATCH_SIZE = 500
+
+
+def preview_entry(comment: models.Comment) -> dict:
+    return {
+        "id": comment.id,
+        "user_id": comment.user_id,
+        "content": comment.content,
+        "created_at": comment.created_at.isoformat() if comment.created_at else None,
+    }
+
+
+async def lock_response(db: AsyncSession, response_id: int) -> Optional[models.Response]:
+    """Load a response FOR UPDATE so concurrent commenters apply their changes in turn."""
+    return await db.get(models.Response, response_id, with_for_update=True, populate_existing=True)
+
+
+def record_comment_added(response: models.Response, comment: models.Comment):
+    response.comment_count = (response.comment_count or 0) + 1
+    response.comment_preview = [preview_entry(comment)] + list(response.comment_preview or [])[:COMMENT_PREVIEW_SIZE - 1]
+
+
+class AddedComment(NamedTuple):
+    comment: models.Comment
+    owner_id: int
+    prompt_id: int
+    comment_count: int
+
+
+# New comment first, then the newest entries already in the preview
+POSTGRES_ADD_COMMENT = text("""
+    WITH new_comment AS (
+        INSERT INTO comments (content, user_id, response_id)
+        VALUES (:content, :user_id, :response_id)
+        RETURNING id, content, user_id, response_id, created_at
+    )
+    UPDATE responses
+    SET comment_count = responses.comment_count + 1,
+        comment_preview = (
+            SELECT json_agg(latest.entry ORDER BY latest.position)
+            FROM (
+                SELECT json_build_object(
+                    'id', id, 'user_id', user_id, 'content', content, 'created_at', created_at
+                ) AS entry, 0 AS position
+                FROM new_comment
+                UNION ALL
+                SELECT old.entry, old.position
+                FROM json_array_elements(responses.comment_preview) WITH ORDINALITY AS old(entry, position)
+                WHERE old.position < :preview_size
+            ) latest
+        )
+    FROM new_comment
+    WHERE responses.id = new_comment.response_id
+    RETURNING new_comment.id, new_comment.content, new_comment.user_id, new_comment.response_id,
+              new_comment.created_at, responses.user_id AS owner_id, responses.prompt_id, responses.comment_count
+""")
+
+
+async def add_comment(db: AsyncSession, response_id: int, user_id: int, content: str) -> AddedComment:
+    """Insert a comment and update its response's stats; LookupError("response"/"user") if either is missing.
+
+    The caller commits. Foreign keys stand in for existence checks.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        params = {"content": content, "user_id": user_id, "response_id": response_id, "preview_size": COMMENT_PREVIEW_SIZE}
+        try:
+            row = (await db.execute(POSTGRES_ADD_COMMENT, params)).one()
+        except IntegrityError as e:
+            await db.rollback()
+            raise LookupError("response" if "comments_response_id_fkey" in str(e.orig) else "user")
+        comment = models.Comment(
+            id=row.id, content=row.content, user_id=row.user_id, response_id=row.response_id, created_at=row.created_at
+        )
+        return AddedComment(comment, row.owner_id, row.prompt_id, row.comment_count)
+
+    # No data-modifying CTEs here (SQLite). Lock first, so commenters update the
+    # stats in turn and the FK check's share lock can't deadlock against ours.
+    response = await lock_response(db, response_id)
+    if response is None:
+        raise LookupError("response")
+    stmt = (
+        insert(models.Comment)
+        .values(content=content, user_id=user_id, response_id=response_id)
+        .returning(models.Comment)
+    )
+    try:
+        comment = (await db.scalars(stmt)).one()
+    except IntegrityError:
+        await db.rollback()
+        raise LookupError("user")
+    record_comment_added(response, comment)
+    return AddedComment(comment, response.user_id, response.prompt_id, response.comment_count)
+
+
+async def record_comment_removed(db: AsyncSession, response: models.Response, comment: models.Comment):
+    """Call after the comment's DELETE has been flushed."""
+    response.comment_count = max((response.comment_count or 0) - 1, 0)
+    if any(entry["id"] == comment.id for entry in response.comment_preview or []):
+        # The preview lost an entry; refill it from the index
+        previews = await latest_comments(db, [response.id])
+        response.comment_preview = previews.get(response.id, [])
+
+
+async def latest_comments(db: AsyncSession, response_ids: Iterable[int], per_response: int = COMMENT_PREVIEW_SIZE) -> dict:
+    """{response_id: [preview entries]} for the newest comments of each response, in one query."""
+    rank = func.row_number().over(
+        partition_by=models.Comment.response_id,
+        order_by=(models.Comment.created_at.desc(), models.Comment.id.desc()),
+    ).label("rank")
+    ranked = select(models.Comment, rank).where(models.Comment.response_id.in_(list(response_ids))).subquery()
+    result = await db.execute(
+        select(ranked)
+        .where(ranked.c.rank <= per_response)
+        .order_by(ranked.c.response_id, ranked.c.rank)
+    )
+    previews = {}
+    for row in result:
+        previews.setdefault(row.response_id, []).append(preview_entry(row))
+    return previews
+
+
+async def recompute(db: AsyncSession, response_ids: List[int]) -> int:
+    """Fix counts and previews for the given responses; returns how many had drifted."""
+    if not response_ids:
+        return 0
+    # Lock first so commenters on these responses wait until the fix is committed
+    result = await db.execute(select(models.Response).where(models.Response.id.in_(response_ids)).with_for_update())
+    responses = result.scalars().all()
+
+    result = await db.execute(
+        select(models.Comment.response_id, func.count())
+        .where(models.Comment.response_id.in_(response_ids))
+        .group_by(models.Comment.response_id)
+    )
+    counts = dict(result.all())
+    previews = await latest_comments(db, response_ids)
+
+    drifted = 0
+    for response in responses:
+        count = counts.get(response.id, 0)
+        preview = previews.get(response.id, [])
+        if response.comment_count != count or (response.comment_preview or []) != preview:
+            response.comment_count = count
+            response.comment_preview = preview
+            drifted += 1
+    return drifted
+
+
+async def repair(batch_size: int = REPAIR_BATCH_SIZE) -> int:
+    """Recompute every response's comment stats, one committed id batch at a time."""
+    drifted = 0
+    last_id = 0
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Response.id)
+                .where(models.Response.id > last_id)
+                .order_by(models.Response.id)
+                .limit(batch_size)
+            )
+            ids = result.scalars().all()
+            if not ids:
+                return drifted
+            drifted += await recompute(db, ids)
+            await db.commit()
+        last_id = ids[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain denormalised comment stats on responses.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    repair_parser = subparsers.add_parser("repair", help="recompute comment_count and comment_preview")
+    repair_parser.add_argument("--batch-size", type=int, default=REPAIR_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "repair":
+        drifted = asyncio.run(repair(args.batch_size))
+        print(f"repaired {drifted} responses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""In-memory copy of the active prompt behind ``GET /prompt/current``.
+
+Every client asks for the current prompt when it opens, so the serialised
+response is kept in memory together with an ETag. Prompt routes invalidate
+it when they change the active prompt, and the scheduler hands the new
+prompt over directly at rollover. ``PROMPT_CACHE_TTL_SECONDS`` bounds
+staleness from changes made by other workers. Reloads are single-flight:
+however many requests miss together, one query runs and the rest await it.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import select
+
+from .. import database, models
+from .. import schema as schemas
+from .prompt_scheduler import prompt_scheduler
+
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", 30))
+# Client-side freshness; shortened near a scheduled rollover
+PROMPT_CACHE_MAX_AGE_SECONDS = int(os.getenv("PROMPT_CACHE_MAX_AGE_SECONDS", 60))
+
+
+class CachedPrompt:
+    def __init__(self, prompt: Optional[models.Prompt]):
+        self.item = schemas.PromptResponse.model_validate(prompt, from_attributes=True).model_dump(mode="json") if prompt else None
+        self.body = json.dumps([self.item] if self.item else []).encode()
+        self.etag = '"%s"' % hashlib.sha1(self.body).hexdigest()[:20]
+
+
+class CurrentPromptCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.loads = 0
+        self._entry: Optional[CachedPrompt] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._inflight = None
+        self._inflight_generation = 0
+
+    async def get(self) -> CachedPrompt:
+        if self._entry is not None and time.monotonic() < self._expires_at:
+            return self._entry
+        if self._inflight is None or self._inflight_generation != self._generation:
+            self._inflight_generation = self._generation
+            self._inflight = asyncio.ensure_future(self._load(self._generation))
+        # Shielded so one cancelled request doesn't cancel the load for everyone
+        return await asyncio.shield(self._inflight)
+
+    async def _load(self, generation: int) -> CachedPrompt:
+        try:
+            self.loads += 1
+            async with database.AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(models.Prompt)
+                    .where(models.Prompt.is_active == True)
+                    .order_by(models.Prompt.id.desc())
+                    .limit(1)
+                )
+                entry = CachedPrompt(result.scalars().first())
+            # An invalidation while we were reading means this result may be stale
+            if generation == self._generation:
+                self._store(entry)
+            return entry
+        finally:
+            if self._inflight is asyncio.current_task():
+                self._inflight = None
+
+    def _store(self, entry: CachedPrompt):
+        self._entry = entry
+        self._expires_at = time.monotonic() + self.ttl
+
+    async def set(self, prompt: models.Prompt):
+        """Install a freshly activated prompt without a reload."""
+        self._generation += 1
+        self._store(CachedPrompt(prompt))
+
+    def invalidate(self):
+        self._generation += 1
+        self._entry = None
+
+
+def current_prompt_max_age() -> int:
+    """max-age that never lets a client hold the prompt past the next scheduled rollover."""
+    upcoming = prompt_scheduler.upcoming()
+    if not upcoming:
+        return PROMPT_CACHE_MAX_AGE_SECONDS
+    until_next = (upcoming[0][0] - datetime.now(timezone.utc)).total_seconds()
+    return max(0, min(PROMPT_CACHE_MAX_AGE_SECONDS, int(until_next)))
+
+
+current_prompt = CurrentPromptCache(PROMPT_CACHE_TTL_SECONDS)
+prompt_scheduler.on_activate(current_prompt.set)
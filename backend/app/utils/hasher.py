@@ -0,0 +1,130 @@
+"""Password hashing with a versioned, self-describing storage format.
+
+Stored passwords look like ``pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>``
+so the cost can be raised later without breaking existing rows. Rows written
+before this format (``<salt hex>:<hash hex>``, 100 iterations) still verify
+and are reported by ``needs_rehash`` so they get upgraded on the next login.
+
+``/password/verify`` takes the stored value from the client, so the cost in
+it is untrusted: anything above ``PASSWORD_HASH_MAX_ITERATIONS`` (by default
+the current cost) is refused rather than hashed. Raise the cap to the old
+cost for a while when lowering ``PASSWORD_HASH_ITERATIONS``.
+
+Pick an iteration count for the current host with:
+
+    python -m app.utils.hasher calibrate --target-ms 250
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import time
+from typing import Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ALGORITHM = "pbkdf2_sha256"
+DEFAULT_ITERATIONS = 600_000
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", DEFAULT_ITERATIONS))
+PASSWORD_HASH_MAX_ITERATIONS = int(os.getenv("PASSWORD_HASH_MAX_ITERATIONS", PASSWORD_HASH_ITERATIONS))
+SALT_BYTES = 32
+
+LEGACY_ALGORITHM = "legacy_pbkdf2_sha256"
+LEGACY_ITERATIONS = 100
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+
+
+def decode(encoded: str) -> Tuple[str, int, bytes, bytes]:
+    """Split a stored password into (algorithm, iterations, salt, hash); ValueError if unusable."""
+    if '$' in encoded:
+        algorithm, iterations, salt_hex, hash_hex = encoded.split('$')
+        iterations = int(iterations)
+        # Bounds the work one verify can cost
+        if iterations != LEGACY_ITERATIONS and not 1 <= iterations <= PASSWORD_HASH_MAX_ITERATIONS:
+            raise ValueError(f"unsupported iteration count {iterations}")
+        return algorithm, iterations, bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
+
+    salt_hex, hash_hex = encoded.split(':')
+    return LEGACY_ALGORITHM, LEGACY_ITERATIONS, bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
+
+
+def encode(iterations: int, salt: bytes, hashed: bytes) -> str:
+    return f"{ALGORITHM}${iterations}${salt.hex()}${hashed.hex()}"
+
+
+def hash_password(password: str, iterations: int = None) -> str:
+    """Hash a password with a fresh salt and return the encoded string."""
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    return encode(iterations, salt, _pbkdf2(password, salt, iterations))
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Check a plain password against any supported stored format."""
+    try:
+        algorithm, iterations, salt, stored_hash = decode(encoded)
+    except (ValueError, AttributeError):
+        return False
+
+    if algorithm not in (ALGORITHM, LEGACY_ALGORITHM):
+        return False
+
+    return hmac.compare_digest(_pbkdf2(password, salt, iterations), stored_hash)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """True when the stored hash uses an old format or a different cost."""
+    try:
+        algorithm, iterations, _, _ = decode(encoded)
+    except (ValueError, AttributeError):
+        return True
+    return algorithm != ALGORITHM or iterations != PASSWORD_HASH_ITERATIONS
+
+
+def time_hash(iterations: int, rounds: int = 3) -> float:
+    """Best-of-N milliseconds to hash one password at the given cost."""
+    salt = os.urandom(SALT_BYTES)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        _pbkdf2("calibration-password", salt, iterations)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def calibrate(target_ms: float, start_iterations: int = 10_000) -> int:
+    """Find the iteration count that costs roughly target_ms on this host."""
+    iterations = start_iterations
+    elapsed = time_hash(iterations)
+    # Grow until the measurement is long enough to extrapolate from
+    while elapsed < min(target_ms, 50):
+        iterations *= 2
+        elapsed = time_hash(iterations)
+
+    iterations = int(iterations * target_ms / elapsed)
+    # Round to a readable number
+    return max(1_000, round(iterations, -3))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Password hasher utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="Pick an iteration count for this host")
+    calibrate_parser.add_argument("--target-ms", type=float, default=250.0, help="Target milliseconds per hash")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "calibrate":
+        iterations = calibrate(args.target_ms)
+        print(f"{iterations} iterations ~ {time_hash(iterations):.1f} ms per hash (target {args.target_ms:.0f} ms)")
+        print(f"PASSWORD_HASH_ITERATIONS={iterations}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Write-behind aggregation of like counts.
+
+The ``response_likes`` ledger is the source of truth for who liked what; the
+``responses.likes`` column is a denormalised counter. Bumping that counter
+inside every like request makes a popular response a row-lock hotspot, so
+deltas are coalesced in memory and flushed every few seconds as one
+``UPDATE responses SET likes = likes + n`` per response; the same deltas go
+out to live feed clients. Counters can lag by up to a flush interval, and
+deltas still pending in a worker that dies are lost. ``repair_counts``
+recomputes a counter from the ledger when that matters.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Dict
+
+from sqlalchemy import bindparam, func, select, update
+
+from .. import database, models
+from . import live_feed
+
+logger = logging.getLogger(__name__)
+
+LIKE_FLUSH_INTERVAL_SECONDS = float(os.getenv("LIKE_FLUSH_INTERVAL_SECONDS", 2))
+
+
+class LikeCounter:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: Dict[int, int] = defaultdict(int)
+        self._task = None
+
+    def add(self, response_id: int, delta: int):
+        self._pending[response_id] += delta
+
+    def pending(self, response_id: int) -> int:
+        return self._pending.get(response_id, 0)
+
+    async def flush(self) -> int:
+        """Write all pending deltas; returns the number of responses touched."""
+        pending = {rid: delta for rid, delta in self._pending.items() if delta}
+        self._pending = defaultdict(int)
+        if not pending:
+            return 0
+
+        # Sorted so concurrent flushes from several workers lock rows in the same order
+        params = [{"rid": rid, "delta": delta} for rid, delta in sorted(pending.items())]
+        responses = models.Response.__table__
+        stmt = (
+            update(responses)
+            .where(responses.c.id == bindparam("rid"))
+            .values(likes=func.coalesce(responses.c.likes, 0) + bindparam("delta"))
+        )
+        try:
+            async with database.AsyncSessionLocal() as db:
+                await db.execute(stmt, params)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to flush %d like counters; will retry", len(pending))
+            for rid, delta in pending.items():
+                self._pending[rid] += delta
+            return 0
+        await live_feed.publish_likes(pending)
+        return len(pending)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+like_counter = LikeCounter(LIKE_FLUSH_INTERVAL_SECONDS)
+
+
+async def repair_counts(db, response_ids):
+    """Reset counters for the given responses from the like ledger."""
+    counts = (
+        select(func.count())
+        .select_from(models.ResponseLike)
+        .where(models.ResponseLike.response_id == models.Response.id)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(models.Response)
+        .where(models.Response.id.in_(response_ids))
+        .values(likes=counts)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,73 @@
+"""Live activity on the current prompt, pushed to clients.
+
+Routes publish after they commit: new responses, new comments, like-count
+deltas (one message per like-counter flush, not per like) and prompt
+rollovers. Clients follow ``GET /feed/live`` (server-sent events) or the
+``/feed/live/ws`` WebSocket instead of polling the list endpoints. A
+connected client costs one bounded queue and a heartbeat; nothing reads
+the database on its behalf, and with nobody connected publishing is a no-op.
+"""
+import os
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from .. import models
+from .broadcaster import OVERFLOW, broadcaster
+from .current_prompt import CachedPrompt, current_prompt
+from .prompt_scheduler import prompt_scheduler
+
+FEED_CHANNEL = "feed"
+FEED_HEARTBEAT_SECONDS = float(os.getenv("FEED_HEARTBEAT_SECONDS", 25))
+
+RESPONSE = "response"
+COMMENT = "comment"
+LIKES = "likes"
+PROMPT = "prompt"
+
+
+def message(type: str, data) -> dict:
+    return {"type": type, "data": jsonable_encoder(data)}
+
+
+def has_audience() -> bool:
+    return broadcaster.has_audience(FEED_CHANNEL)
+
+
+async def publish(type: str, data):
+    if has_audience():
+        await broadcaster.publish(FEED_CHANNEL, message(type, data))
+
+
+async def publish_for_prompt(prompt_id: int, type: str, data):
+    """Publish only if prompt_id is the current prompt; checked against the in-memory copy."""
+    if not has_audience():
+        return
+    cached = await current_prompt.get()
+    if cached.item is not None and cached.item["id"] == prompt_id:
+        await publish(type, data)
+
+
+async def publish_likes(deltas: Dict[int, int]):
+    # Response ids only; clients apply deltas to the posts they are showing
+    await publish(LIKES, {"deltas": {str(response_id): delta for response_id, delta in deltas.items()}})
+
+
+@prompt_scheduler.on_activate
+async def announce_rollover(prompt: models.Prompt):
+    # Every worker runs this listener, so each tells only its own clients
+    broadcaster.deliver_local(FEED_CHANNEL, message(PROMPT, CachedPrompt(prompt).item))
+
+
+async def follow(heartbeat: Optional[float] = None) -> AsyncIterator[Optional[dict]]:
+    """Yield feed messages as they arrive, and None after each idle ``heartbeat``.
+
+    Ends after an overflow message: the client fell behind and must refetch.
+    """
+    heartbeat = FEED_HEARTBEAT_SECONDS if heartbeat is None else heartbeat
+    async with broadcaster.subscribe(FEED_CHANNEL) as subscription:
+        while True:
+            item = await subscription.get(heartbeat)
+            yield item
+            if item is OVERFLOW:
+                return
@@ -0,0 +1,244 @@
+"""Reusable async HTTP client for LLM APIs.
+
+One ``LLMClient`` per upstream keeps a pooled keep-alive ``httpx`` client and
+wraps every call with:
+
+* a per-attempt timeout and an overall deadline,
+* retries with full-jitter exponential backoff on transport errors,
+  timeouts, 429 and 5xx,
+* optional hedging: if an attempt hasn't answered after ``hedge_after``
+  seconds a second identical request is raced against it,
+* a circuit breaker that fails fast after repeated failures and lets a
+  single probe through once ``reset_timeout`` has passed,
+* latency and error counters exposed through ``metrics.snapshot()``.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional
+
+import httpx
+
+
+class LLMError(Exception):
+    """The upstream call failed after retries or returned a non-retryable error."""
+
+
+class CircuitOpenError(LLMError):
+    """The circuit breaker is open; the call was not attempted."""
+
+
+class _RetryableError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        # Ticket of the half-open probe in flight, if any
+        self._probe = None
+
+    def allow(self) -> Optional[object]:
+        """A ticket for ``release`` if the call may go ahead, otherwise None."""
+        if self.state == self.CLOSED:
+            return object()
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and self._probe is None:
+            self._probe = object()
+            return self._probe
+        return None
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe = None
+
+    def release(self, ticket: object):
+        """Free the half-open probe slot if ``ticket`` is the probe and it ended without an outcome (e.g. it was cancelled)."""
+        if ticket is self._probe:
+            self._probe = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe = None
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class LLMMetrics:
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.hedges = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self._latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "timeouts": self.timeouts,
+            "circuit_rejections": self.rejected,
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_p99": percentile(0.99),
+        }
+
+
+class LLMClient:
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 5.0,
+        deadline: float = 12.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        hedge_after: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        max_connections: int = 10,
+    ):
+        self.url = url
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.max_connections = max_connections
+        self.metrics = LLMMetrics()
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def _send(self, body: dict) -> dict:
+        try:
+            response = await self._get_client().post(self.url, json=body)
+        except httpx.TimeoutException as e:
+            self.metrics.timeouts += 1
+            raise _RetryableError(f"timeout: {e!r}")
+        except httpx.TransportError as e:
+            raise _RetryableError(f"transport error: {e!r}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise _RetryableError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+        try:
+            return response.json()
+        except ValueError:
+            # A proxy or overloaded upstream answering 200 with an error page
+            raise _RetryableError(f"invalid JSON body: {response.text[:200]!r}")
+
+    async def _hedged(self, body: dict) -> dict:
+        first = asyncio.ensure_future(self._send(body))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done:
+                return first.result()
+
+            self.metrics.hedges += 1
+            second = asyncio.ensure_future(self._send(body))
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def post_json(self, body: dict) -> dict:
+        """POST body and return the decoded JSON response."""
+        ticket = self.breaker.allow()
+        if ticket is None:
+            self.metrics.rejected += 1
+            raise CircuitOpenError("circuit open")
+        try:
+            return await self._attempt_all(body)
+        finally:
+            # Otherwise a probe that was cancelled or crashed keeps the circuit shut for good
+            self.breaker.release(ticket)
+
+    async def _attempt_all(self, body: dict) -> dict:
+        self.metrics.requests += 1
+        started = time.monotonic()
+        give_up_at = started + self.deadline
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                call = self._hedged(body) if self.hedge_after else self._send(body)
+                result = await asyncio.wait_for(call, timeout=remaining)
+            except (_RetryableError, asyncio.TimeoutError) as e:
+                last_error = e
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics.timeouts += 1
+            except LLMError as e:
+                # Client errors won't get better on retry and say nothing about upstream health
+                self.breaker.record_success()
+                self.metrics.failures += 1
+                raise
+            else:
+                self.breaker.record_success()
+                self.metrics.successes += 1
+                self.metrics.observe(time.monotonic() - started)
+                return result
+
+            if attempt < self.max_retries:
+                self.metrics.retries += 1
+                backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                await asyncio.sleep(min(backoff, max(0.0, give_up_at - time.monotonic())))
+
+        self.breaker.record_failure()
+        self.metrics.failures += 1
+        self.metrics.observe(time.monotonic() - started)
+        raise LLMError(f"gave up after {attempt + 1} attempts: {last_error}")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
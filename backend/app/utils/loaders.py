@@ -0,0 +1,78 @@
+"""Request-scoped batching of lookups by id.
+
+Every relationship on the models raises instead of lazy loading, since a
+lazy load costs one query per row. Routes that need the users behind a list
+of rows ask the request's loaders instead. A loader collects the ids
+requested before anything is awaited and fetches them with one
+``WHERE id IN (...)``::
+
+    authors = await loaders.users.load_many(comment.user_id for comment in comments)
+
+Results are cached for the rest of the request, so loading the same id again
+is free. Users also go through ``user_cache``. Loaders are built per request by
+``get_loaders``, so nothing outlives the request that read it.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_async_db
+from .user_cache import get_users_by_id
+
+Fetch = Callable[[List[int]], Awaitable[Dict[int, Any]]]
+
+
+class Loader:
+    def __init__(self, fetch: Fetch, lock: asyncio.Lock):
+        self._fetch = fetch
+        # Loaders share their request's session, which runs one query at a time
+        self._lock = lock
+        self._pending: Dict[int, None] = {}
+        self._results: Dict[int, Any] = {}
+        self.queries = 0
+
+    def load(self, key: int) -> Awaitable[Optional[Any]]:
+        """The row for ``key``, or None. Queued now, fetched with the rest of the queue when awaited."""
+        if key not in self._results:
+            self._pending[key] = None
+        return self._get(key)
+
+    async def load_many(self, keys: Iterable[int]) -> List[Optional[Any]]:
+        waiting = [self.load(key) for key in keys]
+        return [await item for item in waiting]
+
+    def prime(self, key: int, value: Any):
+        self._results[key] = value
+        self._pending.pop(key, None)
+
+    async def _get(self, key: int) -> Optional[Any]:
+        if key not in self._results:
+            async with self._lock:
+                # Whoever held the lock may have fetched it already
+                if key not in self._results:
+                    await self._dispatch(key)
+        return self._results[key]
+
+    async def _dispatch(self, key: int):
+        self._pending[key] = None
+        keys = list(self._pending)
+        found = await self._fetch(keys)
+        self.queries += 1
+        for fetched in keys:
+            self._pending.pop(fetched, None)
+            self._results[fetched] = found.get(fetched)
+
+
+class Loaders:
+    def __init__(self, db: AsyncSession):
+        lock = asyncio.Lock()
+        # Prompts and responses are joined or fetched by the query that needs them
+        self.users = Loader(lambda ids: get_users_by_id(db, ids), lock)
+
+
+# FastAPI resolves a dependency once per request, so every Depends(get_loaders)
+# in a request shares one set
+async def get_loaders(db: AsyncSession = Depends(get_async_db)) -> Loaders:
+    return Loaders(db)
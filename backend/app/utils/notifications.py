@@ -0,0 +1,205 @@
+"""Notification writes, fan-out and unread counts.
+
+Per-event notifications (someone commented on your response) are not
+written inside the request that caused them. Routes ``enqueue`` them and a
+background task bulk-inserts everything pending every
+``NOTIFICATION_FLUSH_INTERVAL_SECONDS``, or sooner once
+``NOTIFICATION_BATCH_SIZE`` are waiting. As with like counts, anything
+still queued in a worker that dies is lost. That is acceptable for
+notifications and keeps writes off the comment path.
+
+A new daily prompt notifies every user. ``fan_out_prompt`` does that with
+one ``INSERT ... SELECT`` over ``users`` rather than a row per user from
+Python. It skips prompts that were already announced, so calling it twice
+is harmless.
+
+``unread_counts`` caches each user's unread total for a short TTL and is
+adjusted in place by this worker's inserts and mark-reads.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database, models
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_FLUSH_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_FLUSH_INTERVAL_SECONDS", 1))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", 500))
+UNREAD_COUNT_TTL_SECONDS = float(os.getenv("UNREAD_COUNT_TTL_SECONDS", 30))
+
+COMMENT = "comment"
+PROMPT = "prompt"
+
+
+class UnreadCounts:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # user_id -> (expires_at, count)
+        self._counts: Dict[int, Tuple[float, int]] = {}
+
+    async def get(self, db: AsyncSession, user_id: int) -> int:
+        entry = self._counts.get(user_id)
+        if entry is not None and entry[0] >= time.monotonic():
+            return entry[1]
+
+        result = await db.execute(
+            select(func.count())
+            .select_from(models.Notification)
+            .where(models.Notification.user_id == user_id, models.Notification.is_read == False)
+        )
+        count = result.scalar_one()
+        self._counts[user_id] = (time.monotonic() + self.ttl, count)
+        return count
+
+    def add(self, user_id: int, delta: int):
+        entry = self._counts.get(user_id)
+        if entry is not None:
+            self._counts[user_id] = (entry[0], max(entry[1] + delta, 0))
+
+    def invalidate(self, user_id: int):
+        self._counts.pop(user_id, None)
+
+    def clear(self):
+        self._counts.clear()
+
+
+unread_counts = UnreadCounts(UNREAD_COUNT_TTL_SECONDS)
+
+
+class NotificationQueue:
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._pending: List[dict] = []
+        self._wake = None
+        self._task = None
+
+    def enqueue(self, user_id: int, type: str, content: Optional[str] = None, prompt_id: Optional[int] = None,
+                response_id: Optional[int] = None, comment_id: Optional[int] = None):
+        self._pending.append({
+            "user_id": user_id,
+            "type": type,
+            "content": content,
+            "is_read": False,
+            "prompt_id": prompt_id,
+            "response_id": response_id,
+            "comment_id": comment_id,
+            # Stamped at the event, not at the flush
+            "created_at": datetime.now(timezone.utc),
+        })
+        if len(self._pending) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def clear(self):
+        self._pending = []
+
+    async def flush(self) -> int:
+        """Insert everything queued, a batch per statement; returns rows written."""
+        pending, self._pending = self._pending, []
+        written = 0
+        for start in range(0, len(pending), self.batch_size):
+            written += await self._insert(pending[start:start + self.batch_size])
+        return written
+
+    async def _insert(self, rows: List[dict]) -> int:
+        try:
+            async with database.AsyncSessionLocal() as db:
+                await db.execute(insert(models.Notification), rows)
+                await db.commit()
+        except IntegrityError:
+            # Something referenced was deleted meanwhile; keep the rest of the batch
+            return await self._insert_each(rows)
+        except Exception:
+            logger.exception("Failed to write %d notifications; will retry", len(rows))
+            self._pending.extend(rows)
+            return 0
+        self._count(rows)
+        return len(rows)
+
+    async def _insert_each(self, rows: List[dict]) -> int:
+        written = []
+        async with database.AsyncSessionLocal() as db:
+            for row in rows:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(models.Notification), [row])
+                    written.append(row)
+                except IntegrityError:
+                    logger.info("Dropping notification for user %s; a referenced row is gone", row["user_id"])
+            await db.commit()
+        self._count(written)
+        return len(written)
+
+    def _count(self, rows: List[dict]):
+        per_user = defaultdict(int)
+        for row in rows:
+            per_user[row["user_id"]] += 1
+        for user_id, count in per_user.items():
+            unread_counts.add(user_id, count)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Notification flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+        await self.flush()
+
+
+notification_queue = NotificationQueue(NOTIFICATION_FLUSH_INTERVAL_SECONDS, NOTIFICATION_BATCH_SIZE)
+
+
+async def fan_out_prompt(db: AsyncSession, prompt: models.Prompt) -> int:
+    """Notify every user of a new prompt in one statement; returns rows inserted.
+
+    The caller commits, then clears ``unread_counts`` since every user's count moved.
+    """
+    announced = exists().where(models.Notification.prompt_id == prompt.id, models.Notification.type == PROMPT)
+    rows = (
+        select(
+            models.User.id,
+            literal(PROMPT),
+            literal(prompt.content),
+            literal(False),
+            literal(prompt.id),
+        )
+        .where(~announced)
+    )
+    result = await db.execute(
+        insert(models.Notification).from_select(
+            ["user_id", "type", "content", "is_read", "prompt_id"], rows
+        )
+    )
+    return max(result.rowcount, 0)
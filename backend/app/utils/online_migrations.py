@@ -0,0 +1,193 @@
+"""Helpers for Alembic migrations that must not block writes.
+
+Plain ``op.create_index`` and one-shot ``UPDATE`` backfills run inside the
+migration transaction and hold locks on the table until it commits. On a
+large ``responses`` table that stalls every write for minutes. These helpers:
+
+* build indexes ``CONCURRENTLY`` in an autocommit block outside the
+  migration transaction (Postgres only; other dialects fall back to a
+  normal build),
+* swap foreign keys by adding the new constraint ``NOT VALID`` and
+  validating it separately, which only takes a lock that lets writes
+  through (Postgres only),
+* make columns ``NOT NULL`` through a ``NOT VALID`` check constraint that
+  is validated without blocking writes, so ``SET NOT NULL`` needs no scan
+  (Postgres 12+),
+* backfill columns in small id-range batches, each committed on its own
+  and throttled, reporting progress through the ``alembic`` logger. A
+  backfill that is interrupted picks up where it stopped because only rows
+  matching ``pending`` are touched.
+
+Usage inside a revision::
+
+    from app.utils.online_migrations import backfill, create_index_concurrently
+
+    def upgrade():
+        op.add_column('responses', sa.Column('comment_count', sa.Integer(), nullable=True))
+        backfill('responses', 'comment_count = 0', pending='comment_count IS NULL')
+        create_index_concurrently('ix_responses_comment_count', 'responses', ['comment_count'])
+"""
+import logging
+import os
+import time
+from typing import Optional, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+logger = logging.getLogger("alembic.online")
+
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", 5_000))
+BACKFILL_PAUSE_SECONDS = float(os.getenv("BACKFILL_PAUSE_SECONDS", 0.05))
+LOCK_TIMEOUT_MS = int(os.getenv("MIGRATION_LOCK_TIMEOUT_MS", 5_000))
+
+
+def _is_postgres() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def _is_offline() -> bool:
+    # ``alembic upgrade --sql`` renders a script instead of connecting
+    return op.get_context().as_sql
+
+
+def set_lock_timeout(ms: int = LOCK_TIMEOUT_MS):
+    """Fail fast instead of queueing writers behind a DDL lock we can't get."""
+    if _is_postgres():
+        op.execute(f"SET lock_timeout = '{int(ms)}ms'")
+
+
+def _drop_invalid_index(name: str):
+    # A failed CONCURRENTLY build leaves an INVALID index behind; rebuild it
+    if _is_offline():
+        return
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first()
+    if invalid:
+        logger.info("dropping invalid index %s left by an earlier run", name)
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def create_index_concurrently(name: str, table: str, columns: Sequence, unique: bool = False, where: Optional[str] = None):
+    """Build an index without blocking writes to the table."""
+    if not _is_postgres():
+        op.create_index(name, table, list(columns), unique=unique,
+                        sqlite_where=sa.text(where) if where else None)
+        return
+
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(name)
+        logger.info("building index %s on %s concurrently", name, table)
+        op.create_index(
+            name, table, list(columns), unique=unique,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text(where) if where else None,
+            if_not_exists=True,
+        )
+
+
+def drop_index_concurrently(name: str, table: str):
+    if not _is_postgres():
+        op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def replace_foreign_key(table: str, column: str, referent: str, ondelete: Optional[str] = None, name: Optional[str] = None):
+    """Recreate ``table.column -> referent.id`` with a new ``ON DELETE`` action without a long table lock."""
+    name = name or f"{table}_{column}_fkey"
+    if not _is_postgres():
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, referent, [column], ["id"], ondelete=ondelete)
+        return
+
+    action = f" ON DELETE {ondelete}" if ondelete else ""
+    # Dropping and re-adding in one statement leaves no window without the constraint
+    op.execute(
+        f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}, "
+        f"ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {referent} (id){action} NOT VALID"
+    )
+    validate = f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"
+    if _is_offline():
+        op.execute(validate)
+        return
+    # Commits the swap first; validation scans the table but doesn't block writes
+    with op.get_context().autocommit_block():
+        logger.info("validating %s on %s", name, table)
+        op.execute(validate)
+
+
+def set_not_null(table: str, column: str):
+    """``ALTER COLUMN ... SET NOT NULL`` without holding an exclusive lock through a table scan."""
+    if not _is_postgres():
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column(column, nullable=False)
+        return
+
+    name = f"ck_{table}_{column}_not_null"
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({column} IS NOT NULL) NOT VALID")
+    validate = f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}"
+    if _is_offline():
+        op.execute(validate)
+    else:
+        # Scans the table under a lock that lets writes through
+        with op.get_context().autocommit_block():
+            logger.info("validating %s on %s", name, table)
+            op.execute(validate)
+    # The validated check proves the column has no NULLs, so this skips the scan
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+
+
+def backfill(
+    table: str,
+    values: str,
+    pending: str,
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    pause: float = BACKFILL_PAUSE_SECONDS,
+    id_column: str = "id",
+) -> int:
+    """Run ``UPDATE table SET values WHERE pending`` in committed id-range batches.
+
+    ``values`` is the SET clause and ``pending`` a predicate that is true only
+    for rows still to be filled, which is what makes the backfill resumable.
+    Returns the number of rows updated.
+    """
+    statement = f"UPDATE {table} SET {values} WHERE ({pending})"
+
+    if _is_offline():
+        # No connection to batch against; emit the single statement for review
+        op.execute(statement)
+        return 0
+
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        low, high = bind.execute(
+            sa.text(f"SELECT min({id_column}), max({id_column}) FROM {table} WHERE ({pending})")
+        ).one()
+        if low is None:
+            logger.info("backfill %s: nothing to do", table)
+            return 0
+
+        batch = sa.text(f"{statement} AND {id_column} >= :start AND {id_column} < :end")
+        span = high - low + 1
+        updated = 0
+        start = low
+        while start <= high:
+            end = start + batch_size
+            result = bind.execute(batch, {"start": start, "end": end})
+            updated += max(result.rowcount, 0)
+            done = min(end, high + 1) - low
+            logger.info("backfill %s: ids %d-%d, %d rows updated (%d%%)", table, start, end - 1, updated, done * 100 // span)
+            start = end
+            if pause and start <= high:
+                time.sleep(pause)
+
+    return updated
@@ -0,0 +1,71 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered by a sort column plus the primary key as a tie-breaker, and
+the next page starts strictly after the last row seen. Each page is an
+index range scan no matter how deep the client goes, and rows inserted
+while a client is paging never shift or repeat earlier results.
+
+Cursors are opaque url-safe base64 strings; clients should only echo back
+the ``next_cursor`` they were given.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values: Sequence) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list:
+    """Turn a cursor back into values typed for the given columns."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match this listing")
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def apply_keyset(stmt: Select, columns: Sequence, cursor: Optional[str], limit: int, descending: bool = True) -> Select:
+    """Order stmt by columns and start it after cursor; fetches one extra row."""
+    if cursor:
+        key = tuple_(*columns)
+        after = decode_cursor(cursor, columns)
+        stmt = stmt.where(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return stmt.order_by(*order).limit(limit + 1)
+
+
+def page_from_rows(rows: list, columns: Sequence, limit: int, key=None) -> dict:
+    """Build the {items, next_cursor} envelope from a limit + 1 row fetch."""
+    key = key or (lambda row: [getattr(row, column.key) for column in columns])
+    items = rows[:limit]
+    next_cursor = encode_cursor(key(items[-1])) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def paginate(db: AsyncSession, stmt: Select, columns: Sequence, cursor: Optional[str], limit: int, descending: bool = True) -> dict:
+    """Run a single-entity select one keyset page at a time."""
+    result = await db.execute(apply_keyset(stmt, columns, cursor, limit, descending))
+    return page_from_rows(result.scalars().all(), columns, limit)
@@ -1,33 +1,84 @@
 import os
-import requests
 import random
 import re
 from dotenv import load_dotenv
 
+from .llm_client import CircuitBreaker, LLMClient
+
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+# "gemini" or "stub"; the stub needs no network and is the default without an API key
+PROMPT_GENERATOR = os.getenv("PROMPT_GENERATOR", "gemini" if GEMINI_API_KEY else "stub")
 
-def generate_prompt():
-    """Generate a short daily prompt using Gemini AI"""
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
+# Shared pooled client; per-attempt timeout, overall deadline and retries are
+# tuned so one slow Gemini call can't hold a refill cycle for long
+GEMINI_HEDGE_AFTER_SECONDS = os.getenv("GEMINI_HEDGE_AFTER_SECONDS")
+gemini_client = LLMClient(
+    GEMINI_API_URL,
+    timeout=float(os.getenv("GEMINI_TIMEOUT_SECONDS", 5)),
+    deadline=float(os.getenv("GEMINI_DEADLINE_SECONDS", 12)),
+    max_retries=int(os.getenv("GEMINI_MAX_RETRIES", 2)),
+    hedge_after=float(GEMINI_HEDGE_AFTER_SECONDS) if GEMINI_HEDGE_AFTER_SECONDS else None,
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", 5)),
+        reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30)),
+    ),
+)
+
+DEFAULT_PROMPT = "What brought you joy today?"
+
+FIRST_PERSON_FALLBACKS = [
+    "What value guides your decisions most?",
+    "Which memory would you relive if possible?",
+    "Who shaped your worldview most profoundly?",
+    "How have your priorities shifted over time?",
+    "What unexpected lesson changed you?",
+    "Which decision would you remake differently?"
+]
+
+TOO_LONG_FALLBACKS = [
+    "What shapes your core values?",
+    "Which memory changed you most?",
+    "Who influences your decisions?",
+    "How have you evolved recently?",
+    "What unexpected wisdom guides you?",
+    "Which choice defines you?"
+]
+
+STUB_PROMPTS = FIRST_PERSON_FALLBACKS + TOO_LONG_FALLBACKS + [
+    DEFAULT_PROMPT,
+    "Who would you thank if you could today?",
+    "What small habit changed your life?",
+    "Where do you feel most like yourself?",
+    "What are you still learning to forgive?",
+    "Which place shaped who you are?",
+    "What would you tell your younger self?",
+    "What risk are you glad you took?",
+]
+
+MAX_PROMPT_WORDS = 12
+FIRST_PERSON_WORDS = {'i', 'me', 'my', "i'm", "i've"}
+FILLER_PHRASES = ['do you think', 'in your opinion', 'according to you', 'in your experience',
+                  'would you say', 'would you agree', 'do you believe', 'do you feel',
+                  'do you find', 'to you', 'for you']
+
+PROMPT_TYPES = [
+    "Generate a very short reflective question (maximum 10-12 words) about personal growth. The question must address 'you' not 'I' or 'me'.",
+    "Create an extremely brief question (maximum 10-12 words) about relationships. The question must address 'you' not 'I' or 'me'.",
+    "Devise a concise question (maximum 10-12 words) about life choices. The question must address 'you' not 'I' or 'me'.",
+    "Formulate a short question (maximum 10-12 words) about values or principles. The question must address 'you' not 'I' or 'me'.",
+    "Craft a brief question (maximum 10-12 words) about memories. The question must address 'you' not 'I' or 'me'.",
+    "Create a compact question (maximum 10-12 words) about hopes or aspirations. The question must address 'you' not 'I' or 'me'."
+]
 
-    prompt_types = [
-        "Generate a very short reflective question (maximum 10-12 words) about personal growth. The question must address 'you' not 'I' or 'me'.",
-        "Create an extremely brief question (maximum 10-12 words) about relationships. The question must address 'you' not 'I' or 'me'.",
-        "Devise a concise question (maximum 10-12 words) about life choices. The question must address 'you' not 'I' or 'me'.",
-        "Formulate a short question (maximum 10-12 words) about values or principles. The question must address 'you' not 'I' or 'me'.",
-        "Craft a brief question (maximum 10-12 words) about memories. The question must address 'you' not 'I' or 'me'.",
-        "Create a compact question (maximum 10-12 words) about hopes or aspirations. The question must address 'you' not 'I' or 'me'."
-    ]
-    
-    selected_prompt = random.choice(prompt_types)
-    
-    data = {
+
+def build_request_body():
+    """Gemini request body for one randomly chosen prompt category."""
+    selected_prompt = random.choice(PROMPT_TYPES)
+
+    return {
         "contents": [{
             "parts": [{
                 "text": f"{selected_prompt} Make it thought-provoking and unique. Provide ONLY a single question. Keep it VERY short - ideally under 10 words, maximum 12 words. The question MUST be addressed to 'you' and NEVER use 'I' or 'me'."
@@ -40,76 +91,85 @@ def generate_prompt():
             "maxOutputTokens": 40,
         }
     }
-    
-    try:
-        response = requests.post(
-            GEMINI_API_URL,
-            headers=headers,
-            json=data
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            prompt_text = result["candidates"][0]["content"]["parts"][0]["text"].strip()
-
-            if any(line.strip().startswith(('1.', '2.', '3.', '-', '•')) for line in prompt_text.split('\n')):
-                for line in prompt_text.split('\n'):
-                    line = line.strip()
-                    if line.startswith(('1.', '-', '•')) and len(line) > 2:
-                        prompt_text = line.split('.', 1)[-1].strip() if '.' in line[:2] else line[1:].strip()
-                        break
-            
-            prompt_text = prompt_text.replace('?.', '?')
-            
-            if '?' in prompt_text:
-                prompt_text = prompt_text.split('?')[0] + '?'
-            elif '.' in prompt_text:
-                prompt_text = prompt_text.split('.')[0] + '.'
-            
-            prompt_text = prompt_text.lstrip('123456789.- •').strip()
-            
-            if not (prompt_text.endswith('.') or prompt_text.endswith('?')):
-                if '?' in prompt_text:
-                    prompt_text += '?'
-                else:
-                    prompt_text += '.'
-            
-            words = re.findall(r'\b\w+\b', prompt_text.lower())
-            if 'i' in words or 'me' in words or 'my' in words or "i'm" in words or "i've" in words:
-                fallback_questions = [
-                    "What value guides your decisions most?",
-                    "Which memory would you relive if possible?",
-                    "Who shaped your worldview most profoundly?",
-                    "How have your priorities shifted over time?",
-                    "What unexpected lesson changed you?",
-                    "Which decision would you remake differently?"
-                ]
-                prompt_text = random.choice(fallback_questions)
-            
-            word_count = len(prompt_text.split())
-            if word_count > 12:
-                for unnecessary_phrase in ['do you think', 'in your opinion', 'according to you', 'in your experience', 
-                                          'would you say', 'would you agree', 'do you believe', 'do you feel',
-                                          'do you find', 'to you', 'for you']:
-                    if unnecessary_phrase in prompt_text.lower():
-                        prompt_text = prompt_text.lower().replace(unnecessary_phrase, '').strip().capitalize()
-                        break
-
-                if len(prompt_text.split()) > 12:
-                    fallback_questions = [
-                        "What shapes your core values?",
-                        "Which memory changed you most?",
-                        "Who influences your decisions?",
-                        "How have you evolved recently?",
-                        "What unexpected wisdom guides you?",
-                        "Which choice defines you?"
-                    ]
-                    prompt_text = random.choice(fallback_questions)
-                
-            return prompt_text
+
+
+def extract_text(result):
+    """Pull the generated text out of a Gemini response payload."""
+    return result["candidates"][0]["content"]["parts"][0]["text"].strip()
+
+
+def clean_prompt(prompt_text):
+    """Normalise raw model output to a single short sentence or question."""
+    if any(line.strip().startswith(('1.', '2.', '3.', '-', '•')) for line in prompt_text.split('\n')):
+        for line in prompt_text.split('\n'):
+            line = line.strip()
+            if line.startswith(('1.', '-', '•')) and len(line) > 2:
+                prompt_text = line.split('.', 1)[-1].strip() if '.' in line[:2] else line[1:].strip()
+                break
+
+    prompt_text = prompt_text.replace('?.', '?')
+
+    if '?' in prompt_text:
+        prompt_text = prompt_text.split('?')[0] + '?'
+    elif '.' in prompt_text:
+        prompt_text = prompt_text.split('.')[0] + '.'
+
+    prompt_text = prompt_text.lstrip('123456789.- •').strip()
+
+    if not (prompt_text.endswith('.') or prompt_text.endswith('?')):
+        if '?' in prompt_text:
+            prompt_text += '?'
         else:
-            print(f"Gemini API error: {response.status_code} - {response.text}")
-            return "What brought you joy today?"
+            prompt_text += '.'
+
+    if len(prompt_text.split()) > MAX_PROMPT_WORDS:
+        for unnecessary_phrase in FILLER_PHRASES:
+            if unnecessary_phrase in prompt_text.lower():
+                prompt_text = prompt_text.lower().replace(unnecessary_phrase, '').strip().capitalize()
+                break
+
+    return prompt_text
+
+
+def uses_first_person(prompt_text):
+    words = re.findall(r'\b\w+\b', prompt_text.lower())
+    return any(word in FIRST_PERSON_WORDS for word in words)
+
+
+def is_valid_prompt(prompt_text):
+    """True when a cleaned prompt can be shown to users as-is."""
+    return (
+        bool(prompt_text)
+        and len(prompt_text) > 1
+        and not uses_first_person(prompt_text)
+        and len(prompt_text.split()) <= MAX_PROMPT_WORDS
+    )
+
+
+async def request_prompt():
+    """Ask Gemini for one prompt and return it cleaned. Raises on any failure."""
+    result = await gemini_client.post_json(build_request_body())
+    return clean_prompt(extract_text(result))
+
+
+def generate_stub_prompt():
+    """Offline generator used when Gemini is not configured."""
+    return random.choice(STUB_PROMPTS)
+
+
+async def generate_prompt():
+    """Generate a short daily prompt using Gemini AI"""
+    if PROMPT_GENERATOR == "stub":
+        return generate_stub_prompt()
+
+    try:
+        prompt_text = await request_prompt()
     except Exception as e:
         print(f"Exception when calling Gemini API: {e}")
-        return "What brought you joy today?"
\ No newline at end of file
+        return DEFAULT_PROMPT
+
+    if uses_first_person(prompt_text):
+        return random.choice(FIRST_PERSON_FALLBACKS)
+    if len(prompt_text.split()) > MAX_PROMPT_WORDS:
+        return random.choice(TOO_LONG_FALLBACKS)
+    return prompt_text
@@ -0,0 +1,169 @@
+"""MinHash/LSH index of every prompt ever issued, for near-duplicate checks.
+
+Generated prompts come from a handful of categories at high temperature, with
+a small fixed fallback list, so repeats are common and rarely exact ("What
+shapes your core values?" vs "What shapes your values?"). Each prompt is
+reduced to character 4-gram shingles and a short MinHash signature. The
+signature is split into LSH bands, so a lookup only compares against prompts
+that share a band bucket. The exact shingle Jaccard is then computed for
+those few candidates. A check costs well under a millisecond and never scans
+the prompts table.
+
+The index is built from ``prompts`` on the first ``refresh`` and kept
+current by later refreshes, which keyset-read only ids above the last one
+seen. Refreshes run in the background and before every pool refill, and
+prompts created by this worker are added as soon as they commit.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from .. import database, models
+
+logger = logging.getLogger(__name__)
+
+PROMPT_SIMILARITY_THRESHOLD = float(os.getenv("PROMPT_SIMILARITY_THRESHOLD", 0.6))
+PROMPT_INDEX_REFRESH_SECONDS = float(os.getenv("PROMPT_INDEX_REFRESH_SECONDS", 300))
+
+SHINGLE_SIZE = 4
+NUM_PERM = 48
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+REFRESH_BATCH_SIZE = 1000
+
+# Each "permutation" XORs the shingle hashes with a fixed random 64-bit mask,
+# which keeps the min() loop in C
+_MASKS = [random.Random(seed).getrandbits(64) for seed in range(NUM_PERM)]
+
+
+def normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    normalized = f" {normalize(text)} "
+    if len(normalized) <= SHINGLE_SIZE:
+        return frozenset([normalized])
+    return frozenset(normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1))
+
+
+def signature(shingle_set: FrozenSet[str]) -> Tuple[int, ...]:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingle_set]
+    return tuple(min(map(mask.__xor__, hashes)) for mask in _MASKS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class PromptIndex:
+    def __init__(self, threshold: float, interval: float):
+        self.threshold = threshold
+        self.interval = interval
+        self._shingles: Dict[str, FrozenSet[str]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        self.last_prompt_id = 0
+        self._task = None
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def add(self, text: str) -> bool:
+        """Index text; returns False if the same normalised text was already present."""
+        key = normalize(text)
+        if key in self._shingles:
+            return False
+        shingle_set = shingles(text)
+        self._shingles[key] = shingle_set
+        sig = signature(shingle_set)
+        for band in range(BANDS):
+            self._buckets[(band, sig[band * ROWS:(band + 1) * ROWS])].add(key)
+        return True
+
+    def most_similar(self, text: str) -> Optional[Tuple[str, float]]:
+        """Closest indexed prompt at or above the threshold, with its similarity."""
+        key = normalize(text)
+        if key in self._shingles:
+            return key, 1.0
+
+        shingle_set = shingles(text)
+        sig = signature(shingle_set)
+        candidates = set()
+        for band in range(BANDS):
+            candidates |= self._buckets.get((band, sig[band * ROWS:(band + 1) * ROWS]), set())
+
+        best = None
+        for candidate in candidates:
+            score = jaccard(shingle_set, self._shingles[candidate])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+        return best
+
+    def is_near_duplicate(self, text: str) -> bool:
+        return self.most_similar(text) is not None
+
+    def pick(self, generate: Callable[[], str], attempts: int = 5) -> str:
+        """Call generate until it returns something new; falls back to the last candidate."""
+        for _ in range(attempts):
+            text = generate()
+            if not self.is_near_duplicate(text):
+                return text
+        return text
+
+    async def refresh(self) -> int:
+        """Index prompts created since the last refresh; returns how many were read."""
+        # Overlapping refreshes are harmless: add() ignores texts already indexed
+        read = 0
+        async with database.AsyncSessionLocal() as db:
+            while True:
+                result = await db.execute(
+                    select(models.Prompt.id, models.Prompt.content)
+                    .where(models.Prompt.id > self.last_prompt_id)
+                    .order_by(models.Prompt.id)
+                    .limit(REFRESH_BATCH_SIZE)
+                )
+                rows = result.all()
+                for prompt_id, content in rows:
+                    if content:
+                        self.add(content)
+                    self.last_prompt_id = max(self.last_prompt_id, prompt_id)
+                read += len(rows)
+                if len(rows) < REFRESH_BATCH_SIZE:
+                    return read
+
+    def clear(self):
+        self._shingles.clear()
+        self._buckets.clear()
+        self.last_prompt_id = 0
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Prompt index refresh failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+prompt_index = PromptIndex(PROMPT_SIMILARITY_THRESHOLD, PROMPT_INDEX_REFRESH_SECONDS)
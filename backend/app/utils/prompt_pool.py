@@ -0,0 +1,118 @@
+"""Pool of pre-generated prompts so POST /prompt/ never waits on Gemini.
+
+A background task keeps ``PROMPT_POOL_SIZE`` validated prompts in the
+``prompt_pool`` table. ``create_prompt`` pops one inside its own transaction
+(``FOR UPDATE SKIP LOCKED`` keeps concurrent workers from taking the same
+row). If Gemini is down the pool drains instead of requests failing, and an
+empty pool falls back to the local stub generator.
+"""
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database, models
+from . import prompt_generator
+from .prompt_index import prompt_index
+
+logger = logging.getLogger(__name__)
+
+PROMPT_POOL_SIZE = int(os.getenv("PROMPT_POOL_SIZE", 20))
+PROMPT_POOL_REFILL_SECONDS = float(os.getenv("PROMPT_POOL_REFILL_SECONDS", 60))
+
+
+def default_generator():
+    if prompt_generator.PROMPT_GENERATOR == "stub":
+        return "stub", prompt_generator.generate_stub_prompt
+    return "gemini", prompt_generator.request_prompt
+
+
+class PromptPool:
+    def __init__(self, size: int, interval: float, generator: Optional[Callable[[], Union[str, Awaitable[str]]]] = None, source: str = None):
+        self.size = size
+        self.interval = interval
+        if generator is None:
+            source, generator = default_generator()
+        self.generator = generator
+        self.source = source or "custom"
+        self._task = None
+
+
+    async def refill(self, max_attempts: int = None) -> int:
+        """Top the pool up to size; returns how many prompts were added."""
+        await prompt_index.refresh()
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(select(models.PromptPoolEntry.content))
+            seen = set(result.scalars().all())
+        # Entries pooled by other workers count as issued for similarity purposes
+        for text in seen:
+            prompt_index.add(text)
+
+        # Generate with no connection checked out; Gemini calls can be slow
+        fresh = []
+        attempts = max_attempts or (self.size - len(seen)) * 3
+        while len(seen) < self.size and attempts > 0:
+            attempts -= 1
+            try:
+                if asyncio.iscoroutinefunction(self.generator):
+                    text = await self.generator()
+                else:
+                    text = await run_in_threadpool(self.generator)
+            except Exception as e:
+                # Generator is failing; leave the rest for the next cycle
+                logger.warning("Prompt generator failed: %s", e)
+                break
+            if prompt_generator.is_valid_prompt(text) and not prompt_index.is_near_duplicate(text):
+                prompt_index.add(text)
+                seen.add(text)
+                fresh.append(models.PromptPoolEntry(content=text, source=self.source))
+
+        if fresh:
+            async with database.AsyncSessionLocal() as db:
+                db.add_all(fresh)
+                await db.commit()
+        return len(fresh)
+
+    async def pop(self, db: AsyncSession) -> Optional[str]:
+        """Take the oldest pooled prompt in the caller's transaction."""
+        oldest = (
+            select(models.PromptPoolEntry.id)
+            .order_by(models.PromptPoolEntry.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            delete(models.PromptPoolEntry)
+            .where(models.PromptPoolEntry.id == oldest)
+            .returning(models.PromptPoolEntry.content)
+        )
+        return result.scalar_one_or_none()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refill()
+            except Exception:
+                logger.exception("Prompt pool refill failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.size > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+prompt_pool = PromptPool(PROMPT_POOL_SIZE, PROMPT_POOL_REFILL_SECONDS)
@@ -0,0 +1,180 @@
+"""Activates prompts at their ``scheduled_for`` time.
+
+Every worker keeps a heap of upcoming ``(scheduled_for, prompt_id)`` pairs,
+rebuilt from the table every ``PROMPT_SCHEDULER_POLL_SECONDS`` and pushed to
+directly when this worker creates a prompt. At the scheduled time each worker
+calls ``activate_prompt``. The flip runs in one transaction under a
+Postgres advisory lock: workers that lose the race wait for the winner's
+commit, then find the prompt already active, so the swap happens exactly
+once. Readers never see zero or two active prompts. The manual routes
+(``POST /prompt/`` with ``is_active``, ``PUT /prompt/on`` and ``/off``) take
+the same lock, so they queue behind a flip instead of racing it.
+
+The flip also notifies every user of the new prompt in the same
+transaction. Once the flip is done, every worker passes the new prompt to the
+registered ``on_activate`` listeners. Each worker reads the row once and
+warms its caches, instead of thousands of clients all missing at midnight.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database, models
+from .notifications import fan_out_prompt, unread_counts
+
+logger = logging.getLogger(__name__)
+
+PROMPT_SCHEDULER_ENABLED = os.getenv("PROMPT_SCHEDULER_ENABLED", "true").lower() == "true"
+PROMPT_SCHEDULER_POLL_SECONDS = float(os.getenv("PROMPT_SCHEDULER_POLL_SECONDS", 60))
+# How far back a missed activation (e.g. all workers were restarting) is still honoured
+PROMPT_SCHEDULE_GRACE_SECONDS = float(os.getenv("PROMPT_SCHEDULE_GRACE_SECONDS", 900))
+
+# pg_advisory_xact_lock key shared by everything that changes the active prompt
+PROMPT_ROLLOVER_LOCK_KEY = 0x534F4E44
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored as UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def lock_rollover(db: AsyncSession):
+    """Serialise active-prompt changes across workers until the transaction ends."""
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(PROMPT_ROLLOVER_LOCK_KEY)))
+
+
+async def activate_prompt(db: AsyncSession, prompt_id: int, due_by: Optional[datetime] = None) -> Optional[models.Prompt]:
+    """Make prompt_id the only active prompt, atomically; returns it, or None if it no longer qualifies.
+
+    With ``due_by`` the prompt is only activated if it is still scheduled at
+    or before that time, so a rescheduled prompt is left alone.
+    """
+    await lock_rollover(db)
+    prompt = await db.get(models.Prompt, prompt_id, with_for_update=True, populate_existing=True)
+    if prompt is None or (due_by is not None and (prompt.scheduled_for is None or as_utc(prompt.scheduled_for) > due_by)):
+        await db.rollback()
+        return None
+    if not prompt.is_active:
+        # Two statements: Postgres checks the partial unique index row by row
+        await db.execute(
+            update(models.Prompt)
+            .where(models.Prompt.is_active == True, models.Prompt.id != prompt_id)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+        prompt.is_active = True
+        # In the flip's transaction, so the announcement goes out exactly once
+        await fan_out_prompt(db, prompt)
+    await db.commit()
+    return prompt
+
+
+class PromptScheduler:
+    def __init__(self, poll_interval: float, grace: float):
+        self.poll_interval = poll_interval
+        self.grace = grace
+        self._heap = []
+        # Everything scheduled at or before this has been handled
+        self._horizon = datetime.now(timezone.utc) - timedelta(seconds=grace)
+        self._listeners: List[Callable[[models.Prompt], Awaitable[None]]] = []
+        self._loaded_at = 0.0
+        self._wake = None
+        self._task = None
+
+    def on_activate(self, listener: Callable[[models.Prompt], Awaitable[None]]):
+        self._listeners.append(listener)
+        return listener
+
+    def upcoming(self):
+        return sorted(self._heap)
+
+    def schedule(self, prompt_id: int, when: datetime):
+        when = as_utc(when)
+        heapq.heappush(self._heap, (when, prompt_id))
+        if self._wake is not None:
+            self._wake.set()
+
+    async def load(self):
+        """Rebuild the heap from prompts scheduled after the horizon."""
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.Prompt.scheduled_for, models.Prompt.id)
+                .where(models.Prompt.scheduled_for > self._horizon, models.Prompt.is_active == False)
+                .order_by(models.Prompt.scheduled_for)
+            )
+            heap = [(as_utc(when), prompt_id) for when, prompt_id in result.all()]
+        heapq.heapify(heap)
+        self._heap = heap
+        self._loaded_at = time.monotonic()
+
+    async def run_due(self, now: Optional[datetime] = None) -> Optional[models.Prompt]:
+        """Activate the latest prompt that has come due; returns it if one did."""
+        now = now or datetime.now(timezone.utc)
+        due = None
+        while self._heap and self._heap[0][0] <= now:
+            # Only the most recent due prompt matters; earlier ones are superseded
+            due = heapq.heappop(self._heap)
+        self._horizon = max(self._horizon, now)
+        if due is None:
+            return None
+
+        async with database.AsyncSessionLocal() as db:
+            prompt = await activate_prompt(db, due[1], due_by=now)
+        if prompt is None:
+            return None
+        logger.info("Activated prompt %s scheduled for %s", prompt.id, due[0].isoformat())
+        unread_counts.clear()
+        for listener in self._listeners:
+            try:
+                await listener(prompt)
+            except Exception:
+                logger.exception("Prompt activation listener failed")
+        return prompt
+
+    def _seconds_until_next(self) -> float:
+        delay = self.poll_interval - (time.monotonic() - self._loaded_at)
+        if self._heap:
+            delay = min(delay, (self._heap[0][0] - datetime.now(timezone.utc)).total_seconds())
+        return max(delay, 0.0)
+
+    async def _run(self):
+        while True:
+            try:
+                if time.monotonic() - self._loaded_at >= self.poll_interval:
+                    # Stamped up front so a failing load waits for the next poll
+                    self._loaded_at = time.monotonic()
+                    await self.load()
+                await self.run_due()
+            except Exception:
+                logger.exception("Prompt scheduler tick failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        if PROMPT_SCHEDULER_ENABLED and self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+
+prompt_scheduler = PromptScheduler(PROMPT_SCHEDULER_POLL_SECONDS, PROMPT_SCHEDULE_GRACE_SECONDS)
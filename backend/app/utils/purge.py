@@ -0,0 +1,297 @@
+"""Deletes users and prompts together with everything hanging off them.
+
+Foreign keys cascade at the schema level, so removing a row also removes
+its responses, comments, likes and notifications without the ORM loading
+them. For a prolific user or a long-running prompt that single cascade is
+hundreds of thousands of rows in one transaction, holding locks on the child
+tables until it commits. Routes therefore measure the subtree first:
+
+* small ones are deleted inline, in the request's transaction;
+* large ones get a ``purge_jobs`` row and the worker here removes them in
+  committed batches of ``PURGE_BATCH_SIZE`` rows, leaf tables first, and
+  finally the root row. The entity is hidden straight away, in the same
+  transaction as the job: a user gets ``deleted_at`` set, which lookups,
+  login and token checks treat as gone, and their tokens are revoked; a
+  prompt is deactivated.
+
+Jobs are leased through ``claimed_at``, so a job whose worker died is picked
+up again once the lease runs out. Every batch is idempotent, so redoing one
+is harmless. Deleting a user's comments and likes also fixes the comment
+stats and like counters on other people's responses.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, literal, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database, models
+from . import comment_stats, refresh_tokens, token_versions
+from .like_counter import like_counter
+from .user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 500))
+# Subtrees up to this many rows are deleted inline by the route
+PURGE_INLINE_LIMIT = int(os.getenv("PURGE_INLINE_LIMIT", 1_000))
+# 0 disables the background worker; jobs then wait for one that runs it
+PURGE_INTERVAL_SECONDS = float(os.getenv("PURGE_INTERVAL_SECONDS", 30))
+PURGE_PAUSE_SECONDS = float(os.getenv("PURGE_PAUSE_SECONDS", 0.05))
+PURGE_LEASE_SECONDS = float(os.getenv("PURGE_LEASE_SECONDS", 300))
+
+USER = "user"
+PROMPT = "prompt"
+ROOTS = {USER: models.User, PROMPT: models.Prompt}
+
+DELETED = "deleted"
+SCHEDULED = "scheduled"
+
+
+class Step(NamedTuple):
+    model: type
+    where: object
+    # Comment stats to fix on the responses these rows belonged to
+    fix_stats: bool = False
+    # Like counters to decrement on the responses these rows belonged to
+    fix_likes: bool = False
+
+
+def steps_for(entity: str, entity_id: int) -> List[Step]:
+    """Child tables to empty, in order, before the root row can go cheaply."""
+    if entity == USER:
+        own_responses = select(models.Response.id).where(models.Response.user_id == entity_id)
+        return [
+            Step(models.Comment, models.Comment.user_id == entity_id, fix_stats=True),
+            Step(models.Comment, models.Comment.response_id.in_(own_responses)),
+            Step(models.ResponseLike, models.ResponseLike.user_id == entity_id, fix_likes=True),
+            Step(models.ResponseLike, models.ResponseLike.response_id.in_(own_responses)),
+            Step(models.Notification, models.Notification.user_id == entity_id),
+            Step(models.Response, models.Response.user_id == entity_id),
+        ]
+    if entity == PROMPT:
+        responses = select(models.Response.id).where(models.Response.prompt_id == entity_id)
+        return [
+            Step(models.Comment, models.Comment.response_id.in_(responses)),
+            Step(models.ResponseLike, models.ResponseLike.response_id.in_(responses)),
+            Step(models.Notification, models.Notification.prompt_id == entity_id),
+            Step(models.Response, models.Response.prompt_id == entity_id),
+        ]
+    raise ValueError(f"Unknown purge entity {entity!r}")
+
+
+async def subtree_size(db: AsyncSession, entity: str, entity_id: int, limit: Optional[int] = None) -> int:
+    """Rows a purge would delete, each table counted only up to ``limit + 1``, in one query."""
+    limit = PURGE_INLINE_LIMIT if limit is None else limit
+    counts = [
+        select(func.count())
+        .select_from(select(literal(1)).where(step.where).limit(limit + 1).subquery())
+        .scalar_subquery()
+        for step in steps_for(entity, entity_id)
+    ]
+    return sum((await db.execute(select(*counts))).one())
+
+
+async def _delete_rows(db: AsyncSession, step: Step, limit: Optional[int]) -> List[int]:
+    """Delete up to ``limit`` rows matching the step; returns the affected response ids."""
+    stmt = delete(step.model)
+    if limit is None:
+        stmt = stmt.where(step.where)
+    else:
+        key = step.model.__mapper__.primary_key
+        chosen = select(*key).where(step.where).limit(limit)
+        stmt = stmt.where((key[0] if len(key) == 1 else tuple_(*key)).in_(chosen))
+    column = step.model.response_id if hasattr(step.model, "response_id") else step.model.id
+    result = await db.execute(stmt.returning(column).execution_options(synchronize_session=False))
+    return result.scalars().all()
+
+
+async def _fix(db: AsyncSession, step: Step, response_ids: List[int]):
+    if step.fix_stats and response_ids:
+        await comment_stats.recompute(db, sorted(set(response_ids)))
+
+
+def _release_likes(step: Step, response_ids: List[int]):
+    # Called after commit, like the unlike route
+    if step.fix_likes:
+        for response_id in response_ids:
+            like_counter.add(response_id, -1)
+
+
+async def _delete_root(db: AsyncSession, entity: str, entity_id: int) -> bool:
+    root = ROOTS[entity]
+    result = await db.execute(
+        delete(root).where(root.id == entity_id).returning(root.id).execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(models.PurgeJob).where(models.PurgeJob.entity == entity, models.PurgeJob.entity_id == entity_id)
+    )
+    return result.scalar_one_or_none() is not None
+
+
+async def _hide(db: AsyncSession, entity: str, entity_id: int):
+    """Take the entity out of circulation until the purge reaches its root row."""
+    if entity == USER:
+        await db.execute(
+            update(models.User)
+            .where(models.User.id == entity_id)
+            .values(deleted_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await token_versions.bump_version(db, entity_id)
+        await refresh_tokens.revoke_all(db, entity_id)
+    elif entity == PROMPT:
+        await db.execute(
+            update(models.Prompt)
+            .where(models.Prompt.id == entity_id)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _forget(entity: str, entity_id: int):
+    if entity == USER:
+        user_cache.invalidate(entity_id)
+        token_versions.forget(entity_id)
+
+
+async def delete_or_schedule(db: AsyncSession, entity: str, entity_id: int) -> Optional[str]:
+    """Delete an entity now, or queue a background purge if its subtree is large.
+
+    Returns ``DELETED``, ``SCHEDULED``, or None if there is no such row.
+    Commits the session.
+    """
+    root = ROOTS[entity]
+    exists = await db.execute(select(root.id).where(root.id == entity_id))
+    if exists.scalar_one_or_none() is None:
+        return None
+
+    if await subtree_size(db, entity, entity_id) > PURGE_INLINE_LIMIT:
+        await _hide(db, entity, entity_id)
+        await db.execute(
+            database.dialect_insert(db, models.PurgeJob)
+            .values(entity=entity, entity_id=entity_id)
+            .on_conflict_do_nothing()
+        )
+        await db.commit()
+        _forget(entity, entity_id)
+        purge_worker.wake()
+        return SCHEDULED
+
+    released = []
+    for step in steps_for(entity, entity_id):
+        response_ids = await _delete_rows(db, step, None)
+        await _fix(db, step, response_ids)
+        released.append((step, response_ids))
+    deleted = await _delete_root(db, entity, entity_id)
+    await db.commit()
+    for step, response_ids in released:
+        _release_likes(step, response_ids)
+    _forget(entity, entity_id)
+    return DELETED if deleted else None
+
+
+class PurgeWorker:
+    def __init__(self, interval: float, batch_size: int, pause: float, lease: float):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lease = lease
+        self._wake = None
+        self._task = None
+
+    async def claim(self) -> Optional[Tuple[str, int]]:
+        """Take the oldest job nobody holds a live lease on."""
+        now = datetime.now(timezone.utc)
+        available = (
+            select(models.PurgeJob.id)
+            .where(or_(models.PurgeJob.claimed_at.is_(None), models.PurgeJob.claimed_at < now - timedelta(seconds=self.lease)))
+            .order_by(models.PurgeJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(models.PurgeJob)
+                .where(models.PurgeJob.id == available)
+                .values(claimed_at=now)
+                .returning(models.PurgeJob.entity, models.PurgeJob.entity_id)
+            )
+            job = result.first()
+            await db.commit()
+        return tuple(job) if job else None
+
+    async def purge(self, entity: str, entity_id: int) -> int:
+        """Delete an entity's subtree one committed batch at a time, then the entity; returns rows deleted."""
+        deleted = 0
+        for step in steps_for(entity, entity_id):
+            while True:
+                async with database.AsyncSessionLocal() as db:
+                    response_ids = await _delete_rows(db, step, self.batch_size)
+                    await _fix(db, step, response_ids)
+                    # Renew the lease so nobody else starts on this job
+                    await db.execute(
+                        update(models.PurgeJob)
+                        .where(models.PurgeJob.entity == entity, models.PurgeJob.entity_id == entity_id)
+                        .values(claimed_at=datetime.now(timezone.utc))
+                    )
+                    await db.commit()
+                _release_likes(step, response_ids)
+                deleted += len(response_ids)
+                if len(response_ids) < self.batch_size:
+                    break
+                if self.pause:
+                    await asyncio.sleep(self.pause)
+
+        async with database.AsyncSessionLocal() as db:
+            await _delete_root(db, entity, entity_id)
+            await db.commit()
+        _forget(entity, entity_id)
+        logger.info("Purged %s %s (%d rows)", entity, entity_id, deleted)
+        return deleted
+
+    async def run_once(self) -> int:
+        """Work through every claimable job; returns how many were finished."""
+        finished = 0
+        while (job := await self.claim()) is not None:
+            await self.purge(*job)
+            finished += 1
+        return finished
+
+    def wake(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Purge run failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+
+purge_worker = PurgeWorker(PURGE_INTERVAL_SECONDS, PURGE_BATCH_SIZE, PURGE_PAUSE_SECONDS, PURGE_LEASE_SECONDS)
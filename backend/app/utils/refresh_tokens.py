@@ -0,0 +1,85 @@
+"""Long-lived, rotating refresh tokens.
+
+Only a SHA-256 of each token is stored. Every use rotates the token: the old
+row is revoked, stamped ``rotated_at``, and a new one issued in the same
+transaction. Presenting an already-rotated token means it leaked, so the
+whole family for that user is revoked. A token revoked by logout is just
+refused. Callers own the transaction and must commit.
+"""
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+
+
+def _digest(raw_token: str) -> str:
+    # Tokens are 256 random bits, so a fast hash is enough here
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def issue(db: AsyncSession, user_id: int) -> str:
+    raw_token = secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        user_id=user_id,
+        token_hash=_digest(raw_token),
+        expires_at=_now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return raw_token
+
+
+async def rotate(db: AsyncSession, raw_token: str) -> Optional[Tuple[int, str]]:
+    """Swap a valid refresh token for a new one; returns (user_id, new token)."""
+    token_hash = _digest(raw_token)
+    result = await db.execute(
+        update(models.RefreshToken)
+        .where(
+            (models.RefreshToken.token_hash == token_hash)
+            & (models.RefreshToken.revoked == False)
+            & (models.RefreshToken.expires_at > _now())
+        )
+        .values(revoked=True, rotated_at=_now())
+        .returning(models.RefreshToken.user_id)
+    )
+    user_id = result.scalar_one_or_none()
+
+    if user_id is None:
+        # Reuse of a rotated token: revoke everything the holder might have
+        result = await db.execute(
+            select(models.RefreshToken.user_id).where(
+                (models.RefreshToken.token_hash == token_hash) & models.RefreshToken.rotated_at.is_not(None)
+            )
+        )
+        reused_by = result.scalar_one_or_none()
+        if reused_by is not None:
+            await revoke_all(db, reused_by)
+        return None
+
+    return user_id, await issue(db, user_id)
+
+
+async def revoke(db: AsyncSession, raw_token: str):
+    await db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.token_hash == _digest(raw_token))
+        .values(revoked=True)
+    )
+
+
+async def revoke_all(db: AsyncSession, user_id: int):
+    await db.execute(
+        update(models.RefreshToken)
+        .where((models.RefreshToken.user_id == user_id) & (models.RefreshToken.revoked == False))
+        .values(revoked=True)
+    )
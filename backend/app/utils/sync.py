@@ -0,0 +1,233 @@
+"""Change tracking behind ``GET /sync``.
+
+Prompts, responses and comments carry a ``change_seq`` that the database
+stamps on every insert and update. Deleted rows leave a ``tombstones`` row
+with the same stamp. Both come from triggers, so bulk statements, FK
+cascades, the like-counter flush and background purges are all tracked
+without the routes doing anything.
+
+On Postgres the stamp is the writing transaction's id
+(``pg_current_xact_id()``). A sync token holds the reader's snapshot xmin:
+every transaction below it has finished, and anything that was still running
+when the token was issued has an id at or above it. So
+``change_seq >= token`` never misses a late commit. It may send a row twice,
+which clients handle by upserting. SQLite (tests, local runs) has one
+writer at a time and uses a plain counter in ``sync_clock``.
+
+Tombstones are kept for ``SYNC_RETENTION_DAYS``. Older tokens are refused,
+and so is any sync with more than ``SYNC_MAX_CHANGES`` changes per kind;
+in both cases the client reloads everything instead. Prune old tombstones
+with::
+
+    python -m app.utils.sync prune
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import DDL, delete, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import database, models
+
+SYNC_RETENTION_DAYS = int(os.getenv("SYNC_RETENTION_DAYS", 30))
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", 1_000))
+PRUNE_BATCH_SIZE = 5_000
+
+TRACKED_TABLES = ("prompts", "responses", "comments")
+
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION sync_stamp() RETURNS trigger AS $$
+    BEGIN
+        NEW.change_seq := pg_current_xact_id()::text::bigint;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone() RETURNS trigger AS $$
+    DECLARE
+        scope integer;
+    BEGIN
+        -- The prompt a deletion belongs to, so scoped syncs can find it
+        IF TG_TABLE_NAME = 'prompts' THEN
+            scope := OLD.id;
+        ELSIF TG_TABLE_NAME = 'responses' THEN
+            scope := OLD.prompt_id;
+        ELSE
+            SELECT prompt_id INTO scope FROM responses WHERE id = OLD.response_id;
+        END IF;
+        INSERT INTO tombstones (entity, entity_id, prompt_id, change_seq, deleted_at)
+        VALUES (TG_TABLE_NAME, OLD.id, scope, pg_current_xact_id()::text::bigint, now());
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+] + [
+    statement
+    for table in TRACKED_TABLES
+    for statement in (
+        f"CREATE TRIGGER {table}_sync_stamp BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_stamp()",
+        f"CREATE TRIGGER {table}_sync_tombstone AFTER DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_tombstone()",
+    )
+]
+
+POSTGRES_DROP_DDL = [
+    statement
+    for table in TRACKED_TABLES
+    for statement in (
+        f"DROP TRIGGER IF EXISTS {table}_sync_tombstone ON {table}",
+        f"DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}",
+    )
+] + [
+    "DROP FUNCTION IF EXISTS sync_tombstone()",
+    "DROP FUNCTION IF EXISTS sync_stamp()",
+]
+
+SQLITE_SCOPE = {
+    "prompts": "OLD.id",
+    "responses": "OLD.prompt_id",
+    "comments": "(SELECT prompt_id FROM responses WHERE id = OLD.response_id)",
+}
+
+SQLITE_DDL = [
+    "CREATE TABLE sync_clock (value INTEGER NOT NULL)",
+    "INSERT INTO sync_clock (value) VALUES (0)",
+] + [
+    statement
+    for table in TRACKED_TABLES
+    for statement in (
+        f"""
+        CREATE TRIGGER {table}_sync_insert AFTER INSERT ON {table} BEGIN
+            UPDATE sync_clock SET value = value + 1;
+            UPDATE {table} SET change_seq = (SELECT value FROM sync_clock) WHERE id = NEW.id;
+        END
+        """,
+        # The guard skips the trigger's own stamping update
+        f"""
+        CREATE TRIGGER {table}_sync_update AFTER UPDATE ON {table} WHEN NEW.change_seq IS OLD.change_seq BEGIN
+            UPDATE sync_clock SET value = value + 1;
+            UPDATE {table} SET change_seq = (SELECT value FROM sync_clock) WHERE id = NEW.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_sync_delete AFTER DELETE ON {table} BEGIN
+            UPDATE sync_clock SET value = value + 1;
+            INSERT INTO tombstones (entity, entity_id, prompt_id, change_seq, deleted_at)
+            VALUES ('{table}', OLD.id, {SQLITE_SCOPE[table]}, (SELECT value FROM sync_clock), CURRENT_TIMESTAMP);
+        END
+        """,
+    )
+]
+
+# Installed by Base.metadata.create_all; production gets them from the migration
+for _statement in POSTGRES_DDL:
+    event.listen(database.Base.metadata, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in SQLITE_DDL:
+    event.listen(database.Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def encode_token(seq: int, issued_at: Optional[float] = None) -> str:
+    raw = json.dumps([seq, int(issued_at or time.time())], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_token(token: str) -> int:
+    """The watermark in a token; raises ValueError if malformed, ExpiredToken if too old."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        seq, issued_at = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        seq, issued_at = int(seq), int(issued_at)
+    except (ValueError, TypeError):
+        raise ValueError("malformed sync token")
+    # Tombstones this token would need may already be pruned
+    if time.time() - issued_at > SYNC_RETENTION_DAYS * 86_400:
+        raise ExpiredToken()
+    return seq
+
+
+async def watermark(db: AsyncSession) -> int:
+    """Lowest change_seq that a sync starting now might not have seen. Read it before the changes."""
+    if db.get_bind().dialect.name == "postgresql":
+        result = await db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+    else:
+        result = await db.execute(text("SELECT value + 1 FROM sync_clock"))
+    return result.scalar_one()
+
+
+async def changes(db: AsyncSession, since: int, prompt_id: Optional[int] = None) -> Tuple[dict, dict]:
+    """Rows changed and ids deleted at or after ``since``; raises OverflowError past SYNC_MAX_CHANGES."""
+    queries = {
+        "prompts": select(models.Prompt).where(models.Prompt.change_seq >= since),
+        "responses": select(models.Response).where(models.Response.change_seq >= since),
+        "comments": select(models.Comment).where(models.Comment.change_seq >= since),
+    }
+    tombstones = select(models.Tombstone.entity, models.Tombstone.entity_id).where(models.Tombstone.change_seq >= since)
+    if prompt_id is not None:
+        queries["responses"] = queries["responses"].where(models.Response.prompt_id == prompt_id)
+        queries["comments"] = (
+            queries["comments"]
+            .join(models.Response, models.Response.id == models.Comment.response_id)
+            .where(models.Response.prompt_id == prompt_id)
+        )
+        # Comments that went with their response have no scope; the response's tombstone covers them
+        tombstones = tombstones.where(models.Tombstone.prompt_id == prompt_id)
+
+    changed = {}
+    for kind, stmt in queries.items():
+        model = stmt.column_descriptions[0]["entity"]
+        result = await db.execute(stmt.order_by(model.change_seq, model.id).limit(SYNC_MAX_CHANGES + 1))
+        changed[kind] = result.scalars().all()
+        if len(changed[kind]) > SYNC_MAX_CHANGES:
+            raise OverflowError(kind)
+
+    deleted = {kind: [] for kind in TRACKED_TABLES}
+    result = await db.execute(tombstones.order_by(models.Tombstone.change_seq).limit(SYNC_MAX_CHANGES * len(TRACKED_TABLES) + 1))
+    rows = result.all()
+    if len(rows) > SYNC_MAX_CHANGES * len(TRACKED_TABLES):
+        raise OverflowError("deleted")
+    for entity, entity_id in rows:
+        deleted[entity].append(entity_id)
+    return changed, deleted
+
+
+async def prune(days: int = SYNC_RETENTION_DAYS, batch_size: int = PRUNE_BATCH_SIZE) -> int:
+    """Delete tombstones older than ``days`` in committed batches; returns how many went."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    pruned = 0
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            batch = select(models.Tombstone.id).where(models.Tombstone.deleted_at < cutoff).limit(batch_size)
+            result = await db.execute(delete(models.Tombstone).where(models.Tombstone.id.in_(batch)))
+            await db.commit()
+        pruned += max(result.rowcount, 0)
+        if result.rowcount < batch_size:
+            return pruned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain change tracking for /sync.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prune_parser = subparsers.add_parser("prune", help="delete tombstones older than the retention window")
+    prune_parser.add_argument("--days", type=int, default=SYNC_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        pruned = asyncio.run(prune(args.days))
+        print(f"pruned {pruned} tombstones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-user token version map used to revoke access tokens.
+
+Every access token carries the user's ``token_version`` at issue time. Bumping
+the column (password reset, account deletion) invalidates all older tokens.
+Protected routes only need the current version, so this keeps a small
+``user_id -> version`` map instead of loading whole user rows. Entries expire
+after a short TTL so bumps made by other workers are seen quickly.
+"""
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+TOKEN_VERSION_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_TTL_SECONDS", 30))
+
+# user_id -> (expires_at, version); version None means the user is gone
+_versions: Dict[int, Tuple[float, Optional[int]]] = {}
+
+
+def _remember(user_id: int, version: Optional[int]):
+    _versions[user_id] = (time.monotonic() + TOKEN_VERSION_TTL_SECONDS, version)
+
+
+async def get_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Current token version for a user, or None if the user does not exist or is being purged."""
+    entry = _versions.get(user_id)
+    if entry is not None and entry[0] >= time.monotonic():
+        return entry[1]
+
+    result = await db.execute(select(models.User.token_version).where(models.User.id == user_id, models.User.deleted_at.is_(None)))
+    version = result.scalar_one_or_none()
+    _remember(user_id, version)
+    return version
+
+
+async def bump_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Invalidate every outstanding token for a user. The caller commits."""
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(token_version=models.User.token_version + 1)
+        .returning(models.User.token_version)
+    )
+    version = result.scalar_one_or_none()
+    _remember(user_id, version)
+    return version
+
+
+def forget(user_id: int):
+    """Mark a deleted or hidden user so their tokens are rejected without a query."""
+    _remember(user_id, None)
+
+
+def clear():
+    _versions.clear()
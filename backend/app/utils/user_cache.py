@@ -0,0 +1,153 @@
+"""In-process read-through cache for user rows.
+
+Entries are plain snapshots (not ORM objects) so they can be shared across
+sessions safely. They are indexed by id, username and email, evicted LRU once
+the cache is full and expire after a TTL so other workers' writes are picked
+up eventually. Routes that change a user must call ``invalidate``.
+"""
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10_000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    username: str
+    email: str
+    password: str
+    token_version: int = 0
+
+    @classmethod
+    def from_model(cls, user: models.User) -> "CachedUser":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            password=user.password,
+            token_version=user.token_version or 0,
+        )
+
+
+class UserCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._by_username: Dict[str, int] = {}
+        self._by_email: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, user_id: Optional[int]) -> Optional[CachedUser]:
+        entry = self._entries.get(user_id) if user_id is not None else None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            self.invalidate(user_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return user
+
+    def get_by_id(self, user_id: int) -> Optional[CachedUser]:
+        return self._lookup(user_id)
+
+    def get_by_username(self, username: str) -> Optional[CachedUser]:
+        return self._lookup(self._by_username.get(username))
+
+    def get_by_email(self, email: str) -> Optional[CachedUser]:
+        return self._lookup(self._by_email.get(email))
+
+    def put(self, user: models.User) -> CachedUser:
+        cached = CachedUser.from_model(user)
+        self.invalidate(cached.id)
+        self._entries[cached.id] = (time.monotonic() + self.ttl, cached)
+        self._by_username[cached.username] = cached.id
+        self._by_email[cached.email] = cached.id
+
+        while len(self._entries) > self.max_size:
+            oldest_id = next(iter(self._entries))
+            self.invalidate(oldest_id)
+        return cached
+
+    def invalidate(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        _, user = entry
+        if self._by_username.get(user.username) == user_id:
+            del self._by_username[user.username]
+        if self._by_email.get(user.email) == user_id:
+            del self._by_email[user.email]
+
+    def clear(self):
+        self._entries.clear()
+        self._by_username.clear()
+        self._by_email.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+def _live():
+    # Users queued for purge are gone as far as the API is concerned
+    return models.User.deleted_at.is_(None)
+
+
+async def _load(db: AsyncSession, condition) -> Optional[CachedUser]:
+    result = await db.execute(select(models.User).filter(condition, _live()))
+    user = result.scalars().first()
+    return user_cache.put(user) if user else None
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[CachedUser]:
+    return user_cache.get_by_id(user_id) or await _load(db, models.User.id == user_id)
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[CachedUser]:
+    return user_cache.get_by_username(username) or await _load(db, models.User.username == username)
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[CachedUser]:
+    return user_cache.get_by_email(email) or await _load(db, models.User.email == email)
+
+
+async def get_users_by_id(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, CachedUser]:
+    """Users found for ``user_ids``, with one ``IN`` query for the ones not cached."""
+    found = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        cached = user_cache.get_by_id(user_id)
+        if cached is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = cached
+    if missing:
+        result = await db.execute(select(models.User).where(models.User.id.in_(missing), _live()))
+        for user in result.scalars():
+            found[user.id] = user_cache.put(user)
+    return found
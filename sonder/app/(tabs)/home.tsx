@@ -35,6 +35,19 @@ interface Response {
   user_id: number;
   username: string;
   date: string;
+  comment_count?: number;
+}
+
+interface FeedItem {
+  id: number;
+  content: string;
+  image: string | null;
+  likes: number;
+  prompt_id: number;
+  anonymous: boolean;
+  date: string;
+  comment_count: number;
+  author: { id: number; username: string } | null;
 }
 
 export default function FeedScreen() {
@@ -78,35 +91,17 @@ export default function FeedScreen() {
       if (!prompt) return;
 
       try {
-        const res = await fetch(
-          `http://localhost:8000/response/prompt/${prompt.id}`
-        );
-        const responseData: Response[] = await res.json();
+        // Authors and comment counts come back with the page in one request
+        const res = await fetch("http://localhost:8000/feed/current");
+        const feed: FeedItem[] = (await res.json()).items;
 
-        const enhancedResponses = await Promise.all(
-          responseData.map(async (response: Response) => {
-            try {
-              const userRes = await fetch(
-                `http://localhost:8000/user/${response.user_id}`
-              );
-              const userData = await userRes.json();
-
-              return {
-                ...response,
-                username: userData.username ?? "Unknown User",
-              };
-            } catch (error) {
-              console.error(`Failed to fetch user ${response.user_id}:`, error);
-              return {
-                ...response,
-                username: "Unknown User",
-                date: response.date,
-              };
-            }
-          })
+        setResponses(
+          feed.map((item) => ({
+            ...item,
+            user_id: item.author?.id ?? 0,
+            username: item.author?.username ?? "Anonymous",
+          }))
         );
-
-        setResponses(enhancedResponses);
       } catch (error) {
         console.error("Failed to fetch responses:", error);
       }
@@ -51,7 +51,7 @@ export default function ProfileScreen() {
         const res = await fetch(`http://localhost:8000/response/${userId}`)
         const data = await res.json()
         
-        const responsesArray = Array.isArray(data) ? data : []
+        const responsesArray = Array.isArray(data.items) ? data.items : []
         setResponses(responsesArray)
         console.log("RESPONSES", responsesArray)
 
@@ -48,7 +48,7 @@ export default function ViewProfile() {
         const responsesRes = await fetch(`http://localhost:8000/response/${userData.id}`)
         const responsesData = await responsesRes.json()
         
-        const responsesArray = Array.isArray(responsesData) ? responsesData : []
+        const responsesArray = Array.isArray(responsesData.items) ? responsesData.items : []
         console.log(responsesArray)
         setResponses(responsesArray)
         
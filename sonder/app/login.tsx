@@ -30,7 +30,7 @@ export default function LoginScreen() {
       const data = await response.json();
 
       // Find the user by username
-      const user = data.find((user: any) => user.username === username);
+      const user = data.items.find((user: any) => user.username === username);
       console.log("User", user);
 
       if (!user) {
@@ -38,20 +38,13 @@ export default function LoginScreen() {
         return;
       }
 
-      const [storedSalt, storedHashedPassword] = user.password.split(":");
-
-      if (!storedSalt || !storedHashedPassword) {
+      if (!user.password) {
         alert("Invalid password format");
         return;
       }
-      console.log("HASHPASS BEFORE CHECK:", storedHashedPassword);
 
-      // Send password and stored hash/salt to the backend for validation
-      const isPasswordValid = await verifyPassword(
-        password,
-        storedHashedPassword,
-        storedSalt
-      );
+      // Send password and the stored (encoded) hash to the backend for validation
+      const isPasswordValid = await verifyPassword(password, user.password);
 
       if (isPasswordValid) {
         await AsyncStorage.setItem("userId", user.id.toString());
@@ -66,11 +59,7 @@ export default function LoginScreen() {
   };
 
   // Compare password with stored hash on the backend
-  const verifyPassword = async (
-    password: string,
-    storedHash: string,
-    storedSalt: string
-  ) => {
+  const verifyPassword = async (password: string, storedHash: string) => {
     try {
       const response = await fetch("http://localhost:8000/password/verify", {
         method: "POST",
@@ -78,7 +67,6 @@ export default function LoginScreen() {
         body: JSON.stringify({
           password,
           stored_hash: storedHash,
-          stored_salt: storedSalt,
         }),
       });
 
@@ -64,7 +64,7 @@ export default function PostDetail() {
         const res = await fetch(
           `http://localhost:8000/comment/response/${response_id}`
         );
-        const responseData: Response[] = await res.json();
+        const responseData: Response[] = (await res.json()).items;
   
         // Fetch usernames for each comment
         const commentsWithUsernames = await Promise.all(
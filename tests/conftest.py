@@ -0,0 +1,129 @@
+import os
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+# app.database reads these at import time; tests never touch postgres
+for _key in ("DB_USER", "DB_PASSWORD", "DB_HOST", "DB_NAME"):
+    os.environ.setdefault(_key, "test")
+# Keep signup/login fast in tests; production cost comes from calibration
+os.environ.setdefault("PASSWORD_HASH_ITERATIONS", "1000")
+# Tests drive the prompt pool, index, scheduler, purge and notification queue explicitly instead of via background tasks
+os.environ.setdefault("PROMPT_POOL_SIZE", "0")
+os.environ.setdefault("PROMPT_SCHEDULER_ENABLED", "false")
+os.environ.setdefault("PROMPT_INDEX_REFRESH_SECONDS", "0")
+os.environ.setdefault("PURGE_INTERVAL_SECONDS", "0")
+os.environ.setdefault("NOTIFICATION_FLUSH_INTERVAL_SECONDS", "3600")
+
+from app import database
+from app.main import app
+from app.database import Base
+from app.models import Prompt, Response
+from app.utils import token_versions
+from app.utils.current_prompt import current_prompt
+from app.utils.notifications import notification_queue, unread_counts
+from app.utils.prompt_index import prompt_index
+from app.utils.user_cache import user_cache
+
+
+@pytest.fixture()
+def async_db(tmp_path):
+    """Fresh sqlite database behind the async session factory."""
+    path = tmp_path / "async_test.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def enforce_foreign_keys(dbapi_connection, connection_record):
+        # Postgres always enforces them; routes rely on FK errors
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+    TestingAsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    # get_async_db and the background workers both open sessions from the module-level factory
+    original_session_local = database.AsyncSessionLocal
+    database.AsyncSessionLocal = TestingAsyncSessionLocal
+    user_cache.clear()
+    token_versions.clear()
+    prompt_index.clear()
+    current_prompt.invalidate()
+    notification_queue.clear()
+    unread_counts.clear()
+    yield sync_engine
+    database.AsyncSessionLocal = original_session_local
+    sync_engine.dispose()
+
+
+@pytest.fixture()
+def client(async_db):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture()
+def capture_sql(async_db):
+    """``with capture_sql() as statements:`` records the verb of every statement the app runs."""
+    @contextmanager
+    def capture():
+        statements = []
+        engine = database.AsyncSessionLocal.kw["bind"].sync_engine
+
+        def record(conn, cursor, statement, *args):
+            if not statement.startswith("PRAGMA"):
+                statements.append(statement.split()[0].upper())
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    return capture
+
+
+@pytest.fixture()
+def signup(client):
+    """Register users through the API with password "pw"; returns the responses."""
+    def register(*usernames, email=None):
+        return [
+            client.post("/user/", json={"username": name, "email": email or f"{name}@example.com", "password": "pw"})
+            for name in usernames
+        ]
+    return register
+
+
+@pytest.fixture()
+def auth_headers(client):
+    def login(username):
+        token = client.post("/auth/login", data={"username": username, "password": "pw"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    return login
+
+
+@pytest.fixture()
+def add_prompt(async_db):
+    def add(content="What made you laugh?", **fields):
+        with Session(async_db) as db:
+            prompt = Prompt(content=content, **fields)
+            db.add(prompt)
+            db.commit()
+            return prompt.id
+    return add
+
+
+@pytest.fixture()
+def add_response(async_db):
+    def add(user_id, prompt_id, content="My dog", **fields):
+        with Session(async_db) as db:
+            response = Response(content=content, user_id=user_id, prompt_id=prompt_id, **fields)
+            db.add(response)
+            db.commit()
+            return response.id
+    return add
@@ -0,0 +1,60 @@
+from sqlalchemy.orm import Session
+
+from app.models import Prompt, Response
+
+
+test_user = {
+    "username": "asyncuser",
+    "email": "async@example.com",
+    "password": "asyncpass"
+}
+
+
+def test_create_and_read_user(client):
+    created = client.post("/user/", json=test_user)
+    assert created.status_code == 201
+    user_id = created.json()["id"]
+
+    fetched = client.get(f"/user/{user_id}")
+    assert fetched.status_code == 200
+    assert fetched.json()["username"] == test_user["username"]
+
+    by_name = client.get(f"/user/username/{test_user['username']}")
+    assert by_name.status_code == 200
+    assert by_name.json()["id"] == user_id
+
+
+def test_duplicate_user_rejected(client):
+    assert client.post("/user/", json=test_user).status_code == 201
+    duplicate = client.post("/user/", json=test_user)
+    assert duplicate.status_code == 400
+
+
+def test_comment_round_trip(client, async_db):
+    user_id = client.post("/user/", json=test_user).json()["id"]
+    with Session(async_db) as db:
+        prompt = Prompt(content="What moved you today?", is_active=True)
+        db.add(prompt)
+        db.commit()
+        response = Response(content="A song", user_id=user_id, prompt_id=prompt.id)
+        db.add(response)
+        db.commit()
+        response_id = response.id
+
+    created = client.post(f"/comment/{response_id}", json={"content": "Nice", "user_id": user_id})
+    assert created.status_code == 201
+
+    comments = client.get(f"/comment/response/{response_id}")
+    assert comments.status_code == 200
+    assert [c["content"] for c in comments.json()["items"]] == ["Nice"]
+
+
+def test_login_returns_token(client):
+    client.post("/user/", json=test_user)
+    login = client.post("/auth/login", data={"username": test_user["email"], "password": test_user["password"]})
+    assert login.status_code == 200
+    token = login.json()["access_token"]
+
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json()["username"] == test_user["username"]
@@ -0,0 +1,100 @@
+from jose import jwt
+
+from app.routes.auth import ALGORITHM, SECRET_KEY
+from app.utils.user_cache import user_cache
+
+
+test_user = {
+    "username": "tokenuser",
+    "email": "token@example.com",
+    "password": "tokenpass"
+}
+
+
+def _login(client, password=test_user["password"]):
+    return client.post("/auth/login", data={"username": test_user["username"], "password": password})
+
+
+def test_token_carries_user_claims(client):
+    user_id = client.post("/user/", json=test_user).json()["id"]
+    token = _login(client).json()["access_token"]
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert claims["sub"] == test_user["username"]
+    assert claims["uid"] == user_id
+    assert claims["email"] == test_user["email"]
+    assert claims["ver"] == 0
+
+
+def test_me_does_not_load_user_row(client):
+    client.post("/user/", json=test_user)
+    token = _login(client).json()["access_token"]
+    user_cache.clear()
+
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert me.status_code == 200
+    assert me.json()["username"] == test_user["username"]
+    assert "password" not in me.json()
+    assert user_cache.stats()["misses"] == 0
+
+
+def test_password_reset_revokes_tokens(client):
+    user_id = client.post("/user/", json=test_user).json()["id"]
+    headers = {"Authorization": f"Bearer {_login(client).json()['access_token']}"}
+    assert client.get("/auth/me", headers=headers).status_code == 200
+
+    client.put(f"/user/forgot/{user_id}", json={"new_password": "changed"})
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+    fresh = {"Authorization": f"Bearer {_login(client, 'changed').json()['access_token']}"}
+    assert client.get("/auth/me", headers=fresh).status_code == 200
+
+
+def test_deleted_user_token_rejected(client):
+    user_id = client.post("/user/", json=test_user).json()["id"]
+    headers = {"Authorization": f"Bearer {_login(client).json()['access_token']}"}
+
+    client.delete(f"/user/{user_id}")
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_refresh_token_rotates_without_password(client):
+    client.post("/user/", json=test_user)
+    login = _login(client).json()
+    assert login["refresh_token"]
+
+    rotated = client.post("/auth/refresh-token", json={"refresh_token": login["refresh_token"]})
+    assert rotated.status_code == 200
+    body = rotated.json()
+    assert body["refresh_token"] != login["refresh_token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {body['access_token']}"}).status_code == 200
+
+
+def test_reused_refresh_token_revokes_family(client):
+    client.post("/user/", json=test_user)
+    first = _login(client).json()["refresh_token"]
+    second = client.post("/auth/refresh-token", json={"refresh_token": first}).json()["refresh_token"]
+
+    assert client.post("/auth/refresh-token", json={"refresh_token": first}).status_code == 401
+    assert client.post("/auth/refresh-token", json={"refresh_token": second}).status_code == 401
+
+
+def test_reused_logged_out_token_leaves_other_sessions_alone(client):
+    client.post("/user/", json=test_user)
+    phone = _login(client).json()["refresh_token"]
+    laptop = _login(client).json()["refresh_token"]
+
+    client.post("/auth/logout", json={"refresh_token": phone})
+    assert client.post("/auth/refresh-token", json={"refresh_token": phone}).status_code == 401
+    assert client.post("/auth/refresh-token", json={"refresh_token": laptop}).status_code == 200
+
+
+def test_logout_and_password_reset_revoke_refresh_tokens(client):
+    user_id = client.post("/user/", json=test_user).json()["id"]
+    token = _login(client).json()["refresh_token"]
+    client.post("/auth/logout", json={"refresh_token": token})
+    assert client.post("/auth/refresh-token", json={"refresh_token": token}).status_code == 401
+
+    token = _login(client).json()["refresh_token"]
+    client.put(f"/user/forgot/{user_id}", json={"new_password": "changed"})
+    assert client.post("/auth/refresh-token", json={"refresh_token": token}).status_code == 401
@@ -0,0 +1,79 @@
+from sqlalchemy.orm import Session
+
+from app.models import Comment, Response
+
+
+def test_screen_load_runs_in_one_round_trip(client, async_db, signup, add_prompt):
+    signup("ann", "bob")
+    prompt_id = add_prompt("Now?")
+    result = client.post("/batch/", json={"requests": [
+        {"method": "POST", "path": "/response/1", "body": {"content": "My dog", "prompt_id": prompt_id}},
+        {"method": "POST", "path": "/comment/{0.id}", "body": {"content": "ha", "user_id": 2}},
+        {"method": "GET", "path": "/user/{0.user_id}"},
+        {"method": "GET", "path": "/comment/response/{0.id}"},
+    ]})
+    assert result.status_code == 200
+    batch = result.json()
+    assert [item["status"] for item in batch["results"]] == [201, 201, 200, 200]
+    assert batch["committed"]
+    response_id = batch["results"][0]["body"]["id"]
+    assert batch["results"][1]["body"]["response_id"] == response_id
+    assert batch["results"][2]["body"]["username"] == "ann"
+    assert [comment["content"] for comment in batch["results"][3]["body"]["items"]] == ["ha"]
+
+
+def test_failures_stay_per_request_without_a_transaction(client, async_db, signup, add_prompt):
+    signup("ann", "bob")
+    prompt_id = add_prompt("Now?")
+    batch = client.post("/batch/", json={"requests": [
+        {"method": "POST", "path": "/response/1", "body": {"content": "My dog", "prompt_id": prompt_id}},
+        {"method": "GET", "path": "/user/99"},
+        {"method": "POST", "path": "/comment/{1.id}", "body": {"content": "ha", "user_id": 2}},
+    ]}).json()
+    assert [item["status"] for item in batch["results"]] == [201, 404, 424]
+    with Session(async_db) as db:
+        assert db.query(Response).count() == 1
+
+
+def test_a_transaction_is_all_or_nothing(client, async_db, signup, add_prompt):
+    signup("ann", "bob")
+    prompt_id = add_prompt("Now?")
+    operations = [
+        {"method": "POST", "path": "/response/1", "body": {"content": "My dog", "prompt_id": prompt_id}},
+        {"method": "POST", "path": "/comment/{0.id}", "body": {"content": "ha", "user_id": 2}},
+        # ann already answered this prompt
+        {"method": "POST", "path": "/response/1", "body": {"content": "Again", "prompt_id": prompt_id}},
+        {"method": "GET", "path": "/user/1"},
+    ]
+    batch = client.post("/batch/", json={"requests": operations, "transaction": True}).json()
+    assert [item["status"] for item in batch["results"]] == [201, 201, 400, 424]
+    assert not batch["committed"]
+    with Session(async_db) as db:
+        assert db.query(Response).count() == 0
+        assert db.query(Comment).count() == 0
+
+    batch = client.post("/batch/", json={"requests": operations[:2], "transaction": True}).json()
+    assert batch["committed"]
+    with Session(async_db) as db:
+        assert db.query(Response).count() == 1
+        assert db.query(Comment).count() == 1
+
+
+def test_unbatchable_requests_are_refused(client):
+    assert client.post("/batch/", json={"requests": []}).status_code == 400
+    nested = {"method": "POST", "path": "/batch/", "body": {"requests": []}}
+    assert client.post("/batch/", json={"requests": [nested]}).status_code == 400
+    stream = {"method": "GET", "path": "/feed/live"}
+    assert client.post("/batch/", json={"requests": [stream]}).status_code == 400
+
+
+def test_placeholders_cannot_resolve_to_unbatchable_paths(client, signup):
+    signup("batch", "feed/live")
+    signup("user/../batch", email="dots@example.com")
+    for user_id in (1, 2, 3):
+        batch = client.post("/batch/", json={"requests": [
+            {"method": "GET", "path": f"/user/{user_id}"},
+            {"method": "POST", "path": "/{0.username}/", "body": {"requests": []}},
+        ]})
+        assert batch.status_code == 200
+        assert [item["status"] for item in batch.json()["results"]] == [200, 400]
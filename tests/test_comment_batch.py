@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models import Comment
+
+
+def test_create_comment_skips_existence_selects(client, signup, add_prompt, add_response, capture_sql):
+    signup("ann")
+    response_id = add_response(1, add_prompt())
+
+    with capture_sql() as statements:
+        created = client.post(f"/comment/{response_id}", json={"content": "hi", "user_id": 1})
+    assert created.status_code == 201
+    assert created.json()["content"] == "hi"
+    # SQLite has no data-modifying CTEs: lock the response, insert, bump its stats.
+    # Postgres sends the single WITH ... UPDATE statement instead.
+    assert statements == ["SELECT", "INSERT", "UPDATE"]
+
+
+def test_create_comment_maps_missing_rows_to_404(client, signup, add_prompt, add_response):
+    signup("ann")
+    response_id = add_response(1, add_prompt())
+
+    missing_user = client.post(f"/comment/{response_id}", json={"content": "hi", "user_id": 99})
+    assert missing_user.status_code == 404
+    assert missing_user.json()["detail"] == "User not found"
+
+    missing_response = client.post("/comment/999", json={"content": "hi", "user_id": 1})
+    assert missing_response.status_code == 404
+    assert missing_response.json()["detail"] == "Response not found"
+
+
+def test_batch_groups_comments_per_response_in_one_query(client, async_db, signup, add_prompt, add_response, capture_sql):
+    signup("ann")
+    first, second, empty = [add_response(1, add_prompt(f"Prompt {i}?")) for i in range(3)]
+    # Explicit timestamps: SQLite's CURRENT_TIMESTAMP has no fractional seconds
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    with Session(async_db) as db:
+        db.add_all([Comment(content=f"a{i}", user_id=1, response_id=first, created_at=start + timedelta(seconds=i)) for i in range(3)])
+        db.add(Comment(content="b0", user_id=1, response_id=second, created_at=start))
+        db.commit()
+
+    with capture_sql() as statements:
+        batch = client.get("/comment/batch", params={"response_ids": f"{first},{second},{empty}", "limit": 2})
+    assert batch.status_code == 200
+    assert statements == ["SELECT"]
+
+    groups = {group["response_id"]: group for group in batch.json()}
+    assert [c["content"] for c in groups[first]["items"]] == ["a0", "a1"]
+    assert [c["content"] for c in groups[second]["items"]] == ["b0"]
+    assert groups[second]["next_cursor"] is None
+    assert groups[empty] == {"response_id": empty, "items": [], "next_cursor": None}
+
+    rest = client.get(f"/comment/response/{first}", params={"cursor": groups[first]["next_cursor"]}).json()
+    assert [c["content"] for c in rest["items"]] == ["a2"]
+
+
+def test_batch_rejects_bad_ids(client, async_db):
+    assert client.get("/comment/batch", params={"response_ids": "1,x"}).status_code == 400
+    assert client.get("/comment/batch", params={"response_ids": ",".join(map(str, range(101)))}).status_code == 400
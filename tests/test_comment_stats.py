@@ -0,0 +1,52 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models import Response
+from app.utils.comment_stats import repair
+
+
+def _stats(engine, response_id):
+    with Session(engine) as db:
+        response = db.get(Response, response_id)
+        return response.comment_count, [entry["content"] for entry in response.comment_preview]
+
+
+def test_comments_maintain_count_and_latest_preview(client, async_db, signup, add_prompt, add_response):
+    signup("ann")
+    prompt_id = add_prompt()
+    response_id = add_response(1, prompt_id)
+    for i in range(4):
+        client.post(f"/comment/{response_id}", json={"content": f"c{i}", "user_id": 1})
+
+    assert _stats(async_db, response_id) == (4, ["c3", "c2", "c1"])
+
+    listed = client.get(f"/response/prompt/{prompt_id}").json()["items"][0]
+    assert listed["comment_count"] == 4
+    assert [entry["content"] for entry in listed["comment_preview"]] == ["c3", "c2", "c1"]
+
+
+def test_deleting_a_previewed_comment_refills_the_preview(client, async_db, signup, add_prompt, add_response):
+    signup("ann")
+    response_id = add_response(1, add_prompt())
+    ids = [client.post(f"/comment/{response_id}", json={"content": f"c{i}", "user_id": 1}).json()["id"] for i in range(4)]
+
+    assert client.delete(f"/comment/{ids[3]}").status_code == 200
+    assert _stats(async_db, response_id) == (3, ["c2", "c1", "c0"])
+
+    assert client.delete(f"/comment/{ids[0]}").status_code == 200
+    assert _stats(async_db, response_id) == (2, ["c2", "c1"])
+    assert client.delete(f"/comment/{ids[0]}").status_code == 404
+
+
+def test_repair_fixes_drifted_counters(client, async_db, signup, add_prompt, add_response):
+    signup("ann")
+    response_id = add_response(1, add_prompt())
+    for i in range(2):
+        client.post(f"/comment/{response_id}", json={"content": f"c{i}", "user_id": 1})
+    with Session(async_db) as db:
+        db.execute(update(Response).values(comment_count=7, comment_preview=[]))
+        db.commit()
+
+    assert client.portal.call(repair) == 1
+    assert _stats(async_db, response_id) == (2, ["c1", "c0"])
+    assert client.portal.call(repair) == 0
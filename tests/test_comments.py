@@ -7,7 +7,6 @@ from datetime import datetime
 from app.main import app
 from app.database import Base, get_db
 from app.models import Comment, User, Response
-from app.routes.prompt import generate_prompt
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timezone
+
+from app.utils.current_prompt import current_prompt
+from app.utils.prompt_scheduler import prompt_scheduler
+
+
+def test_current_prompt_supports_conditional_get(client, add_prompt):
+    prompt_id = add_prompt("What are you proud of?", is_active=True)
+
+    first = client.get("/prompt/current")
+    assert first.status_code == 200
+    assert [p["id"] for p in first.json()] == [prompt_id]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    etag = first.headers["etag"]
+
+    again = client.get("/prompt/current", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+
+def test_prompt_routes_invalidate_the_cache(client, add_prompt):
+    prompt_id = add_prompt("What are you proud of?", is_active=True)
+    etag = client.get("/prompt/current").headers["etag"]
+
+    assert client.put(f"/prompt/off/{prompt_id}").status_code == 200
+    after = client.get("/prompt/current", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json() == []
+
+    assert client.put(f"/prompt/on/{prompt_id}").status_code == 200
+    assert [p["id"] for p in client.get("/prompt/current").json()] == [prompt_id]
+
+
+def test_concurrent_misses_run_one_query(client, add_prompt, capture_sql):
+    add_prompt("What are you proud of?", is_active=True)
+    async def burst():
+        return await asyncio.gather(*(current_prompt.get() for _ in range(5000)))
+
+    with capture_sql() as statements:
+        results = client.portal.call(burst)
+
+    assert statements.count("SELECT") == 1
+    assert len({entry.etag for entry in results}) == 1
+
+
+def test_scheduler_activation_warms_the_cache(client, add_prompt):
+    when = datetime.now(timezone.utc)
+    prompt_id = add_prompt("Where do you feel calm?", scheduled_for=when)
+    assert client.get("/prompt/current").json() == []
+
+    prompt_scheduler.schedule(prompt_id, when)
+    assert client.portal.call(prompt_scheduler.run_due).id == prompt_id
+
+    loads = current_prompt.loads
+    assert [p["id"] for p in client.get("/prompt/current").json()] == [prompt_id]
+    assert current_prompt.loads == loads
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models import Comment, Prompt, Response, User
+from app.utils.comment_stats import repair
+
+
+def _seed(engine):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    with Session(engine) as db:
+        old = Prompt(content="Where did you grow up?")
+        current = Prompt(content="What are you proud of?", is_active=True)
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", password="x") for i in range(4)]
+        db.add_all([old, current, *users])
+        db.flush()
+        rows = [
+            Response(content=f"r{i}", user_id=users[i].id, prompt_id=current.id, likes=i,
+                     anonymous=(i == 1), date=start + timedelta(minutes=i))
+            for i in range(4)
+        ]
+        rows.append(Response(content="old", user_id=users[0].id, prompt_id=old.id, date=start))
+        db.add_all(rows)
+        db.flush()
+        db.add_all([Comment(content=f"c{i}", user_id=users[0].id, response_id=rows[2].id) for i in range(3)])
+        db.add(Comment(content="hi", user_id=users[1].id, response_id=rows[0].id))
+        db.commit()
+        return [row.id for row in rows[:4]]
+
+
+def test_feed_joins_authors_and_comment_counts(client, async_db):
+    ids = _seed(async_db)
+    client.portal.call(repair)
+
+    page = client.get("/feed/current")
+    assert page.status_code == 200
+    items = page.json()["items"]
+    assert [item["id"] for item in items] == ids[::-1]
+    by_id = {item["id"]: item for item in items}
+    assert by_id[ids[0]]["author"] == {"id": 1, "username": "u0"}
+    assert by_id[ids[0]]["comment_count"] == 1
+    assert by_id[ids[2]]["comment_count"] == 3
+    assert [c["content"] for c in by_id[ids[2]]["comment_preview"]] == ["c2", "c1", "c0"]
+    assert by_id[ids[3]]["comment_count"] == 0
+    assert by_id[ids[3]]["likes"] == 3
+    # Anonymous responses don't reveal who wrote them
+    assert by_id[ids[1]]["author"] is None
+    assert "user_id" not in by_id[ids[1]]
+
+
+def test_feed_pages_with_one_query_each(client, async_db, capture_sql):
+    ids = _seed(async_db)
+    with capture_sql() as statements:
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            body = client.get("/feed/current", params=params).json()
+            seen += [item["id"] for item in body["items"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+    assert seen == ids[::-1]
+    assert len(statements) == 2
+
+
+def test_feed_is_empty_without_an_active_prompt(client, async_db):
+    assert client.get("/feed/current").json() == {"items": [], "next_cursor": None}
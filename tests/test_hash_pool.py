@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.hash_pool import HashPool
+
+
+def test_hash_pool_runs_off_loop():
+    pool = HashPool(workers=2, max_pending=4)
+    loop_thread = threading.get_ident()
+
+    async def main():
+        return await pool.run(threading.get_ident)
+
+    assert asyncio.run(main()) != loop_thread
+    pool.shutdown()
+
+
+def test_hash_pool_rejects_when_saturated():
+    pool = HashPool(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def main():
+        blocked = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        assert pool.pending == 1
+        with pytest.raises(HTTPException) as excinfo:
+            await pool.run(release.wait, 5)
+        assert excinfo.value.status_code == 503
+        release.set()
+        await blocked
+
+    asyncio.run(main())
+    assert pool.rejected == 1
+    pool.shutdown()
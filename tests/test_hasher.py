@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+from app.utils import hasher
+
+
+def _legacy_hash(password):
+    salt = os.urandom(32)
+    hashed = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100)
+    return salt.hex() + ':' + hashed.hex()
+
+
+def test_hash_round_trip():
+    encoded = hasher.hash_password("hunter2")
+    algorithm, iterations, salt, _ = hasher.decode(encoded)
+    assert algorithm == hasher.ALGORITHM
+    assert iterations == hasher.PASSWORD_HASH_ITERATIONS
+    assert len(salt) == hasher.SALT_BYTES
+    assert hasher.verify_password("hunter2", encoded)
+    assert not hasher.verify_password("hunter3", encoded)
+    assert not hasher.needs_rehash(encoded)
+
+
+def test_legacy_hash_verifies_and_needs_rehash():
+    legacy = _legacy_hash("hunter2")
+    assert hasher.verify_password("hunter2", legacy)
+    assert hasher.needs_rehash(legacy)
+
+
+def test_outdated_cost_needs_rehash():
+    encoded = hasher.hash_password("hunter2", iterations=hasher.PASSWORD_HASH_ITERATIONS - 1)
+    assert hasher.verify_password("hunter2", encoded)
+    assert hasher.needs_rehash(encoded)
+
+
+def test_garbage_never_verifies():
+    assert not hasher.verify_password("hunter2", "not-a-hash")
+    assert hasher.needs_rehash("not-a-hash")
+
+
+def test_untrusted_costs_are_refused_without_hashing(client, monkeypatch):
+    def fail(*args):
+        raise AssertionError("hashed an untrusted cost")
+
+    monkeypatch.setattr(hasher, "_pbkdf2", fail)
+    too_costly = f"{hasher.ALGORITHM}${hasher.PASSWORD_HASH_MAX_ITERATIONS + 1}$00$00"
+    for stored in (too_costly, f"{hasher.ALGORITHM}$0$00$00", f"{hasher.ALGORITHM}$-5$00$00"):
+        assert not hasher.verify_password("hunter2", stored)
+        refused = client.post("/password/verify", json={"password": "hunter2", "stored_hash": stored})
+        assert refused.status_code == 400
+
+
+def test_login_upgrades_legacy_hash(client, async_db):
+    from sqlalchemy.orm import Session
+    from app.models import User
+
+    with Session(async_db) as db:
+        db.add(User(username="legacy", email="legacy@example.com", password=_legacy_hash("oldpass")))
+        db.commit()
+
+    login = client.post("/auth/login", data={"username": "legacy", "password": "oldpass"})
+    assert login.status_code == 200
+
+    with Session(async_db) as db:
+        stored = db.query(User).filter(User.username == "legacy").one().password
+    assert stored.startswith(hasher.ALGORITHM + "$")
+    assert not hasher.needs_rehash(stored)
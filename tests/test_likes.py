@@ -0,0 +1,59 @@
+import asyncio
+
+from sqlalchemy.orm import Session
+
+from app.models import Response, ResponseLike
+from app.utils.like_counter import LikeCounter, like_counter
+
+
+def _likes(engine, response_id):
+    with Session(engine) as db:
+        return db.get(Response, response_id).likes
+
+
+def test_like_is_idempotent_and_coalesced(client, async_db, signup, auth_headers, add_prompt, add_response):
+    signup("liker", "other")
+    headers, other = auth_headers("liker"), auth_headers("other")
+    response_id = add_response(1, add_prompt(), likes=0)
+
+    for _ in range(3):
+        assert client.post(f"/response/{response_id}/like", headers=headers).json()["liked"]
+    client.post(f"/response/{response_id}/like", headers=other)
+    assert like_counter.pending(response_id) == 2
+
+    client.portal.call(like_counter.flush)
+    assert _likes(async_db, response_id) == 2
+    with Session(async_db) as db:
+        assert db.query(ResponseLike).count() == 2
+
+
+def test_unlike_decrements_once(client, async_db, signup, auth_headers, add_prompt, add_response):
+    signup("liker")
+    headers = auth_headers("liker")
+    response_id = add_response(1, add_prompt(), likes=0)
+
+    client.post(f"/response/{response_id}/like", headers=headers)
+    client.delete(f"/response/{response_id}/like", headers=headers)
+    client.delete(f"/response/{response_id}/like", headers=headers)
+    assert like_counter.pending(response_id) == 0
+
+    client.portal.call(like_counter.flush)
+    assert _likes(async_db, response_id) == 0
+
+
+def test_like_requires_auth(client, add_prompt, add_response):
+    response_id = add_response(1, add_prompt(), likes=0)
+    assert client.post(f"/response/{response_id}/like").status_code == 401
+
+
+def test_failed_flush_keeps_deltas(monkeypatch):
+    counter = LikeCounter(interval=60)
+    counter.add(7, 3)
+
+    def broken_session():
+        raise RuntimeError("database down")
+
+    from app import database
+    monkeypatch.setattr(database, "AsyncSessionLocal", broken_session)
+    assert asyncio.run(counter.flush()) == 0
+    assert counter.pending(7) == 3
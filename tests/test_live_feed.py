@@ -0,0 +1,67 @@
+import asyncio
+
+from sqlalchemy.orm import Session
+
+from app.models import Response
+from app.routes.feed import sse_event
+from app.utils import live_feed
+from app.utils.broadcaster import OVERFLOW, Broadcaster, MemoryBackend
+from app.utils.like_counter import like_counter
+
+
+def test_slow_subscribers_are_dropped_with_an_overflow_marker():
+    async def scenario():
+        hub = Broadcaster(MemoryBackend(), queue_size=2)
+        await hub.start()
+        async with hub.subscribe("feed") as fast, hub.subscribe("feed") as slow:
+            await hub.publish("feed", {"type": "a"})
+            assert await fast.get(0) == {"type": "a"}
+            await hub.publish("feed", {"type": "b"})
+            await hub.publish("feed", {"type": "c"})
+
+            assert slow.overflowed
+            assert await slow.get(0) is OVERFLOW
+            assert [await fast.get(0), await fast.get(0)] == [{"type": "b"}, {"type": "c"}]
+            assert hub.subscribers("feed") == 1
+            assert hub.dropped == 1
+        assert not hub.has_audience("feed")
+
+    asyncio.run(scenario())
+
+
+def test_follow_heartbeats_while_idle():
+    async def scenario():
+        stream = live_feed.follow(heartbeat=0.01)
+        assert await stream.__anext__() is None
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    assert sse_event({"type": "likes", "data": {"deltas": {"1": 2}}}) == 'event: likes\ndata: {"deltas":{"1":2}}\n\n'
+
+
+def test_websocket_pushes_current_prompt_activity(client, async_db, signup, add_prompt):
+    signup("ann", "bob")
+    current_id = add_prompt("Now?", is_active=True)
+    old_id = add_prompt("Before?")
+
+    with client.websocket_connect("/feed/live/ws") as socket:
+        # Not the current prompt, so nobody hears about it
+        client.post("/response/2", json={"content": "late", "prompt_id": old_id})
+        response_id = client.post("/response/1", json={"content": "My dog", "prompt_id": current_id}).json()["id"]
+        pushed = socket.receive_json()
+        assert pushed["type"] == "response"
+        assert pushed["data"]["id"] == response_id
+        assert pushed["data"]["author"] == {"id": 1, "username": "ann"}
+
+        client.post(f"/comment/{response_id}", json={"content": "ha", "user_id": 2})
+        pushed = socket.receive_json()
+        assert pushed["type"] == "comment"
+        assert pushed["data"]["comment_count"] == 1
+        assert pushed["data"]["comment"]["content"] == "ha"
+
+        like_counter.add(response_id, 3)
+        client.portal.call(like_counter.flush)
+        assert socket.receive_json() == {"type": "likes", "data": {"deltas": {str(response_id): 3}}}
+
+    with Session(async_db) as db:
+        assert db.query(Response).count() == 2
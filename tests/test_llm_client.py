@@ -0,0 +1,230 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.utils.llm_client import CircuitBreaker, CircuitOpenError, LLMClient, LLMError
+
+
+class FakeLLM:
+    """Local HTTP server that answers each request with the next scripted (status, delay[, raw body])."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with fake.lock:
+                    status, delay, *raw = fake.script[min(fake.calls, len(fake.script) - 1)]
+                    fake.calls += 1
+                time.sleep(delay)
+                body = raw[0] if raw else json.dumps({"status": status}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/generate"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_llm():
+    servers = []
+
+    def start(*script):
+        server = FakeLLM(script)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def _call(client, times=1):
+    async def run():
+        try:
+            return [await client.post_json({"q": "hi"}) for _ in range(times)]
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_retries_server_errors_then_succeeds(fake_llm):
+    server = fake_llm((503, 0), (500, 0), (200, 0))
+    client = LLMClient(server.url, max_retries=2, backoff_base=0.01)
+
+    assert _call(client) == [{"status": 200}]
+    assert server.calls == 3
+    stats = client.metrics.snapshot()
+    assert stats["retries"] == 2
+    assert stats["successes"] == 1
+    assert stats["latency_ms_p50"] is not None
+
+
+def test_client_errors_are_not_retried(fake_llm):
+    server = fake_llm((400, 0))
+    client = LLMClient(server.url, max_retries=3, backoff_base=0.01)
+
+    with pytest.raises(LLMError):
+        _call(client)
+    assert server.calls == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_attempt_times_out_and_is_retried(fake_llm):
+    server = fake_llm((200, 1.0), (200, 0))
+    client = LLMClient(server.url, timeout=0.2, max_retries=1, backoff_base=0.01)
+
+    assert _call(client) == [{"status": 200}]
+    assert client.metrics.snapshot()["timeouts"] == 1
+
+
+def test_deadline_bounds_total_time(fake_llm):
+    server = fake_llm((200, 1.0))
+    client = LLMClient(server.url, timeout=5, deadline=0.3, max_retries=5)
+
+    started = time.monotonic()
+    with pytest.raises(LLMError):
+        _call(client)
+    assert time.monotonic() - started < 0.9
+
+
+def test_hedged_request_wins_over_slow_attempt(fake_llm):
+    server = fake_llm((200, 1.0), (200, 0))
+    client = LLMClient(server.url, hedge_after=0.1, max_retries=0)
+
+    started = time.monotonic()
+    assert _call(client) == [{"status": 200}]
+    assert time.monotonic() - started < 0.8
+    assert server.calls == 2
+    assert client.metrics.snapshot()["hedges"] == 1
+
+
+def test_circuit_opens_after_repeated_failures_and_recovers(fake_llm):
+    server = fake_llm((503, 0), (503, 0), (200, 0))
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    client = LLMClient(server.url, max_retries=0, breaker=breaker)
+
+    async def run():
+        try:
+            for _ in range(2):
+                with pytest.raises(LLMError):
+                    await client.post_json({})
+            assert breaker.state == CircuitBreaker.OPEN
+            with pytest.raises(CircuitOpenError):
+                await client.post_json({})
+            calls_while_open = server.calls
+
+            await asyncio.sleep(0.25)
+            assert await client.post_json({}) == {"status": 200}
+            return calls_while_open
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == 2
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert client.metrics.snapshot()["circuit_rejections"] == 1
+
+
+def test_half_open_probe_is_released_on_garbage_or_cancellation(fake_llm):
+    server = fake_llm((503, 0), (200, 0, b"<html>Bad gateway</html>"), (200, 1.0), (200, 0))
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    client = LLMClient(server.url, max_retries=0, breaker=breaker)
+
+    async def run():
+        try:
+            with pytest.raises(LLMError):
+                await client.post_json({})
+            await asyncio.sleep(0.15)
+            # The probe gets a non-JSON 200: a failure, not a stuck probe
+            with pytest.raises(LLMError):
+                await client.post_json({})
+            assert breaker.state == CircuitBreaker.OPEN
+
+            await asyncio.sleep(0.15)
+            probe = asyncio.ensure_future(client.post_json({}))
+            await asyncio.sleep(0.1)
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+            assert await client.post_json({}) == {"status": 200}
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_only_the_probe_frees_the_probe_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    admitted_while_closed = breaker.allow()
+    breaker.record_failure()
+    probe = breaker.allow()
+    assert probe is not None and breaker.state == CircuitBreaker.HALF_OPEN
+
+    # A call from before the trip finishing late leaves the probe slot taken
+    breaker.release(admitted_while_closed)
+    assert breaker.allow() is None
+    breaker.release(probe)
+    assert breaker.allow() is not None
+
+
+def test_cancelled_hedged_call_cancels_its_attempt(fake_llm):
+    server = fake_llm((200, 0.5))
+    client = LLMClient(server.url, hedge_after=1.0)
+
+    async def run():
+        try:
+            call = asyncio.ensure_future(client.post_json({}))
+            await asyncio.sleep(0.1)
+            call.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await call
+            await asyncio.sleep(0.01)
+            return [task for task in asyncio.all_tasks() if not task.done() and task is not asyncio.current_task()]
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == []
+
+
+def test_connections_are_reused(fake_llm):
+    server = fake_llm((200, 0))
+    client = LLMClient(server.url)
+    pool_sizes = []
+
+    async def run():
+        try:
+            for _ in range(3):
+                await client.post_json({})
+                pool = client._client._transport._pool
+                pool_sizes.append(len(pool.connections))
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert pool_sizes == [1, 1, 1]
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+
+from app import database
+from app.models import Comment, Notification, Prompt, Response, User
+from app.utils.loaders import Loaders
+from app.utils.user_cache import user_cache
+
+
+@pytest.fixture()
+def seed(signup, add_prompt, add_response):
+    """Users ``names`` and three prompts, with a response from each user to each prompt."""
+    def create(*names):
+        signup(*names)
+        prompt_ids = [add_prompt(f"Prompt {index}?") for index in range(3)]
+        for user_id in range(1, len(names) + 1):
+            for prompt_id in prompt_ids:
+                add_response(user_id, prompt_id, f"{user_id} on {prompt_id}")
+    return create
+
+
+def test_loader_fetches_a_screen_of_authors_with_one_query(client, seed, capture_sql):
+    seed("ann", "bob", "cat")
+    user_cache.clear()
+
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            responses = (await db.execute(select(Response).order_by(Response.id))).scalars().all()
+            loaders = Loaders(db)
+            with capture_sql() as statements:
+                authors = await asyncio.gather(*(loaders.users.load(response.user_id) for response in responses))
+                again = await loaders.users.load(1)
+            return responses, authors, again, statements, loaders
+
+    responses, authors, again, statements, loaders = client.portal.call(scenario)
+    assert len(responses) == 9
+    assert [author.id for author in authors] == [response.user_id for response in responses]
+    assert again.username == "ann"
+    # Nine rows, one query
+    assert statements == ["SELECT"]
+    assert loaders.users.queries == 1
+
+
+def test_relationships_refuse_to_lazy_load(client, async_db, seed):
+    seed("ann")
+    client.post("/comment/1", json={"content": "ha", "user_id": 1})
+    with Session(async_db) as db:
+        db.add(Notification(type="comment", user_id=1, response_id=1))
+        db.commit()
+    with Session(async_db) as db:
+        rows = [db.query(model).first() for model in (User, Prompt, Response, Comment, Notification)]
+        for row in rows:
+            for relationship in row.__mapper__.relationships:
+                with pytest.raises(InvalidRequestError):
+                    getattr(row, relationship.key)
+
+
+def test_user_batch_endpoint(client, seed, capture_sql):
+    seed("ann", "bob", "cat")
+    user_cache.clear()
+    with capture_sql() as statements:
+        result = client.get("/user/batch", params={"ids": "3,1,99,3"})
+    assert result.status_code == 200
+    assert result.json() == [
+        {"id": 3, "username": "cat", "email": "cat@example.com"},
+        {"id": 1, "username": "ann", "email": "ann@example.com"},
+    ]
+    assert statements == ["SELECT"]
+
+    # Now cached, so no query at all
+    with capture_sql() as statements:
+        assert len(client.get("/user/batch", params={"ids": "1,3"}).json()) == 2
+    assert statements == []
+
+    assert client.get("/user/batch", params={"ids": "1,x"}).status_code == 400
+    assert client.get("/user/batch", params={"ids": ",".join(str(i) for i in range(1, 102))}).status_code == 400
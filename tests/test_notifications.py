@@ -0,0 +1,101 @@
+from sqlalchemy.orm import Session
+
+from app.models import Notification
+from app.utils.notifications import notification_queue
+
+
+def test_comments_notify_the_response_owner_in_one_bulk_insert(client, signup, auth_headers, add_prompt, add_response, capture_sql):
+    signup("ann", "bob")
+    response_id = add_response(1, add_prompt())
+    client.post(f"/comment/{response_id}", json={"content": "mine", "user_id": 1})
+    for i in range(3):
+        client.post(f"/comment/{response_id}", json={"content": f"ha {i}", "user_id": 2})
+    assert notification_queue.pending() == 3
+
+    with capture_sql() as statements:
+        assert client.portal.call(notification_queue.flush) == 3
+    assert statements == ["INSERT"]
+
+    ann = auth_headers("ann")
+    first = client.get("/notification/?limit=2", headers=ann).json()
+    assert [item["content"] for item in first["items"]] == ["ha 2", "ha 1"]
+    assert first["items"][0]["type"] == "comment"
+    assert first["items"][0]["response_id"] == response_id
+    rest = client.get(f"/notification/?limit=2&cursor={first['next_cursor']}", headers=ann).json()
+    assert [item["content"] for item in rest["items"]] == ["ha 0"]
+    assert rest["next_cursor"] is None
+
+    assert client.get("/notification/", headers=auth_headers("bob")).json()["items"] == []
+    assert client.get("/notification/").status_code == 401
+
+
+def test_unread_count_is_cached_and_kept_in_step(client, signup, auth_headers, add_prompt, add_response, capture_sql):
+    signup("ann", "bob")
+    response_id = add_response(1, add_prompt())
+    ann = auth_headers("ann")
+    client.post(f"/comment/{response_id}", json={"content": "one", "user_id": 2})
+    client.portal.call(notification_queue.flush)
+
+    assert client.get("/notification/unread-count", headers=ann).json() == {"unread": 1}
+    client.post(f"/comment/{response_id}", json={"content": "two", "user_id": 2})
+    client.post(f"/comment/{response_id}", json={"content": "three", "user_id": 2})
+    client.portal.call(notification_queue.flush)
+
+    # Served from the cache, which the flush adjusted
+    with capture_sql() as statements:
+        assert client.get("/notification/unread-count", headers=ann).json() == {"unread": 3}
+    assert statements == []
+
+    ids = [item["id"] for item in client.get("/notification/", headers=ann).json()["items"]]
+    marked = client.post("/notification/read", json={"ids": ids[:2]}, headers=ann)
+    assert marked.json() == {"updated": 2, "unread": 1}
+    assert client.post("/notification/read", json={"ids": ids[:2]}, headers=ann).json() == {"updated": 0, "unread": 1}
+    # Someone else's notifications are out of reach
+    assert client.post("/notification/read", json={"all": True}, headers=auth_headers("bob")).json() == {"updated": 0, "unread": 0}
+
+    assert client.post("/notification/read", json={"all": True}, headers=ann).json() == {"updated": 1, "unread": 0}
+    assert [item["is_read"] for item in client.get("/notification/", headers=ann).json()["items"]] == [True] * 3
+    assert client.post("/notification/read", json={}, headers=ann).status_code == 400
+
+
+def test_new_prompt_fans_out_in_one_statement(client, async_db, signup, capture_sql, add_prompt):
+    signup("ann", "bob", "cat")
+    prompt_id = add_prompt("Best meal this week?")
+
+    with capture_sql() as statements:
+        assert client.put(f"/prompt/on/{prompt_id}").status_code == 200
+    assert statements.count("INSERT") == 1
+
+    with Session(async_db) as db:
+        rows = db.query(Notification).filter(Notification.prompt_id == prompt_id).all()
+        assert sorted(row.user_id for row in rows) == [1, 2, 3]
+        assert {row.type for row in rows} == {"prompt"}
+
+    # Announced once, however often it is switched on
+    client.put(f"/prompt/off/{prompt_id}")
+    client.put(f"/prompt/on/{prompt_id}")
+    with Session(async_db) as db:
+        assert db.query(Notification).filter(Notification.prompt_id == prompt_id).count() == 3
+
+
+def test_creating_an_active_prompt_announces_it(client, async_db, signup, auth_headers):
+    signup("ann", "bob")
+    assert client.get("/notification/unread-count", headers=auth_headers("ann")).json() == {"unread": 0}
+
+    prompt_id = client.post("/prompt/", json={"is_active": True}).json()["id"]
+    with Session(async_db) as db:
+        rows = db.query(Notification).filter(Notification.prompt_id == prompt_id).all()
+        assert sorted(row.user_id for row in rows) == [1, 2]
+    # The cached count was dropped with the fan-out
+    assert client.get("/notification/unread-count", headers=auth_headers("ann")).json() == {"unread": 1}
+
+
+def test_flush_drops_only_notifications_whose_targets_are_gone(client, async_db, signup):
+    signup("ann")
+    notification_queue.enqueue(1, "comment", content="kept")
+    notification_queue.enqueue(1, "comment", content="orphaned", response_id=999)
+
+    assert client.portal.call(notification_queue.flush) == 1
+    with Session(async_db) as db:
+        assert [row.content for row in db.query(Notification)] == ["kept"]
+    assert notification_queue.pending() == 0
@@ -0,0 +1,77 @@
+import importlib.util
+import logging
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, inspect, text
+
+from app.utils.online_migrations import backfill, create_index_concurrently, set_not_null
+
+
+@pytest.fixture()
+def conn(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, n INTEGER, doubled INTEGER)"))
+        conn.execute(text("INSERT INTO items (id, n) VALUES " + ",".join(f"({i}, {i})" for i in range(1, 26))))
+        conn.commit()
+        with Operations.context(MigrationContext.configure(conn)):
+            yield conn
+    engine.dispose()
+
+
+def test_backfill_batches_and_reports_progress(conn, caplog):
+    with caplog.at_level(logging.INFO, logger="alembic.online"):
+        updated = backfill("items", "doubled = n * 2", pending="doubled IS NULL", batch_size=10, pause=0)
+
+    assert updated == 25
+    assert conn.execute(text("SELECT count(*) FROM items WHERE doubled = n * 2")).scalar() == 25
+    progress = [r.getMessage() for r in caplog.records if "rows updated" in r.getMessage()]
+    assert len(progress) == 3
+    assert progress[-1].endswith("(100%)")
+
+
+def test_backfill_resumes_from_pending_rows(conn):
+    conn.execute(text("UPDATE items SET doubled = n * 2 WHERE id <= 20"))
+    conn.commit()
+    assert backfill("items", "doubled = n * 2", pending="doubled IS NULL", batch_size=10, pause=0) == 5
+    assert backfill("items", "doubled = n * 2", pending="doubled IS NULL", batch_size=10, pause=0) == 0
+
+
+def test_create_index_falls_back_outside_postgres(conn):
+    create_index_concurrently("ix_items_n", "items", ["n"], where="n > 0")
+    assert "ix_items_n" in {ix["name"] for ix in inspect(conn).get_indexes("items")}
+
+
+def test_set_not_null_falls_back_outside_postgres(conn):
+    conn.execute(text("UPDATE items SET doubled = n * 2"))
+    set_not_null("items", "doubled")
+    column = next(c for c in inspect(conn).get_columns("items") if c["name"] == "doubled")
+    assert column["nullable"] is False
+
+
+def test_query_index_migration_removes_duplicates_first(conn):
+    path = Path(__file__).parents[1] / "backend" / "alembic" / "versions" / "6a611cd0db16_add_query_indexes.py"
+    spec = importlib.util.spec_from_file_location("add_query_indexes", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    for ddl in (
+        "CREATE TABLE prompts (id INTEGER PRIMARY KEY, is_active BOOLEAN, created_at TIMESTAMP)",
+        "CREATE TABLE responses (id INTEGER PRIMARY KEY, user_id INTEGER, prompt_id INTEGER, date TIMESTAMP)",
+        "CREATE TABLE comments (id INTEGER PRIMARY KEY, response_id INTEGER, created_at TIMESTAMP)",
+        "CREATE TABLE notifications (id INTEGER PRIMARY KEY, response_id INTEGER)",
+        "INSERT INTO prompts VALUES (1, 1, '2026-01-01'), (2, 1, '2026-01-02'), (3, 0, '2026-01-03')",
+        "INSERT INTO responses VALUES (1, 1, 1, '2026-01-01'), (2, 1, 1, '2026-01-02'), (3, 2, 1, '2026-01-01')",
+        "INSERT INTO comments VALUES (1, 1, NULL), (2, 3, NULL)",
+        "INSERT INTO notifications VALUES (1, 1), (2, NULL)",
+    ):
+        conn.execute(text(ddl))
+
+    migration.upgrade()
+
+    assert conn.execute(text("SELECT id FROM prompts WHERE is_active")).scalars().all() == [2]
+    assert conn.execute(text("SELECT id FROM responses ORDER BY id")).scalars().all() == [2, 3]
+    assert conn.execute(text("SELECT response_id FROM comments ORDER BY id")).all() == [(2,), (3,)]
+    assert conn.execute(text("SELECT response_id FROM notifications ORDER BY id")).all() == [(2,), (None,)]
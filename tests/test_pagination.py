@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.models import Comment, Prompt, Response, User
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def _seed(engine, responses=7, comments=5):
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    with Session(engine) as db:
+        prompt = Prompt(content="Where did you grow up?", created_at=start)
+        db.add(prompt)
+        db.flush()
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", password="x") for i in range(responses)]
+        db.add_all(users)
+        db.flush()
+        # Pairs of responses share a timestamp so the id tie-breaker matters
+        rows = [
+            Response(content=f"r{i}", user_id=users[i].id, prompt_id=prompt.id, date=start + timedelta(minutes=i // 2))
+            for i in range(responses)
+        ]
+        db.add_all(rows)
+        db.flush()
+        db.add_all([
+            Comment(content=f"c{i}", user_id=users[0].id, response_id=rows[0].id, created_at=start + timedelta(seconds=i))
+            for i in range(comments)
+        ])
+        db.commit()
+        return prompt.id, rows[0].id
+
+
+def _collect(client, url, limit, cursor=None):
+    items = []
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get(url, params=params)
+        assert page.status_code == 200
+        body = page.json()
+        items.extend(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_cursor_round_trip():
+    when = datetime(2026, 1, 1, 12, 30)
+    cursor = encode_cursor([when, 42])
+    assert decode_cursor(cursor, [Response.date, Response.id]) == [when, 42]
+
+
+def test_responses_page_newest_first_without_gaps(client, async_db):
+    prompt_id, _ = _seed(async_db)
+    items = _collect(client, f"/response/prompt/{prompt_id}", limit=2)
+    assert [r["content"] for r in items] == ["r6", "r5", "r4", "r3", "r2", "r1", "r0"]
+
+
+def test_pages_are_stable_under_inserts(client, async_db):
+    prompt_id, _ = _seed(async_db)
+    first = client.get(f"/response/prompt/{prompt_id}", params={"limit": 3}).json()
+
+    with Session(async_db) as db:
+        user = User(username="late", email="late@example.com", password="x")
+        db.add(user)
+        db.flush()
+        db.add(Response(content="new", user_id=user.id, prompt_id=prompt_id, date=datetime(2026, 1, 2)))
+        db.commit()
+
+    rest = _collect(client, f"/response/prompt/{prompt_id}", limit=3, cursor=first["next_cursor"])
+    seen = [r["content"] for r in first["items"] + rest]
+    assert seen == ["r6", "r5", "r4", "r3", "r2", "r1", "r0"]
+
+
+def test_comments_oldest_first(client, async_db):
+    _, response_id = _seed(async_db)
+    items = _collect(client, f"/comment/response/{response_id}", limit=2)
+    assert [c["content"] for c in items] == ["c0", "c1", "c2", "c3", "c4"]
+
+
+def test_users_and_prompts_are_paged(client, async_db):
+    _seed(async_db)
+    assert len(_collect(client, "/user/", limit=3)) == 7
+    assert len(_collect(client, "/prompt/", limit=1)) == 1
+
+
+def test_bad_cursor_rejected(client, async_db):
+    prompt_id, _ = _seed(async_db)
+    page = client.get(f"/response/prompt/{prompt_id}", params={"cursor": "not-a-cursor"})
+    assert page.status_code == 400
@@ -0,0 +1,72 @@
+import random
+import string
+import time
+
+from sqlalchemy.orm import Session
+
+from app.models import Prompt
+from app.utils.prompt_generator import STUB_PROMPTS
+from app.utils.prompt_index import PromptIndex, prompt_index
+from app.utils.prompt_pool import PromptPool
+
+
+def test_flags_rewordings_but_not_distinct_prompts():
+    index = PromptIndex(threshold=0.6, interval=60)
+    index.add("What shapes your core values?")
+    index.add("Which memory changed you most?")
+
+    assert index.is_near_duplicate("what shapes your core values")
+    assert index.is_near_duplicate("What shapes your values?")
+    assert index.is_near_duplicate("Which memory changed you the most?")
+    assert not index.is_near_duplicate("Where do you feel most like yourself?")
+    assert not index.is_near_duplicate("Which memory would you relive if possible?")
+
+
+def test_lookup_is_sub_millisecond():
+    index = PromptIndex(threshold=0.6, interval=60)
+    rng = random.Random(0)
+    for _ in range(5000):
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8))) for _ in range(6)]
+        index.add(f"What {' '.join(words)}?")
+
+    started = time.perf_counter()
+    for prompt in STUB_PROMPTS * 10:
+        index.most_similar(prompt.upper())
+    per_lookup = (time.perf_counter() - started) / (len(STUB_PROMPTS) * 10)
+    assert per_lookup < 0.001
+
+
+def test_pick_regenerates_until_new():
+    index = PromptIndex(threshold=0.6, interval=60)
+    index.add("What are you proud of?")
+    candidates = iter(["What are you proud of?", "What are you most proud of?", "Where do you feel calm?"])
+
+    assert index.pick(lambda: next(candidates)) == "Where do you feel calm?"
+
+
+def test_refresh_reads_only_new_prompts(client, async_db):
+    with Session(async_db) as db:
+        db.add_all([Prompt(content="What are you proud of?"), Prompt(content="Where do you feel calm?")])
+        db.commit()
+
+    assert client.portal.call(prompt_index.refresh) == 2
+    assert client.portal.call(prompt_index.refresh) == 0
+
+    with Session(async_db) as db:
+        db.add(Prompt(content="Which song follows you everywhere?"))
+        db.commit()
+
+    assert client.portal.call(prompt_index.refresh) == 1
+    assert prompt_index.is_near_duplicate("Which song follows you everywhere")
+
+
+def test_pool_refill_skips_prompts_similar_to_history(client, async_db):
+    with Session(async_db) as db:
+        db.add(Prompt(content="What shapes your core values?"))
+        db.commit()
+
+    candidates = iter(["What shapes your values?", "Who taught you patience?"])
+    pool = PromptPool(size=1, interval=60, generator=lambda: next(candidates), source="test")
+
+    assert client.portal.call(pool.refill) == 1
+    assert prompt_index.is_near_duplicate("Who taught you patience?")
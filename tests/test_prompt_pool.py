@@ -0,0 +1,54 @@
+import itertools
+
+from sqlalchemy.orm import Session
+
+from app.models import PromptPoolEntry
+from app.utils.prompt_pool import PromptPool, prompt_pool
+
+
+def _pool_size(engine):
+    with Session(engine) as db:
+        return db.query(PromptPoolEntry).count()
+
+
+def test_refill_tops_up_with_valid_unique_prompts(client, async_db):
+    candidates = itertools.cycle([
+        "What are you proud of?",
+        "What did I learn today?",  # first person, rejected
+        "What are you proud of?",   # duplicate, skipped
+        "Where do you feel calm?",
+        "Which song follows you everywhere?",
+    ])
+    pool = PromptPool(size=3, interval=60, generator=lambda: next(candidates), source="test")
+
+    assert client.portal.call(pool.refill) == 3
+    assert _pool_size(async_db) == 3
+    assert client.portal.call(pool.refill) == 0
+
+
+def test_refill_stops_when_generator_fails(client, async_db):
+    def failing():
+        raise RuntimeError("Gemini is down")
+
+    pool = PromptPool(size=5, interval=60, generator=failing, source="test")
+    assert client.portal.call(pool.refill) == 0
+
+
+def test_create_prompt_pops_from_pool(client, async_db):
+    with Session(async_db) as db:
+        db.add_all([
+            PromptPoolEntry(content="What are you proud of?", source="test"),
+            PromptPoolEntry(content="Where do you feel calm?", source="test"),
+        ])
+        db.commit()
+
+    created = client.post("/prompt/", json={})
+    assert created.status_code == 201
+    assert created.json()["content"] == "What are you proud of?"
+    assert _pool_size(async_db) == 1
+
+
+def test_create_prompt_survives_empty_pool(client, async_db):
+    created = client.post("/prompt/", json={})
+    assert created.status_code == 201
+    assert created.json()["content"].endswith("?")
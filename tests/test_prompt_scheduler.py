@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app import database
+from app.models import Prompt
+from app.utils.prompt_scheduler import PromptScheduler, activate_prompt, prompt_scheduler
+
+
+def _active(engine):
+    with Session(engine) as db:
+        return [p.id for p in db.query(Prompt).filter(Prompt.is_active == True)]
+
+
+def test_activate_prompt_swaps_the_active_prompt(client, async_db, add_prompt):
+    add_prompt("What are you proud of?", is_active=True)
+    new = add_prompt("Where do you feel calm?")
+
+    async def flip():
+        async with database.AsyncSessionLocal() as db:
+            return await activate_prompt(db, new)
+
+    assert client.portal.call(flip).id == new
+    assert _active(async_db) == [new]
+
+
+def test_due_prompt_is_activated_and_listeners_warmed(client, async_db, add_prompt):
+    now = datetime.now(timezone.utc)
+    add_prompt("What are you proud of?", is_active=True)
+    superseded = add_prompt("Who taught you patience?", scheduled_for=now - timedelta(minutes=2))
+    due = add_prompt("Where do you feel calm?", scheduled_for=now - timedelta(minutes=1))
+    later = add_prompt("Which song follows you everywhere?", scheduled_for=now + timedelta(hours=1))
+
+    scheduler = PromptScheduler(poll_interval=60, grace=600)
+    warmed = []
+
+    @scheduler.on_activate
+    async def warm(prompt):
+        warmed.append(prompt.id)
+
+    client.portal.call(scheduler.load)
+    assert [prompt_id for _, prompt_id in scheduler.upcoming()] == [superseded, due, later]
+
+    assert client.portal.call(scheduler.run_due).id == due
+    assert _active(async_db) == [due]
+    assert warmed == [due]
+    assert [prompt_id for _, prompt_id in scheduler.upcoming()] == [later]
+
+    # Nothing else is due yet, and already-handled prompts are not reloaded
+    assert client.portal.call(scheduler.run_due) is None
+    client.portal.call(scheduler.load)
+    assert [prompt_id for _, prompt_id in scheduler.upcoming()] == [later]
+
+
+def test_rescheduled_prompt_is_not_activated_early(client, async_db, add_prompt):
+    now = datetime.now(timezone.utc)
+    prompt_id = add_prompt("Where do you feel calm?", scheduled_for=now + timedelta(hours=2))
+
+    scheduler = PromptScheduler(poll_interval=60, grace=600)
+    scheduler.schedule(prompt_id, now - timedelta(seconds=1))
+    assert client.portal.call(scheduler.run_due) is None
+    assert _active(async_db) == []
+
+
+def test_create_prompt_schedules_future_activation(client, async_db):
+    when = datetime.now(timezone.utc) + timedelta(days=1)
+    created = client.post("/prompt/", json={"scheduled_for": when.isoformat()})
+    assert created.status_code == 201
+    assert (when, created.json()["id"]) in prompt_scheduler.upcoming()
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import Comment, Notification, Prompt, PurgeJob, Response, ResponseLike, User
+from app.utils import purge
+from app.utils.like_counter import like_counter
+from app.utils.purge import purge_worker
+
+
+@pytest.fixture()
+def seed(client, async_db, signup, add_prompt, add_response):
+    """ann answers ``responses`` prompts and comments on and likes bob's answer."""
+    def create(responses=3):
+        signup("ann", "bob")
+        prompt_ids = [add_prompt(f"Prompt {i}?") for i in range(responses)]
+        for i, prompt_id in enumerate(prompt_ids):
+            add_response(1, prompt_id, f"ann {i}")
+        bob_response = add_response(2, prompt_ids[0], "bob 0")
+        with Session(async_db) as db:
+            db.add(Notification(type="comment", user_id=1, response_id=bob_response))
+            db.commit()
+
+        client.post(f"/comment/{bob_response}", json={"content": "bob on his own", "user_id": 2})
+        client.post(f"/comment/{bob_response}", json={"content": "ann on bob's", "user_id": 1})
+        client.post("/comment/1", json={"content": "bob on ann's", "user_id": 2})
+        with Session(async_db) as db:
+            db.add(ResponseLike(user_id=1, response_id=bob_response))
+            db.commit()
+        return bob_response
+    return create
+
+
+def _counts(engine):
+    with Session(engine) as db:
+        return {
+            model.__tablename__: db.query(model).count()
+            for model in (User, Response, Comment, ResponseLike, Notification, PurgeJob)
+        }
+
+
+def test_small_user_is_deleted_inline_with_their_subtree(client, async_db, seed):
+    bob_response = seed()
+
+    deleted = client.delete("/user/1")
+    assert deleted.status_code == 200
+    assert deleted.json() == {"message": "Deleted User"}
+
+    assert _counts(async_db) == {
+        "users": 1, "responses": 1, "comments": 1, "response_likes": 0, "notifications": 0, "purge_jobs": 0,
+    }
+    with Session(async_db) as db:
+        response = db.get(Response, bob_response)
+        assert response.comment_count == 1
+        assert [entry["content"] for entry in response.comment_preview] == ["bob on his own"]
+    assert like_counter.pending(bob_response) == -1
+    assert client.delete("/user/1").status_code == 404
+
+
+def test_heavy_user_is_hidden_then_purged_in_batches(client, async_db, seed, monkeypatch):
+    seed(responses=5)
+    monkeypatch.setattr(purge, "PURGE_INLINE_LIMIT", 2)
+    monkeypatch.setattr(purge_worker, "batch_size", 2)
+    monkeypatch.setattr(purge_worker, "pause", 0)
+    token = client.post("/auth/login", data={"username": "ann", "password": "pw"}).json()["access_token"]
+
+    scheduled = client.delete("/user/1")
+    assert scheduled.status_code == 202
+    assert scheduled.json() == {"message": "User deletion scheduled"}
+    assert _counts(async_db)["purge_jobs"] == 1
+    # Revoked and hidden at once, though the rows are still there
+    assert client.post("/response/2/like", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert client.post("/auth/login", data={"username": "ann", "password": "pw"}).status_code == 401
+    assert client.get("/user/1").status_code == 404
+    assert client.get("/user/username/ann").status_code == 404
+    assert [user["id"] for user in client.get("/user/").json()["items"]] == [2]
+    assert client.delete("/user/1").status_code == 202
+    assert _counts(async_db)["purge_jobs"] == 1
+
+    assert client.portal.call(purge_worker.run_once) == 1
+    assert _counts(async_db) == {
+        "users": 1, "responses": 1, "comments": 1, "response_likes": 0, "notifications": 0, "purge_jobs": 0,
+    }
+    assert client.portal.call(purge_worker.run_once) == 0
+
+
+def test_heavy_prompt_is_deactivated_then_purged(client, async_db, seed, monkeypatch):
+    seed()
+    with Session(async_db) as db:
+        db.get(Prompt, 1).is_active = True
+        db.commit()
+    monkeypatch.setattr(purge, "PURGE_INLINE_LIMIT", 2)
+    assert len(client.get("/prompt/current").json()) == 1
+
+    assert client.delete("/prompt/1").status_code == 202
+    assert client.get("/prompt/current").json() == []
+
+    client.portal.call(purge_worker.run_once)
+    with Session(async_db) as db:
+        assert db.get(Prompt, 1) is None
+        assert db.query(Response).filter(Response.prompt_id == 1).count() == 0
+        assert db.query(Response).count() == 2
+        assert db.query(Comment).count() == 0
+
+
+def test_lease_keeps_a_claimed_job_from_other_workers(client, async_db, seed):
+    seed()
+    with Session(async_db) as db:
+        db.add(PurgeJob(entity=purge.USER, entity_id=1))
+        db.commit()
+
+    assert client.portal.call(purge_worker.claim) == (purge.USER, 1)
+    assert client.portal.call(purge_worker.claim) is None
+
+    with Session(async_db) as db:
+        db.query(PurgeJob).update({PurgeJob.claimed_at: datetime.now(timezone.utc) - timedelta(hours=1)})
+        db.commit()
+    assert client.portal.call(purge_worker.claim) == (purge.USER, 1)
+
+
+def test_deleting_a_response_cascades_in_the_database(client, async_db, seed):
+    bob_response = seed()
+
+    assert client.delete(f"/response/{bob_response}").status_code == 200
+    with Session(async_db) as db:
+        assert db.query(Comment).filter(Comment.response_id == bob_response).count() == 0
+        assert db.query(ResponseLike).count() == 0
+        assert db.query(Notification).count() == 0
+    assert client.delete(f"/response/{bob_response}").status_code == 404
@@ -0,0 +1,75 @@
+"""EXPLAIN-based regression tests for the hot query paths.
+
+Runs SQLite's EXPLAIN QUERY PLAN against the schema declared in models.py, so
+dropping or reshaping one of the indexes the routes depend on fails here.
+"""
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import sqlite
+
+from app.database import Base
+from app.models import Comment, Prompt, Response
+from app.routes.feed import FEED_KEY, current_feed_query
+from app.utils.pagination import apply_keyset, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def _plan(engine, stmt):
+    compiled = stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def _assert_uses(plan, index_name):
+    """The query is driven by index_name: no table scan and no sort step."""
+    assert any(index_name in step for step in plan), plan
+    assert all("USING" in step for step in plan if step.startswith("SCAN")), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_current_prompt_uses_partial_index(engine):
+    stmt = select(Prompt).filter(Prompt.is_active == True).order_by(Prompt.id.desc()).limit(1)
+    _assert_uses(_plan(engine, stmt), "uq_prompts_single_active")
+
+
+def test_responses_by_prompt_page(engine):
+    columns = [Response.date, Response.id]
+    stmt = apply_keyset(select(Response).filter(Response.prompt_id == 1), columns, None, 20)
+    _assert_uses(_plan(engine, stmt), "ix_responses_prompt_id_date_id")
+
+
+def test_responses_by_user_page(engine):
+    columns = [Response.date, Response.id]
+    stmt = apply_keyset(select(Response).filter(Response.user_id == 1), columns, None, 20)
+    _assert_uses(_plan(engine, stmt), "ix_responses_user_id_date_id")
+
+
+def test_response_by_user_and_prompt(engine):
+    stmt = select(Response).filter((Response.prompt_id == 1) & (Response.user_id == 1))
+    _assert_uses(_plan(engine, stmt), "uq_responses_user_id_prompt_id")
+
+
+def test_comments_by_response_page(engine):
+    columns = [Comment.created_at, Comment.id]
+    cursor = encode_cursor(["2026-01-01T00:00:00", 10])
+    stmt = apply_keyset(select(Comment).filter(Comment.response_id == 1), columns, cursor, 20, descending=False)
+    _assert_uses(_plan(engine, stmt), "ix_comments_response_id_created_at_id")
+
+
+def test_prompts_page(engine):
+    stmt = apply_keyset(select(Prompt), [Prompt.created_at, Prompt.id], None, 20)
+    _assert_uses(_plan(engine, stmt), "ix_prompts_created_at_id")
+
+
+def test_current_feed_page(engine):
+    plan = _plan(engine, apply_keyset(current_feed_query(), FEED_KEY, None, 20))
+    _assert_uses(plan, "ix_responses_prompt_id_date_id")
+    assert any("uq_prompts_single_active" in step for step in plan), plan
@@ -0,0 +1,89 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app.models import Tombstone
+from app.utils import sync
+
+
+def _sync(client, token, **params):
+    result = client.get("/sync/", params={"since": token, **params})
+    assert result.status_code == 200, result.json()
+    return result.json()
+
+
+def test_sync_returns_only_what_changed_since_the_token(client, async_db, signup, add_prompt):
+    signup("ann", "bob")
+    current, old = add_prompt("Now?"), add_prompt("Before?")
+    token = client.get("/sync/").json()["token"]
+
+    response_id = client.post("/response/1", json={"content": "My dog", "prompt_id": current}).json()["id"]
+    comment_id = client.post(f"/comment/{response_id}", json={"content": "ha", "user_id": 2}).json()["id"]
+    first = _sync(client, token)
+    assert [row["id"] for row in first["responses"]] == [response_id]
+    # The response changed again when its comment stats moved; it is listed once
+    assert first["responses"][0]["comment_count"] == 1
+    assert [row["id"] for row in first["comments"]] == [comment_id]
+    assert first["prompts"] == []
+
+    quiet = _sync(client, first["token"])
+    assert (quiet["responses"], quiet["comments"], quiet["prompts"]) == ([], [], [])
+    assert quiet["deleted"] == {"prompts": [], "responses": [], "comments": []}
+
+    client.put(f"/response/1/{current}", json={"content": "My cat"})
+    edited = _sync(client, quiet["token"])
+    assert [row["content"] for row in edited["responses"]] == ["My cat"]
+
+    client.delete(f"/response/{response_id}")
+    gone = _sync(client, edited["token"])
+    assert gone["responses"] == []
+    # The comment went by cascade and still leaves a tombstone
+    assert gone["deleted"] == {"prompts": [], "responses": [response_id], "comments": [comment_id]}
+
+
+def test_sync_can_be_scoped_to_a_prompt(client, async_db, signup, add_prompt):
+    signup("ann", "bob")
+    current, old = add_prompt("Now?"), add_prompt("Before?")
+    token = client.get("/sync/").json()["token"]
+    mine = client.post("/response/1", json={"content": "Now", "prompt_id": current}).json()["id"]
+    other = client.post("/response/1", json={"content": "Then", "prompt_id": old}).json()["id"]
+    client.post(f"/comment/{other}", json={"content": "ha", "user_id": 2})
+
+    scoped = _sync(client, token, prompt_id=current)
+    assert [row["id"] for row in scoped["responses"]] == [mine]
+    assert scoped["comments"] == []
+
+    client.delete(f"/response/{other}")
+    assert _sync(client, scoped["token"], prompt_id=current)["deleted"]["responses"] == []
+    assert _sync(client, scoped["token"], prompt_id=old)["deleted"]["responses"] == [other]
+
+
+def test_bad_expired_and_oversized_syncs_are_refused(client, async_db, signup, add_prompt, monkeypatch):
+    signup("ann", "bob")
+    current, old = add_prompt("Now?"), add_prompt("Before?")
+    token = client.get("/sync/").json()["token"]
+
+    assert client.get("/sync/", params={"since": "nonsense"}).status_code == 400
+    stale = sync.encode_token(0, issued_at=time.time() - (sync.SYNC_RETENTION_DAYS + 1) * 86_400)
+    assert client.get("/sync/", params={"since": stale}).status_code == 410
+
+    monkeypatch.setattr(sync, "SYNC_MAX_CHANGES", 1)
+    client.post("/response/1", json={"content": "Now", "prompt_id": current})
+    client.post("/response/2", json={"content": "Me too", "prompt_id": current})
+    refused = client.get("/sync/", params={"since": token})
+    assert refused.status_code == 410
+    assert refused.json()["detail"].startswith("Too many changes")
+
+
+def test_prune_drops_old_tombstones(client, async_db, add_prompt):
+    add_prompt("Now?")
+    add_prompt("Before?")
+    client.delete("/prompt/2")
+    with Session(async_db) as db:
+        db.add(Tombstone(entity="prompts", entity_id=99, change_seq=1, deleted_at=datetime.now(timezone.utc) - timedelta(days=90)))
+        db.commit()
+
+    assert client.portal.call(sync.prune) == 1
+    with Session(async_db) as db:
+        assert [(row.entity, row.entity_id) for row in db.query(Tombstone)] == [("prompts", 2)]
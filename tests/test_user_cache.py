@@ -0,0 +1,63 @@
+import time
+
+from app.models import User
+from app.utils.user_cache import UserCache, user_cache
+
+
+def _user(user_id, username, email=None):
+    return User(id=user_id, username=username, email=email or f"{username}@example.com", password="x")
+
+
+def test_lookup_by_every_key():
+    cache = UserCache(max_size=10, ttl=60)
+    cache.put(_user(1, "ana"))
+    assert cache.get_by_id(1).username == "ana"
+    assert cache.get_by_username("ana").id == 1
+    assert cache.get_by_email("ana@example.com").id == 1
+    assert cache.get_by_username("bo") is None
+    assert cache.stats() == {"size": 1, "hits": 3, "misses": 1}
+
+
+def test_lru_eviction_and_ttl():
+    cache = UserCache(max_size=2, ttl=60)
+    cache.put(_user(1, "ana"))
+    cache.put(_user(2, "bo"))
+    cache.get_by_id(1)
+    cache.put(_user(3, "cy"))
+    assert cache.get_by_id(2) is None
+    assert cache.get_by_username("bo") is None
+    assert cache.get_by_id(1) is not None
+
+    expiring = UserCache(max_size=2, ttl=0.01)
+    expiring.put(_user(1, "ana"))
+    time.sleep(0.02)
+    assert expiring.get_by_username("ana") is None
+    assert len(expiring) == 0
+
+
+def test_rename_drops_old_keys():
+    cache = UserCache(max_size=10, ttl=60)
+    cache.put(_user(1, "ana"))
+    cache.put(_user(1, "anna"))
+    assert cache.get_by_username("ana") is None
+    assert cache.get_by_username("anna").id == 1
+
+
+def test_authenticated_requests_hit_cache(client, signup, auth_headers):
+    signup("cached")
+    headers = auth_headers("cached")
+
+    client.get("/auth/me", headers=headers)
+    misses = user_cache.misses
+    for _ in range(5):
+        assert client.get("/auth/me", headers=headers).status_code == 200
+    assert user_cache.misses == misses
+
+
+def test_update_invalidates(client, signup):
+    user_id = signup("old")[0].json()["id"]
+    assert client.get(f"/user/{user_id}").json()["username"] == "old"
+
+    client.put(f"/user/{user_id}", json={"username": "new", "email": "old@example.com"})
+    assert client.get(f"/user/{user_id}").json()["username"] == "new"
+    assert client.get("/user/username/old").status_code == 404
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app.models import User
+
+
+def test_create_user_is_one_insert(signup, capture_sql):
+    with capture_sql() as statements:
+        [created] = signup("ann")
+    assert created.status_code == 201
+    assert statements == ["INSERT"]
+
+    assert signup("ann", email="other@example.com")[0].json()["detail"] == "Username or email already registered"
+    assert signup("bob", email="ann@example.com")[0].status_code == 400
+
+
+def test_concurrent_duplicate_signups_admit_one(async_db, signup):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = sorted(r.status_code for r in pool.map(lambda _: signup("ann")[0], range(8)))
+    assert statuses == [201] + [400] * 7
+    with Session(async_db) as db:
+        assert db.query(User).count() == 1
+
+
+def test_update_user_maps_conflicts_and_missing_rows(client, signup, capture_sql):
+    signup("ann", "bob")
+
+    with capture_sql() as statements:
+        renamed = client.put("/user/1", json={"username": "anna", "email": "anna@example.com"})
+    assert renamed.status_code == 200
+    assert renamed.json()["username"] == "anna"
+    assert statements == ["UPDATE"]
+
+    taken = client.put("/user/1", json={"username": "bob", "email": "anna@example.com"})
+    assert taken.status_code == 400
+    assert taken.json()["detail"] == "Username or email already exists"
+    assert client.put("/user/99", json={"username": "zed", "email": "zed@example.com"}).status_code == 404
+
+
+def test_create_and_update_response(client, signup, add_prompt, capture_sql):
+    signup("ann")
+    prompt_id = add_prompt()
+    body = {"content": "My dog", "prompt_id": prompt_id}
+
+    with capture_sql() as statements:
+        assert client.post("/response/1", json=body).status_code == 201
+    assert statements == ["INSERT"]
+
+    again = client.post("/response/1", json=body)
+    assert again.status_code == 400
+    assert again.json()["detail"] == "User has already responded to this prompt."
+    assert client.post("/response/1", json={"content": "x", "prompt_id": 999}).status_code == 404
+
+    with capture_sql() as statements:
+        updated = client.put(f"/response/1/{prompt_id}", json={"content": "My cat"})
+    assert updated.json()[0]["content"] == "My cat"
+    assert statements == ["UPDATE"]
+    assert client.put(f"/response/2/{prompt_id}", json={"content": "x"}).status_code == 404
+
+
+def test_prompt_on_is_guarded_by_the_unique_index(client, add_prompt):
+    first, second = add_prompt("Prompt 0?"), add_prompt("Prompt 1?")
+
+    assert client.put(f"/prompt/on/{first}").json()["is_active"] is True
+    blocked = client.put(f"/prompt/on/{second}")
+    assert blocked.status_code == 400
+    assert blocked.json()["detail"] == "Another prompt is already active"
+    assert client.put("/prompt/on/999").status_code == 404
+
+    created = client.post("/prompt/", json={"is_active": True})
+    assert created.status_code == 400
+    assert created.json()["detail"] == "Another prompt is already active"
+    assert client.post("/prompt/", json={}).status_code == 201